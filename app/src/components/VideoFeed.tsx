@@ -6,7 +6,8 @@ interface VideoItem {
   description: string;
   topText: string;
   bottomText: string;
-  videoContent?: string; // base64 video content
+  videoContent?: string; // legacy base64 video content
+  videoUrl?: string; // streaming URL for videos stored in the blob store
 }
 
 interface PromptData {
@@ -20,7 +21,9 @@ interface PromptData {
 interface VideoData {
   prompt: string;
   description: string;
-  content: string; // base64 encoded video
+  blob_key?: string;
+  size?: number;
+  content?: string; // legacy base64 encoded video
   metadata: any;
 }
 
@@ -28,6 +31,7 @@ interface BasicDataItem {
   value: {
     description?: string;
     prompt?: string;
+    blob_key?: string;
     content?: string;
     metadata?: any;
   };
@@ -53,6 +57,12 @@ const BASIC_CONFIG: BasicConfig = {
 
 const BASE_URL = `https://api.basic.tech/account/${BASIC_CONFIG.projectId}/db`;
 
+// Video generation service, which streams stored videos with Range support
+const VIDEO_API_URL = (window as any)._env_?.VIDEO_API_URL || import.meta.env.VITE_VIDEO_API_URL || 'http://localhost:8000';
+
+const getStreamUrl = (blobKey?: string) =>
+  blobKey ? `${VIDEO_API_URL}/videos/${blobKey}/stream` : undefined;
+
 const TOPICS = [
   "cat fails",
   "cooking disaster",
@@ -145,7 +155,8 @@ const VideoFeed: React.FC = () => {
               description: item.value?.description || 'No description available',
               topText: item.value?.prompt || 'Watch this video',
               bottomText: item.value?.description || 'No description available',
-              videoContent: item.value?.content
+              videoContent: item.value?.content,
+              videoUrl: getStreamUrl(item.value?.blob_key)
             };
             console.log(`[getExistingVideos] Created video item:`, {
               ...videoItem,
@@ -164,7 +175,8 @@ const VideoFeed: React.FC = () => {
             description: item.data?.value?.description || 'No description available',
             topText: item.data?.value?.prompt || 'Watch this video',
             bottomText: item.data?.value?.description || 'No description available',
-            videoContent: item.data?.value?.content
+            videoContent: item.data?.value?.content,
+            videoUrl: getStreamUrl(item.data?.value?.blob_key)
           };
           console.log(`[getExistingVideos] Created video item:`, {
             ...videoItem,
@@ -338,6 +350,30 @@ const VideoFeed: React.FC = () => {
   // Render video or fallback
   const renderContent = (video: VideoItem) => {
     console.log('[renderContent] Rendering video item:', video);
+    if (video.videoUrl) {
+      // Streamed with Range requests, so playback starts before the file is fully downloaded
+      return (
+        <video
+          src={video.videoUrl}
+          autoPlay
+          loop
+          playsInline
+          controls
+          preload="metadata"
+          style={{
+            width: '100%',
+            height: '100%',
+            objectFit: 'cover',
+            position: 'absolute',
+            top: 0,
+            left: 0,
+          }}
+          onError={(e) => {
+            console.error('[renderContent] Video error:', e);
+          }}
+        />
+      );
+    }
     if (video.videoContent) {
       console.log('[renderContent] Video content found, length:', video.videoContent.length);
       try {
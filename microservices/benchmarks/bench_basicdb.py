@@ -0,0 +1,73 @@
+"""
+Requests/sec of BasicDB.store_prompt against a local fake Basic.tech server.
+
+"before" replays the previous client: a blocking requests.post per call,
+with a fresh connection each time, inside a coroutine. "after" is the pooled
+httpx client in common/db.py.
+
+    python bench_basicdb.py --requests 500 --concurrency 32 --latency-ms 10
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fake_basic
+
+
+async def run(label, store, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await store()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:>7}: {total} requests in {elapsed:.2f}s -> {total / elapsed:.1f} req/s")
+    return total / elapsed
+
+
+async def main(args):
+    server = fake_basic.start_in_thread(latency_ms=args.latency_ms)
+    os.environ.update({
+        "BASIC_API_URL": f"http://127.0.0.1:{server.server_port}",
+        "BASIC_PROJECT_ID": "bench",
+        "BASIC_API_KEY": "bench",
+        "BASIC_JWT": "bench",
+    })
+
+    import requests
+    from common.db import BasicDB
+    from common.models import PromptCreate
+
+    logging.getLogger("common.db").setLevel(logging.WARNING)
+    prompt = PromptCreate(topic="cat playing piano", output="A cat plays piano.",
+                          top_text="top", bottom_text="bottom")
+    db = BasicDB()
+    url = f"{db.base_url}/prompts"
+
+    async def legacy_store():
+        # The pre-pool implementation: blocking, no session, no timeout
+        response = requests.post(url, json={"value": prompt.model_dump()}, headers=db.headers)
+        response.raise_for_status()
+        return response.json()
+
+    before = await run("before", legacy_store, args.requests, args.concurrency)
+    after = await run("after", lambda: db.store_prompt(prompt), args.requests, args.concurrency)
+    await db.aclose()
+    server.shutdown()
+    print(f"speedup: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the BasicDB client")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    asyncio.run(main(parser.parse_args()))
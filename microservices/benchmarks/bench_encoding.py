@@ -0,0 +1,123 @@
+"""
+Wall time and peak RSS of the video encode step, moviepy vs. ffmpeg.
+
+"before" replays the previous path: ImageSequenceClip export to an
+intermediate MP4, then a second moviepy pass that loops the clip to the
+narration length and re-encodes it with the audio. "after" is
+encoding.encode_video, a single ffmpeg pass fed raw frames over stdin.
+Each run happens in a fresh subprocess so peak RSS is not shared.
+
+Needs ffmpeg on PATH, plus moviepy<2 for the baseline.
+
+    python bench_encoding.py --frames 16 --size 512 --audio-seconds 6 --runs 3
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "video-generation"))
+
+FPS = 8
+
+
+def make_frames(count, size):
+    rng = np.random.default_rng(0)
+    base = rng.random((size, size, 3), dtype=np.float32)
+    return [np.roll(base, i * 4, axis=1) for i in range(count)]
+
+
+def make_wav(path, seconds, rate=22050):
+    samples = (0.3 * 32767 * np.sin(2 * math.pi * 220 * np.arange(int(seconds * rate)) / rate)).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.tobytes())
+
+
+def encode_moviepy(frames, output_path, audio_path, workdir):
+    from moviepy.editor import AudioFileClip, ImageSequenceClip, VideoFileClip, concatenate_videoclips
+
+    intermediate = os.path.join(workdir, "intermediate.mp4")
+    clip = ImageSequenceClip([(f * 255).astype(np.uint8) for f in frames], fps=FPS)
+    clip.write_videofile(intermediate, codec="libx264", logger=None)
+
+    video = VideoFileClip(intermediate)
+    audio = AudioFileClip(audio_path)
+    if audio.duration > video.duration:
+        video = concatenate_videoclips([video] * math.ceil(audio.duration / video.duration))
+    video = video.set_audio(audio).subclip(0, audio.duration)
+    video.write_videofile(output_path, codec="libx264", audio_codec="aac", logger=None)
+    video.close()
+    audio.close()
+
+
+def encode_ffmpeg(frames, output_path, audio_path, workdir):
+    from encoding import encode_video
+
+    encode_video(frames, output_path, audio_path, fps=FPS)
+
+
+def child(args):
+    """Run one encode in this process and print its timings as JSON."""
+    frames = make_frames(args.frames, args.size)
+    with tempfile.TemporaryDirectory() as workdir:
+        audio_path = os.path.join(workdir, "narration.wav")
+        make_wav(audio_path, args.audio_seconds)
+        output_path = os.path.join(workdir, "out.mp4")
+
+        start = time.perf_counter()
+        (encode_moviepy if args.child == "before" else encode_ffmpeg)(frames, output_path, audio_path, workdir)
+        elapsed = time.perf_counter() - start
+
+        print(json.dumps({
+            "seconds": elapsed,
+            # ru_maxrss is in KiB on Linux
+            "python_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "ffmpeg_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+            "output_bytes": os.path.getsize(output_path),
+        }))
+
+
+def main(args):
+    print(f"{args.frames} frames at {args.size}x{args.size}, {args.audio_seconds}s narration, {args.runs} runs")
+    for label in ("before", "after"):
+        runs = []
+        for _ in range(args.runs):
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", label,
+                 "--frames", str(args.frames), "--size", str(args.size),
+                 "--audio-seconds", str(args.audio_seconds)],
+                check=True, capture_output=True, text=True,
+            )
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        seconds = sorted(r["seconds"] for r in runs)
+        print(
+            f"{label:>7}: median {seconds[len(seconds) // 2]:.2f}s, "
+            f"peak python RSS {max(r['python_rss_mb'] for r in runs):.0f} MB, "
+            f"peak ffmpeg RSS {max(r['ffmpeg_rss_mb'] for r in runs):.0f} MB, "
+            f"output {runs[-1]['output_bytes'] / 1024:.0f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=16)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--audio-seconds", type=float, default=6.0)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", choices=["before", "after"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+    else:
+        main(args)
@@ -0,0 +1,112 @@
+"""
+Text-to-video throughput in frames/sec for each inference profile setting.
+
+Every configuration runs in a fresh interpreter, because torch thread pools
+can only be sized once per process. Each run loads the pipeline through
+InferenceProfile (the same path as the service), does one warm-up render,
+then times --runs renders.
+
+    python bench_inference.py --profile cpu --steps 25 --frames 16
+    python bench_inference.py --profile cpu --configs fp32 bf16 bf16-compile dpm-10
+
+Configurations are named INFERENCE_* overrides on top of the chosen profile;
+see CONFIGS below.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "video-generation"))
+
+CONFIGS = {
+    "baseline": {},
+    "fp32": {"INFERENCE_DTYPE": "fp32"},
+    "bf16": {"INFERENCE_DTYPE": "bf16"},
+    "bf16-compile": {"INFERENCE_DTYPE": "bf16", "INFERENCE_COMPILE": "1"},
+    "no-slicing": {"INFERENCE_ATTENTION_SLICING": "0", "INFERENCE_VAE_TILING": "0"},
+    "no-channels-last": {"INFERENCE_CHANNELS_LAST": "0"},
+    "default-scheduler": {"INFERENCE_SCHEDULER": "default"},
+    "dpm-10": {"INFERENCE_SCHEDULER": "dpm", "INFERENCE_MAX_STEPS": "10"},
+}
+
+
+def child(args):
+    import torch
+
+    from inference_profile import InferenceProfile, configure_threads
+
+    threads = configure_threads()
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    profile = InferenceProfile.from_env(device)
+
+    start = time.perf_counter()
+    pipe = profile.load(args.model)
+    load_seconds = time.perf_counter() - start
+
+    def render():
+        return pipe(prompt=args.prompt, num_inference_steps=profile.inference_steps(args.steps),
+                    num_frames=args.frames, generator=torch.Generator("cpu").manual_seed(0)).frames
+
+    start = time.perf_counter()
+    render()
+    warmup_seconds = time.perf_counter() - start
+
+    times = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        render()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    print(json.dumps({
+        "profile": profile.as_dict(),
+        **threads,
+        "steps": profile.inference_steps(args.steps),
+        "load_seconds": load_seconds,
+        "warmup_seconds": warmup_seconds,
+        "median_seconds": times[len(times) // 2],
+    }))
+
+
+def main(args):
+    print(f"{args.frames} frames, {args.steps} requested steps, profile {args.profile}, {args.runs} runs")
+    for name in args.configs:
+        env = {**os.environ, "INFERENCE_PROFILE": args.profile, **CONFIGS[name]}
+        if args.threads:
+            env["INFERENCE_THREADS"] = str(args.threads)
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", "--model", args.model, "--prompt", args.prompt,
+             "--steps", str(args.steps), "--frames", str(args.frames), "--runs", str(args.runs)],
+            env=env, capture_output=True, text=True,
+        )
+        if out.returncode != 0:
+            error = out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "failed"
+            print(f"{name:>18}: {error}")
+            continue
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        seconds = result["median_seconds"]
+        print(
+            f"{name:>18}: {args.frames / seconds:6.2f} frames/s, {seconds:7.2f}s per render "
+            f"({result['steps']} steps, {result['profile']['dtype']}, {result['threads']} threads), "
+            f"load {result['load_seconds']:.1f}s, warm-up {result['warmup_seconds']:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="damo-vilab/text-to-video-ms-1.7b")
+    parser.add_argument("--prompt", default="a cat playing the piano")
+    parser.add_argument("--profile", default="cpu", choices=["cpu", "gpu", "auto"])
+    parser.add_argument("--configs", nargs="+", default=["baseline", "bf16", "dpm-10"], choices=sorted(CONFIGS))
+    parser.add_argument("--steps", type=int, default=25)
+    parser.add_argument("--frames", type=int, default=16)
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--threads", type=int, help="Sets INFERENCE_THREADS")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+    else:
+        main(args)
@@ -0,0 +1,115 @@
+"""
+Per-request cost of the Basic.tech client's logging, before and after common/log.py.
+
+"before" replays the previous logging: f-strings with json.dumps(indent=2)
+of every payload and response (store_prompt also dumped each parsed model),
+written synchronously by a StreamHandler. "after" is log.summary arguments
+at DEBUG plus one INFO line, through the queue handler.
+
+Each request logs a prompt write and a legacy video record response that
+still carries a base64 body (--content-kb). Output goes to /dev/null, so
+this measures formatting and handler overhead, not terminal speed.
+
+Reported per request:
+- request path: time spent in the logging calls on the caller's thread
+- total: request path plus draining the background writer, if any
+
+    python bench_logging.py --requests 2000 --content-kb 1024
+"""
+import argparse
+import base64
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import log
+
+logger = logging.getLogger("common.db")
+
+
+def make_payloads(content_kb: int):
+    prompt = {"value": {
+        "topic": "cat playing piano",
+        "output": "A cat in a tiny tuxedo sits at a grand piano. " * 6,
+        "top_text": "WHEN THE RECITAL",
+        "bottom_text": "IS TOMORROW",
+        "metadata": {"generated_at": "2026-10-16T12:00:00", "model": "llama3.2", "narration": "Meow. " * 40},
+    }}
+    prompt_response = {"data": {"id": "0b6f6c1e-5a0c-4a39-9d0a-1f2b3c4d5e6f", **prompt}}
+    video_response = {"data": {"id": "5e6f7a8b-0000-4a39-9d0a-1f2b3c4d5e6f", "value": {
+        "prompt": "cat playing piano",
+        "description": "A cat in a tiny tuxedo sits at a grand piano.",
+        "content": base64.b64encode(os.urandom(content_kb * 1024)).decode(),
+        "metadata": {"frames": 16, "fps": 8},
+    }}}
+    return prompt, prompt_response, video_response
+
+
+def before_request(prompt, prompt_response, video_response):
+    logger.info(f"Sending request to Basic.tech API with payload: {json.dumps(prompt, indent=2)}")
+    logger.info(f"Raw Basic.tech API Response: {json.dumps(prompt_response, indent=2)}")
+    logger.info(f"Parsed PromptResponse: {json.dumps(prompt_response, indent=2)}")
+    logger.info(f"Parsed PromptData: {json.dumps(prompt_response['data'], indent=2)}")
+    logger.info(f"Parsed PromptBase: {json.dumps(prompt_response['data']['value'], indent=2)}")
+    logger.info(f"Basic.tech API Response: {json.dumps(video_response, indent=2)}")
+
+
+def after_request(prompt, prompt_response, video_response):
+    logger.debug("Sending prompt to Basic.tech: %s", log.summary(prompt))
+    logger.debug("Basic.tech response: %s", log.summary(prompt_response))
+    logger.info("Stored prompt %s", prompt_response["data"]["id"])
+    logger.debug("Basic.tech response: %s", log.summary(video_response))
+
+
+def configure_before(level: str, devnull) -> None:
+    log.stop_logging()
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    handler = logging.StreamHandler(devnull)
+    handler.setFormatter(logging.Formatter(log.TEXT_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+def run(label, request, payloads, total):
+    start = time.perf_counter()
+    for _ in range(total):
+        request(*payloads)
+    request_path = time.perf_counter() - start
+    # Waits for the background writer to empty its queue
+    log.stop_logging()
+    total_seconds = time.perf_counter() - start
+    print(f"{label:<44} request path {request_path / total * 1e6:10.1f} us/request   "
+          f"total {total_seconds / total * 1e6:10.1f} us/request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--content-kb", type=int, default=1024, help="Size of the legacy video body in the response")
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.content_kb)
+    devnull = open(os.devnull, "w")
+    print(f"{args.requests} requests, {args.content_kb} KB video body")
+
+    for level in ("DEBUG", "INFO", "WARNING"):
+        configure_before(level, devnull)
+        run(f"before, level {level}", before_request, payloads, args.requests)
+        for fmt in ("text", "json"):
+            for use_queue in (False, True):
+                log.configure_logging("bench", level=level, fmt=fmt, use_queue=use_queue,
+                                      sample_burst=0, stream=devnull)
+                run(f"after, level {level}, {fmt}, {'queue' if use_queue else 'sync'}",
+                    after_request, payloads, args.requests)
+        log.configure_logging("bench", level=level, fmt="json", sample_burst=log.LOG_SAMPLE_BURST, stream=devnull)
+        run(f"after, level {level}, json, queue, sampled", after_request, payloads, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Cold-start cost of the video-generation service, per component.
+
+Each step runs in a fresh interpreter so nothing is already imported or
+cached in memory (the OS page cache still is; drop it between runs for a
+true cold start). Steps:
+
+- import of torch, diffusers and TTS.api
+- diffusion pipeline load, with and without safetensors
+- TTS model load
+- with --service, time until the server answers /health and /ready
+
+    python bench_startup.py --runs 3
+    python bench_startup.py --service --port 8010
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+VIDEO_GEN_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "video-generation")
+
+STEPS = {
+    "import torch": "import torch",
+    "import diffusers": "import torch; _t = time.perf_counter(); import diffusers",
+    "import TTS.api": "import torch; _t = time.perf_counter(); import TTS.api",
+    "diffusion (safetensors)": (
+        "import torch; from diffusers import DiffusionPipeline; _t = time.perf_counter(); "
+        "DiffusionPipeline.from_pretrained(MODEL, torch_dtype=torch.float16, variant='fp16', use_safetensors=True)"
+    ),
+    "diffusion (pickle)": (
+        "import torch; from diffusers import DiffusionPipeline; _t = time.perf_counter(); "
+        "DiffusionPipeline.from_pretrained(MODEL, torch_dtype=torch.float16, variant='fp16', use_safetensors=False)"
+    ),
+    "tts model": (
+        "from TTS.api import TTS; from tts_registry import DEFAULT_TTS_MODEL; _t = time.perf_counter(); "
+        "TTS(model_name=DEFAULT_TTS_MODEL, progress_bar=False)"
+    ),
+}
+
+
+def time_step(code, model):
+    """Seconds spent in `code`, measured from `_t` if the code sets it (to exclude setup imports)."""
+    script = (
+        "import json, sys, time\n"
+        f"sys.path.insert(0, {VIDEO_GEN_DIR!r})\n"
+        f"MODEL = {model!r}\n"
+        "_t = time.perf_counter()\n"
+        f"{code}\n"
+        "print(json.dumps(time.perf_counter() - _t))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    if out.returncode != 0:
+        return None, out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "failed"
+    return json.loads(out.stdout.strip().splitlines()[-1]), None
+
+
+def wait_for(url, timeout, statuses=(200,)):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status in statuses:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    return False
+
+
+def bench_service(port, timeout):
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "video-gen:app", "--port", str(port)],
+        cwd=VIDEO_GEN_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        if wait_for(f"{base}/health", timeout):
+            print(f"{'service /health':>24}: {time.perf_counter() - start:7.2f}s")
+        else:
+            print(f"{'service /health':>24}: no answer within {timeout}s")
+            return
+        if wait_for(f"{base}/ready", timeout):
+            print(f"{'service /ready':>24}: {time.perf_counter() - start:7.2f}s")
+            with urllib.request.urlopen(f"{base}/ready") as response:
+                for name, model in json.load(response)["models"].items():
+                    print(f"{name:>24}: {model['load_seconds']:7.2f}s ({model['state']})")
+        else:
+            print(f"{'service /ready':>24}: not ready within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(args):
+    for name, code in STEPS.items():
+        if args.skip_models and not name.startswith("import"):
+            continue
+        times, error = [], None
+        for _ in range(args.runs):
+            seconds, error = time_step(code, args.model)
+            if seconds is None:
+                break
+            times.append(seconds)
+        if times:
+            times.sort()
+            print(f"{name:>24}: {times[len(times) // 2]:7.2f}s median of {len(times)}")
+        else:
+            print(f"{name:>24}: {error}")
+    if args.service:
+        bench_service(args.port, args.timeout)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--model", default="damo-vilab/text-to-video-ms-1.7b")
+    parser.add_argument("--skip-models", action="store_true", help="Only time the imports")
+    parser.add_argument("--service", action="store_true", help="Also time /health and /ready of a local server")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    main(parser.parse_args())
@@ -0,0 +1,109 @@
+"""
+Local stand-in for the Basic.tech database API.
+
+Implements POST/GET /account/{project_id}/db/{collection} (e.g. prompts
+and video) with in-memory storage, so BasicDB can be exercised without
+network access. Latency can be jittered and a fraction of requests can
+fail with 503 to exercise the client's retries.
+
+    python fake_basic.py --port 8100 --latency-ms 20 --jitter-ms 10 --error-rate 0.01
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeBasicHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so pooled clients can reuse connections
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _collection(self):
+        parts = urlparse(self.path).path.strip("/").split("/")
+        # account/{project_id}/db/{collection}
+        if len(parts) != 4 or parts[0] != "account" or parts[2] != "db":
+            return None
+        return parts[3]
+
+    def _delay(self, method, collection):
+        """Sleep the configured latency; returns False when this request should fail."""
+        server = self.server
+        time.sleep(max(server.latency + random.uniform(-server.jitter, server.jitter), 0.0))
+        with server.lock:
+            key = f"{method} {collection}"
+            server.requests[key] = server.requests.get(key, 0) + 1
+        return random.random() >= server.error_rate
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        collection = self._collection()
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if collection is None:
+            return self._send_json(404, {"error": "not found"})
+        if not self._delay("POST", collection):
+            return self._send_json(503, {"error": "unavailable"})
+        record = {"data": {"id": str(uuid.uuid4()), "value": payload.get("value", {})}}
+        with self.server.lock:
+            self.server.records.setdefault(collection, []).append(record)
+        self._send_json(200, record)
+
+    def do_GET(self):
+        collection = self._collection()
+        if collection is None:
+            return self._send_json(404, {"error": "not found"})
+        query = parse_qs(urlparse(self.path).query)
+        limit = int(query.get("limit", ["10"])[0])
+        offset = int(query.get("offset", ["0"])[0])
+        if not self._delay("GET", collection):
+            return self._send_json(503, {"error": "unavailable"})
+        with self.server.lock:
+            records = list(self.server.records.get(collection, []))
+        self._send_json(200, records[offset:offset + limit])
+
+
+def make_server(port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                error_rate: float = 0.0) -> ThreadingHTTPServer:
+    """Create (but do not start) a fake server. Port 0 picks a free port."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeBasicHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000
+    server.jitter = jitter_ms / 1000
+    server.error_rate = error_rate
+    server.records = {}
+    # "METHOD collection" -> request count
+    server.requests = {}
+    server.lock = threading.Lock()
+    return server
+
+
+def start_in_thread(port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                    error_rate: float = 0.0) -> ThreadingHTTPServer:
+    server = make_server(port, latency_ms, jitter_ms, error_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+    print(f"Fake Basic.tech listening on http://127.0.0.1:{args.port}")
+    make_server(args.port, args.latency_ms, args.jitter_ms, args.error_rate).serve_forever()
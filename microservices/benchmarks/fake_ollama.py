@@ -0,0 +1,125 @@
+"""
+Local stand-in for the Ollama API.
+
+Implements POST /api/chat and POST /api/generate, streamed (NDJSON) or not,
+with a configurable time to first token and token rate, so the services
+can be load tested without a model. When the request carries a JSON schema
+in `format` (as the description service's does), the reply is an object
+with every schema property filled in; otherwise it is plain narration text.
+
+    python fake_ollama.py --port 11434 --first-token-ms 200 --tokens-per-second 40
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILLER = ("A cat in a tiny tuxedo sits at a grand piano and plays with great "
+          "seriousness while the audience of houseplants looks on").split()
+
+
+def reply_text(payload) -> str:
+    schema = payload.get("format")
+    if isinstance(schema, dict):
+        fields = schema.get("properties", {})
+        return json.dumps({name: " ".join(FILLER[:8 + i % 5]) for i, name in enumerate(fields)})
+    if schema == "json":
+        return json.dumps({"response": " ".join(FILLER[:8])})
+    return " ".join(FILLER) + "."
+
+
+def tokens(text: str, chars_per_token: int = 4):
+    """Split text into roughly token-sized pieces."""
+    return [text[i:i + chars_per_token] for i in range(0, len(text), chars_per_token)]
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chunk(self, body):
+        data = json.dumps(body).encode() + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        if self.path not in ("/api/chat", "/api/generate"):
+            return self._send_json(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        chat = self.path == "/api/chat"
+        server = self.server
+        with server.lock:
+            server.requests[self.path] = server.requests.get(self.path, 0) + 1
+
+        pieces = tokens(reply_text(payload))
+        limit = (payload.get("options") or {}).get("num_predict")
+        if limit:
+            pieces = pieces[:limit]
+
+        def message(text, done, **extra):
+            body = {"model": payload.get("model", "fake"), "created_at": "", "done": done, **extra}
+            if chat:
+                body["message"] = {"role": "assistant", "content": text}
+            else:
+                body["response"] = text
+            return body
+
+        start = time.perf_counter()
+        time.sleep(server.first_token)
+        if payload.get("stream", True):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for piece in pieces:
+                self._chunk(message(piece, False))
+                time.sleep(server.token_interval)
+        else:
+            time.sleep(server.token_interval * len(pieces))
+        done = message("" if payload.get("stream", True) else "".join(pieces), True,
+                       done_reason="stop", eval_count=len(pieces),
+                       eval_duration=int((time.perf_counter() - start) * 1e9))
+        if payload.get("stream", True):
+            self._chunk(done)
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self._send_json(200, done)
+
+
+def make_server(port: int = 0, first_token_ms: float = 0.0, tokens_per_second: float = 0.0) -> ThreadingHTTPServer:
+    """Create (but do not start) a fake server. Port 0 picks a free port; 0 tokens/s means no delay."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeOllamaHandler)
+    server.daemon_threads = True
+    server.first_token = first_token_ms / 1000
+    server.token_interval = 1 / tokens_per_second if tokens_per_second > 0 else 0.0
+    server.requests = {}
+    server.lock = threading.Lock()
+    return server
+
+
+def start_in_thread(port: int = 0, first_token_ms: float = 0.0, tokens_per_second: float = 0.0) -> ThreadingHTTPServer:
+    server = make_server(port, first_token_ms, tokens_per_second)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--first-token-ms", type=float, default=200.0)
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    args = parser.parse_args()
+    print(f"Fake Ollama listening on http://127.0.0.1:{args.port}")
+    make_server(args.port, args.first_token_ms, args.tokens_per_second).serve_forever()
@@ -0,0 +1,395 @@
+"""
+End-to-end load test of the description and video-generation services.
+
+Starts local stand-ins for Ollama (fake_ollama.py) and Basic.tech
+(fake_basic.py), a video-generation worker with MODEL_BACKEND=stub (so
+diffusion and TTS are synthetic, but batching, queueing, ffmpeg encoding
+and storage are real), and the description service. It then drives them
+at a fixed concurrency and reports throughput and p50/p95/p99 latency per
+endpoint, plus the CPU time and peak RSS of each service process.
+
+Scenarios (--scenario, repeatable; every client picks them round-robin):
+- describe: POST /generate on the description service, which streams a
+  description from the LLM and queues a video job
+- video: POST /jobs on the worker, then poll GET /jobs/{id} until the job
+  finishes; "video job" is the submit-to-finish latency
+- prompts: GET /get_prompts on the description service
+- videos: GET /videos on the worker (the metadata index)
+
+Results are written as JSON. With --baseline, each endpoint's p95 is
+compared with an earlier run and the exit status is 1 when any regressed
+by more than --tolerance.
+
+    python load_test.py --concurrency 8 --duration 60 --output before.json
+    python load_test.py --concurrency 8 --duration 60 --output after.json --baseline before.json
+
+CPU and RSS are read from /proc, so they are only reported on Linux.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+import fake_basic
+import fake_ollama
+
+MICROSERVICES_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VIDEO_GEN_DIR = os.path.join(MICROSERVICES_DIR, "video-generation")
+DESCRIPTION_DIR = os.path.join(MICROSERVICES_DIR, "video-description-service")
+
+TOPICS = ["cat playing piano", "skateboard fail", "cooking tutorial gone wrong", "dog on a treadmill"]
+TERMINAL_STATES = ("succeeded", "failed")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(q / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, endpoint: str, seconds: float, ok: bool = True) -> None:
+        if ok:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+        else:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies.get(endpoint, []))
+            ms = lambda v: round(v * 1000, 2) if v is not None else None
+            result[endpoint] = {
+                "count": len(values),
+                "errors": self.errors.get(endpoint, 0),
+                "throughput_per_second": round(len(values) / elapsed, 3) if elapsed else None,
+                "mean_ms": ms(sum(values) / len(values)) if values else None,
+                "p50_ms": ms(percentile(values, 50)),
+                "p95_ms": ms(percentile(values, 95)),
+                "p99_ms": ms(percentile(values, 99)),
+                "max_ms": ms(values[-1]) if values else None,
+            }
+        return result
+
+
+class ProcessSampler:
+    """CPU time and RSS of a process, from /proc; peak RSS is sampled in a thread."""
+
+    def __init__(self, pid: int, interval: float = 0.2):
+        self.pid = pid
+        self.interval = interval
+        self.rss_peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._cpu_start = None
+        self._wall_start = None
+
+    def cpu_seconds(self) -> Optional[float]:
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                # Fields after the command name; utime and stime are 14th and 15th overall
+                fields = f.read().rsplit(")", 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def rss(self) -> Optional[int]:
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = self.rss()
+            if rss:
+                self.rss_peak = max(self.rss_peak, rss)
+
+    def start(self) -> None:
+        self._cpu_start = self.cpu_seconds()
+        self._wall_start = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop.set()
+        self._thread.join()
+        cpu_end = self.cpu_seconds()
+        wall = time.perf_counter() - self._wall_start
+        cpu = cpu_end - self._cpu_start if cpu_end is not None and self._cpu_start is not None else None
+        rss = self.rss()
+        return {
+            "cpu_seconds": round(cpu, 3) if cpu is not None else None,
+            "cpu_percent": round(100 * cpu / wall, 1) if cpu is not None and wall else None,
+            "rss_peak_mb": round(self.rss_peak / 2**20, 1) if self.rss_peak else None,
+            "rss_end_mb": round(rss / 2**20, 1) if rss else None,
+        }
+
+
+def spawn(name: str, cwd: str, module: str, port: int, env: Dict[str, str], log_dir: str) -> subprocess.Popen:
+    log = open(os.path.join(log_dir, f"{name}.log"), "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with status {process.returncode} before becoming ready")
+        try:
+            if (await client.get(url)).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} not ready within {timeout}s")
+
+
+async def timed(recorder: LatencyRecorder, endpoint: str, request) -> Optional[httpx.Response]:
+    start = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError:
+        recorder.record(endpoint, 0.0, ok=False)
+        return None
+    recorder.record(endpoint, time.perf_counter() - start, ok=response.status_code < 400)
+    return response
+
+
+async def describe(client, urls, recorder, i, args):
+    await timed(recorder, "POST /generate (description)",
+                client.post(f"{urls['description']}/generate", json={"topic": TOPICS[i % len(TOPICS)]}))
+
+
+async def video(client, urls, recorder, i, args):
+    payload = {
+        "prompt": f"{TOPICS[i % len(TOPICS)]} #{i}",
+        "num_inference_steps": args.steps,
+        "num_frames": args.frames,
+        "add_audio": not args.no_audio,
+    }
+    if args.seeded:
+        # Repeats hit the render cache
+        payload["seed"] = i % len(TOPICS)
+    start = time.perf_counter()
+    response = await timed(recorder, "POST /jobs", client.post(f"{urls['video']}/jobs", json=payload))
+    if response is None or response.status_code >= 400:
+        return
+    job_id = response.json()["job_id"]
+    while True:
+        await asyncio.sleep(args.poll_seconds)
+        response = await timed(recorder, "GET /jobs/{job_id}", client.get(f"{urls['video']}/jobs/{job_id}"))
+        if response is None or response.status_code >= 400:
+            recorder.record("video job", 0.0, ok=False)
+            return
+        state = response.json()["state"]
+        if state in TERMINAL_STATES:
+            recorder.record("video job", time.perf_counter() - start, ok=state == "succeeded")
+            return
+
+
+async def prompts(client, urls, recorder, i, args):
+    await timed(recorder, "GET /get_prompts", client.get(f"{urls['description']}/get_prompts", params={"limit": 10}))
+
+
+async def videos(client, urls, recorder, i, args):
+    await timed(recorder, "GET /videos", client.get(f"{urls['video']}/videos", params={"limit": 10}))
+
+
+SCENARIOS = {"describe": describe, "video": video, "prompts": prompts, "videos": videos}
+
+
+async def drive(urls: Dict[str, str], args) -> Tuple[LatencyRecorder, float]:
+    recorder = LatencyRecorder()
+    scenarios = [SCENARIOS[name] for name in args.scenario]
+    counter = itertools.count()
+    deadline = time.perf_counter() + args.duration
+
+    async def client_loop(client):
+        while True:
+            i = next(counter)
+            if (args.requests and i >= args.requests) or (not args.requests and time.perf_counter() >= deadline):
+                return
+            await scenarios[i % len(scenarios)](client, urls, recorder, i, args)
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(timeout=args.request_timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(args.concurrency)))
+        return recorder, time.perf_counter() - start
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print p95 changes per endpoint; returns the endpoints that regressed."""
+    regressed = []
+    print(f"\n{'endpoint':<32} {'base p95':>10} {'p95':>10} {'change':>8}")
+    for endpoint, current in results["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(endpoint)
+        if not before or not before.get("p95_ms") or current["p95_ms"] is None:
+            continue
+        change = current["p95_ms"] / before["p95_ms"] - 1
+        flag = ""
+        if change > tolerance:
+            regressed.append(endpoint)
+            flag = "  REGRESSED"
+        print(f"{endpoint:<32} {before['p95_ms']:>10.1f} {current['p95_ms']:>10.1f} {change:>+8.1%}{flag}")
+    return regressed
+
+
+async def main(args) -> int:
+    state_dir = tempfile.mkdtemp(prefix="braas-load-")
+    ollama = fake_ollama.start_in_thread(first_token_ms=args.llm_first_token_ms,
+                                         tokens_per_second=args.llm_tokens_per_second)
+    basic = fake_basic.start_in_thread(latency_ms=args.db_latency_ms, jitter_ms=args.db_jitter_ms,
+                                       error_rate=args.db_error_rate)
+    common_env = {
+        **os.environ,
+        "PYTHONPATH": MICROSERVICES_DIR,
+        "OLLAMA_HOST": f"http://127.0.0.1:{ollama.server_port}",
+        "BASIC_API_URL": f"http://127.0.0.1:{basic.server_port}",
+        "BASIC_PROJECT_ID": "load-test",
+        "BASIC_API_KEY": "load-test",
+        "BASIC_JWT": "load-test",
+    }
+    urls = {
+        "video": f"http://127.0.0.1:{args.video_port}",
+        "description": f"http://127.0.0.1:{args.description_port}",
+    }
+    processes = {
+        "video-generation": spawn("video-generation", VIDEO_GEN_DIR, "video-gen", args.video_port, {
+            **common_env,
+            "MODEL_BACKEND": "stub",
+            "IO_MODE": args.io_mode,
+            "JOBS_DB_PATH": os.path.join(state_dir, "jobs.sqlite3"),
+            "RENDER_CACHE_PATH": os.path.join(state_dir, "render_cache.sqlite3"),
+            "BASIC_WRITE_JOURNAL": os.path.join(state_dir, "video_write_journal.jsonl"),
+            "OUTPUT_DIR": os.path.join(state_dir, "output"),
+            "BLOB_STORE_PATH": os.path.join(state_dir, "blobs"),
+            "VIDEO_INDEX_PATH": os.path.join(state_dir, "video_index.sqlite3"),
+        }, state_dir),
+        "video-description": spawn("video-description", DESCRIPTION_DIR, "app", args.description_port, {
+            **common_env,
+            "VIDEO_SERVICE_URL": urls["video"],
+            "FEED_WARMER_ENABLED": "false",
+            "DESCRIPTION_CACHE_ENABLED": "true" if args.description_cache else "false",
+            "BASIC_WRITE_JOURNAL": os.path.join(state_dir, "description_write_journal.jsonl"),
+        }, state_dir),
+    }
+
+    try:
+        async with httpx.AsyncClient(timeout=2) as client:
+            await wait_ready(client, f"{urls['video']}/ready", processes["video-generation"], args.startup_timeout)
+            await wait_ready(client, f"{urls['description']}/metrics", processes["video-description"],
+                             args.startup_timeout)
+
+        samplers = {name: ProcessSampler(p.pid) for name, p in processes.items()}
+        for sampler in samplers.values():
+            sampler.start()
+        recorder, elapsed = await drive(urls, args)
+        process_stats = {name: sampler.stop() for name, sampler in samplers.items()}
+    except RuntimeError as e:
+        print(f"{str(e)}; service logs are in {state_dir}")
+        return 2
+    finally:
+        for p in processes.values():
+            p.terminate()
+        for p in processes.values():
+            try:
+                p.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        ollama.shutdown()
+        basic.shutdown()
+
+    results = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "host": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "elapsed_seconds": round(elapsed, 3),
+        "endpoints": recorder.summary(elapsed),
+        "processes": process_stats,
+        "upstream_requests": {"ollama": dict(ollama.requests), "basic": dict(basic.requests)},
+    }
+
+    print(f"{'endpoint':<32} {'count':>6} {'err':>4} {'req/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, s in results["endpoints"].items():
+        fmt = lambda v: f"{v:9.1f}" if v is not None else f"{'-':>9}"
+        print(f"{endpoint:<32} {s['count']:>6} {s['errors']:>4} {s['throughput_per_second']:>7.2f} "
+              f"{fmt(s['p50_ms'])} {fmt(s['p95_ms'])} {fmt(s['p99_ms'])}")
+    for name, s in process_stats.items():
+        print(f"{name:<32} cpu {s['cpu_seconds']}s ({s['cpu_percent']}%), rss peak {s['rss_peak_mb']} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressed = compare(results, json.load(f), args.tolerance)
+        if regressed:
+            print(f"p95 regressed by more than {args.tolerance:.0%}: {', '.join(regressed)}")
+            status = 1
+
+    if not args.keep_state:
+        shutil.rmtree(state_dir, ignore_errors=True)
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Repeat to mix scenarios (default: describe and video)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run, unless --requests is set")
+    parser.add_argument("--requests", type=int, default=0, help="Total scenario runs instead of a duration")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 increase over the baseline")
+    parser.add_argument("--steps", type=int, default=5, help="Inference steps per video job")
+    parser.add_argument("--frames", type=int, default=16, help="Frames per video job")
+    parser.add_argument("--no-audio", action="store_true", help="Video jobs without narration")
+    parser.add_argument("--seeded", action="store_true", help="Seed video jobs so repeats hit the render cache")
+    parser.add_argument("--io-mode", choices=("memory", "disk"), default="memory")
+    parser.add_argument("--description-cache", action="store_true", help="Let the description cache answer repeats")
+    parser.add_argument("--llm-first-token-ms", type=float, default=200.0)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--db-latency-ms", type=float, default=20.0)
+    parser.add_argument("--db-jitter-ms", type=float, default=5.0)
+    parser.add_argument("--db-error-rate", type=float, default=0.0)
+    parser.add_argument("--poll-seconds", type=float, default=0.25)
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--video-port", type=int, default=8011)
+    parser.add_argument("--description-port", type=int, default=8012)
+    parser.add_argument("--keep-state", action="store_true", help="Keep databases, blobs and service logs")
+    args = parser.parse_args()
+    args.scenario = args.scenario or ["describe", "video"]
+    sys.exit(asyncio.run(main(args)))
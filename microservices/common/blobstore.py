@@ -0,0 +1,214 @@
+"""
+Content-addressed blob storage for generated videos.
+
+Blobs are keyed by the SHA-256 of their bytes and written in fixed-size
+chunks, so a video is never held in memory as a whole. Two backends are
+provided: the local filesystem and any S3-compatible service (AWS, MinIO).
+"""
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Iterable, Iterator, Optional, Tuple
+
+from pydantic import BaseModel
+
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_CONTENT_TYPE = "video/mp4"
+
+
+class BlobRef(BaseModel):
+    """Reference to a stored blob"""
+    key: str
+    size: int
+
+
+def iter_file_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def hash_file(path: str) -> Tuple[str, int]:
+    """Return the (sha256 hex digest, size) of a file, read in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter_file_chunks(path):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+class BlobStore(ABC):
+    backend: str
+
+    @abstractmethod
+    def put_file(self, path: str, content_type: str = DEFAULT_CONTENT_TYPE) -> BlobRef:
+        """Store the file at `path`."""
+
+    @abstractmethod
+    def put_stream(self, chunks: Iterable[bytes], content_type: str = DEFAULT_CONTENT_TYPE) -> BlobRef:
+        """Store a blob from an iterable of byte chunks."""
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Open a stored blob for reading."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Whether a blob with this key is stored."""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of the blob, if the backend keeps one."""
+        return None
+
+    def url(self, key: str, expires_in: int = 3600) -> Optional[str]:
+        """A URL the blob can be fetched from directly, if the backend offers one."""
+        return None
+
+
+class LocalBlobStore(BlobStore):
+    backend = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+        self._tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self._tmp_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        # Fan out by key prefix so no single directory grows unbounded
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    # Local blobs are served by the stream endpoint, which sniffs their type
+    def put_file(self, path: str, content_type: str = DEFAULT_CONTENT_TYPE) -> BlobRef:
+        return self.put_stream(iter_file_chunks(path))
+
+    def put_stream(self, chunks: Iterable[bytes], content_type: str = DEFAULT_CONTENT_TYPE) -> BlobRef:
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            key = digest.hexdigest()
+            final_path = self._path(key)
+            if os.path.exists(final_path):
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return BlobRef(key=key, size=size)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self._path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def local_path(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        return path if os.path.exists(path) else None
+
+
+class S3BlobStore(BlobStore):
+    backend = "s3"
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 spool_max_bytes: int = 64 * CHUNK_SIZE):
+        """
+        Args:
+            bucket: Bucket to store blobs in.
+            prefix: Key prefix inside the bucket.
+            endpoint_url: Custom endpoint for S3-compatible services such as MinIO.
+                Credentials come from the standard AWS environment/config chain.
+            spool_max_bytes: Streamed blobs are buffered in memory up to this
+                size before spilling to a temporary file.
+        """
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.spool_max_bytes = spool_max_bytes
+        self._client = boto3.client("s3", endpoint_url=endpoint_url)
+        # Upload large blobs as multipart parts rather than one large PUT body
+        self._transfer_config = TransferConfig(multipart_threshold=8 * CHUNK_SIZE,
+                                               multipart_chunksize=8 * CHUNK_SIZE)
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def put_file(self, path: str, content_type: str = DEFAULT_CONTENT_TYPE) -> BlobRef:
+        key, size = hash_file(path)
+        if not self.exists(key):
+            self._client.upload_file(path, self.bucket, self._object_key(key),
+                                     ExtraArgs={"ContentType": content_type},
+                                     Config=self._transfer_config)
+        return BlobRef(key=key, size=size)
+
+    def put_stream(self, chunks: Iterable[bytes], content_type: str = DEFAULT_CONTENT_TYPE) -> BlobRef:
+        # The key is only known once every chunk has been hashed, so spool
+        # (in memory for small blobs, on disk beyond that) before uploading.
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.SpooledTemporaryFile(max_size=self.spool_max_bytes) as spool:
+            for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                spool.write(chunk)
+            key = digest.hexdigest()
+            if not self.exists(key):
+                spool.seek(0)
+                self._client.upload_fileobj(spool, self.bucket, self._object_key(key),
+                                            ExtraArgs={"ContentType": content_type},
+                                            Config=self._transfer_config)
+        return BlobRef(key=key, size=size)
+
+    def open(self, key: str) -> BinaryIO:
+        return self._client.get_object(Bucket=self.bucket, Key=self._object_key(key))["Body"]
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def url(self, key: str, expires_in: int = 3600) -> Optional[str]:
+        return self._client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._object_key(key)},
+            ExpiresIn=expires_in,
+        )
+
+
+def get_blob_store() -> BlobStore:
+    """
+    Build the blob store selected by the BLOB_STORE environment variable
+    ("local", the default, or "s3").
+    """
+    backend = os.getenv("BLOB_STORE", "local")
+    if backend == "local":
+        return LocalBlobStore(os.getenv("BLOB_STORE_PATH", "blobs"))
+    if backend == "s3":
+        bucket = os.getenv("S3_BUCKET")
+        if not bucket:
+            raise RuntimeError("S3_BUCKET must be set when BLOB_STORE=s3")
+        return S3BlobStore(bucket, prefix=os.getenv("S3_PREFIX", ""),
+                           endpoint_url=os.getenv("S3_ENDPOINT_URL"),
+                           spool_max_bytes=int(os.getenv("BLOB_SPOOL_MAX_BYTES", str(64 * CHUNK_SIZE))))
+    raise RuntimeError(f"Unknown BLOB_STORE backend: {backend}")
@@ -0,0 +1,26 @@
+"""
+Opaque page cursors shared by the paginated listings.
+
+A cursor is URL-safe base64 of compact JSON, without padding. Callers
+decide the fields; decoding validates that the cursor is a JSON object.
+"""
+import base64
+import json
+from typing import Any, Dict
+
+
+def encode_cursor(fields: Dict[str, Any]) -> str:
+    raw = json.dumps(fields, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        fields = json.loads(raw)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(fields, dict):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return fields
@@ -1,17 +1,80 @@
-from typing import Dict, Any, Tuple, List
-import requests
+from typing import Dict, Any, Tuple, List, Optional
+import asyncio
+import itertools
+import random
+import httpx
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import HTTPException
 import os
 import json
 from pathlib import Path
+from .cache import TTLCache
+from . import cursors, log, metrics
 from .models import (
-    PromptCreate, PromptResponse, PromptData, PromptBase,
+    PromptCreate, PromptResponse, PromptData, PromptBase, PromptPage,
     VideoCreate, VideoResponse, VideoData, VideoBase
 )
 import logging
 
 logger = logging.getLogger(__name__)
 
+basic_request_seconds = metrics.REGISTRY.histogram(
+    "basic_request_seconds", "Basic.tech API latency per request, including retries", ["method", "collection"]
+)
+basic_retries = metrics.REGISTRY.counter(
+    "basic_retries_total", "Basic.tech requests retried", ["reason"]
+)
+basic_dead_letters = metrics.REGISTRY.counter(
+    "basic_write_dead_letters_total", "Buffered writes Basic.tech rejected for good", ["collection", "status"]
+)
+
+# Connection pool, timeout and retry settings for the Basic.tech client
+BASIC_API_URL = os.getenv("BASIC_API_URL", "https://api.basic.tech")
+BASIC_POOL_MAX_CONNECTIONS = int(os.getenv("BASIC_POOL_MAX_CONNECTIONS", "20"))
+BASIC_POOL_MAX_KEEPALIVE = int(os.getenv("BASIC_POOL_MAX_KEEPALIVE", "10"))
+BASIC_CONNECT_TIMEOUT = float(os.getenv("BASIC_CONNECT_TIMEOUT", "5"))
+BASIC_READ_TIMEOUT = float(os.getenv("BASIC_READ_TIMEOUT", "30"))
+BASIC_MAX_RETRIES = int(os.getenv("BASIC_MAX_RETRIES", "3"))
+BASIC_RETRY_BACKOFF = float(os.getenv("BASIC_RETRY_BACKOFF", "0.5"))
+
+# Read-through cache for prompt pages
+BASIC_PROMPT_CACHE_SIZE = int(os.getenv("BASIC_PROMPT_CACHE_SIZE", "256"))
+BASIC_PROMPT_CACHE_TTL = float(os.getenv("BASIC_PROMPT_CACHE_TTL", "30"))
+
+# Write-behind buffer settings
+BASIC_WRITE_BATCH_SIZE = int(os.getenv("BASIC_WRITE_BATCH_SIZE", "20"))
+BASIC_WRITE_FLUSH_SECONDS = float(os.getenv("BASIC_WRITE_FLUSH_SECONDS", "1.0"))
+BASIC_WRITE_JOURNAL = os.getenv("BASIC_WRITE_JOURNAL", "basic_write_journal.jsonl")
+# Backoff before retrying a record whose write failed, doubling per attempt
+BASIC_WRITE_RETRY_BACKOFF = float(os.getenv("BASIC_WRITE_RETRY_BACKOFF", "2.0"))
+BASIC_WRITE_RETRY_MAX_BACKOFF = float(os.getenv("BASIC_WRITE_RETRY_MAX_BACKOFF", "300"))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _error_text(e: httpx.HTTPError) -> str:
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.text
+    return str(e)
+
+def encode_cursor(offset: int, after_id: str) -> str:
+    """Opaque page cursor: the position reached and the id of the last record returned."""
+    return cursors.encode_cursor({"o": offset, "id": after_id})
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """Raises ValueError for a malformed cursor."""
+    fields = cursors.decode_cursor(cursor)
+    try:
+        return int(fields["o"]), str(fields["id"])
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
 class BasicDB:
     @staticmethod
     def _load_credentials() -> Tuple[str, str, str]:
@@ -47,11 +110,73 @@ class BasicDB:
     def __init__(self):
         # Load credentials using the helper function
         self.project_id, self.api_key, self.jwt = self._load_credentials()
-        self.base_url = f"https://api.basic.tech/account/{self.project_id}/db"
+        self.base_url = f"{BASIC_API_URL}/account/{self.project_id}/db"
         self.headers = {
             "Authorization": f"Bearer {self.jwt}",
             "Content-Type": "application/json"
         }
+        self._client: Optional[httpx.AsyncClient] = None
+        # Prompt pages keyed by (limit, cursor); cleared whenever a prompt is written
+        self.prompt_cache = TTLCache(maxsize=BASIC_PROMPT_CACHE_SIZE, ttl=BASIC_PROMPT_CACHE_TTL)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared keep-alive connection pool, created on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                http2=_http2_available(),
+                limits=httpx.Limits(
+                    max_connections=BASIC_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=BASIC_POOL_MAX_KEEPALIVE
+                ),
+                timeout=httpx.Timeout(BASIC_READ_TIMEOUT, connect=BASIC_CONNECT_TIMEOUT)
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the connection pool. Wire this to the app's shutdown."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying transport errors, 429 and 5xx responses with
+        jittered exponential backoff. Raises httpx.HTTPError once retries run out.
+        """
+        collection = url.rstrip("/").rsplit("/", 1)[-1].split("?", 1)[0]
+        with basic_request_seconds.time(method=method, collection=collection):
+            return await self._request_with_retries(method, url, **kwargs)
+
+    async def _request_with_retries(self, method: str, url: str, **kwargs) -> httpx.Response:
+        for attempt in range(BASIC_MAX_RETRIES + 1):
+            retry_after = None
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == BASIC_MAX_RETRIES:
+                    response.raise_for_status()
+                    return response
+                retry_after = response.headers.get("Retry-After")
+                basic_retries.inc(reason=str(response.status_code))
+                logger.warning("Basic.tech returned %s, retrying (%d/%d)", response.status_code, attempt + 1, BASIC_MAX_RETRIES)
+            except httpx.TransportError as e:
+                if attempt == BASIC_MAX_RETRIES:
+                    raise
+                basic_retries.inc(reason="transport")
+                logger.warning("Basic.tech request failed: %s, retrying (%d/%d)", e, attempt + 1, BASIC_MAX_RETRIES)
+
+            delay = BASIC_RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            await asyncio.sleep(delay)
+
+    async def insert(self, collection: str, value: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a raw record into a collection and return the API response."""
+        response = await self._request("POST", f"{self.base_url}/{collection}", json={"value": value})
+        if collection == "prompts":
+            self.prompt_cache.invalidate()
+        return response.json()
 
     async def store_prompt(self, prompt_data: PromptCreate) -> PromptBase:
         """Store a prompt in the Basic.tech database."""
@@ -59,122 +184,407 @@ class BasicDB:
         payload = {"value": prompt_data.model_dump()}
         
         try:
-            logger.info(f"Sending request to Basic.tech API with payload: {json.dumps(payload, indent=2)}")
-            response = requests.post(url, json=payload, headers=self.headers)
-            response.raise_for_status()
+            logger.debug("Sending prompt to Basic.tech: %s", log.summary(payload))
+            response = await self._request("POST", url, json=payload)
             response_json = response.json()
-            logger.info(f"Raw Basic.tech API Response: {json.dumps(response_json, indent=2)}")
+            logger.debug("Basic.tech response: %s", log.summary(response_json))
             
-            # Try to parse the response and log each step
             try:
                 prompt_response = PromptResponse(**response_json)
-                logger.info(f"Parsed PromptResponse: {prompt_response.model_dump_json(indent=2)}")
-                prompt_data = prompt_response.data
-                logger.info(f"Parsed PromptData: {prompt_data.model_dump_json(indent=2)}")
-                prompt_value = prompt_data.value
-                logger.info(f"Parsed PromptBase: {prompt_value.model_dump_json(indent=2)}")
+                prompt_value = prompt_response.data.value
+                self.prompt_cache.invalidate()
+                logger.info("Stored prompt %s", prompt_response.data.id)
                 return prompt_value
             except Exception as e:
-                logger.error(f"Error during response parsing: {str(e)}")
-                logger.error(f"Response structure: {type(response_json)}")
-                if isinstance(response_json, dict):
-                    logger.error(f"Response keys: {list(response_json.keys())}")
+                logger.error("Error during response parsing: %s; response: %s", e, log.summary(response_json))
                 raise
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API Error Response: {e.response.text if hasattr(e, 'response') else str(e)}")
+        except httpx.HTTPError as e:
+            logger.error("API Error Response: %s", log.summary(_error_text(e)))
             raise HTTPException(status_code=500, detail=f"Failed to store prompt in database: {str(e)}")
         except Exception as e:
-            logger.error(f"Validation Error: {str(e)}")
+            logger.error("Validation Error: %s", e)
             raise HTTPException(status_code=500, detail=f"Failed to process response: {str(e)}")
 
     async def store_video(self, video_data: VideoCreate) -> VideoBase:
         """Store a video in the Basic.tech database."""
         url = f"{self.base_url}/video"
-        payload = {"value": video_data.model_dump()}
+        # Records reference the blob store; unset fields (e.g. content) are not sent
+        payload = {"value": video_data.model_dump(exclude_none=True)}
         
         try:
-            response = requests.post(url, json=payload, headers=self.headers)
-            response.raise_for_status()
+            response = await self._request("POST", url, json=payload)
             response_json = response.json()
-            logger.info(f"Basic.tech API Response: {json.dumps(response_json, indent=2)}")
+            logger.debug("Basic.tech response: %s", log.summary(response_json))
             return VideoResponse(**response_json).data.value
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API Error Response: {e.response.text if hasattr(e, 'response') else str(e)}")
+        except httpx.HTTPError as e:
+            logger.error("API Error Response: %s", log.summary(_error_text(e)))
             raise HTTPException(status_code=500, detail=f"Failed to store video in database: {str(e)}")
         except Exception as e:
-            logger.error(f"Validation Error: {str(e)}")
+            logger.error("Validation Error: %s", e)
             raise HTTPException(status_code=500, detail=f"Failed to process response: {str(e)}")
 
-    async def get_prompts(self, limit: int = 10) -> List[PromptBase]:
-        """Retrieve prompts from the Basic.tech database."""
-        url = f"{self.base_url}/prompts"
-        params = {"limit": limit}
-        
+    async def get_prompts(self, limit: int = 10, cursor: Optional[str] = None) -> PromptPage:
+        """
+        Retrieve a page of prompts from the Basic.tech database.
+
+        Pages are read through an in-process cache that is cleared whenever a
+        prompt is written. Pass the returned `next_cursor` to get the next page.
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        cache_key = (limit, cursor)
+        page = self.prompt_cache.get(cache_key)
+        if page is not None:
+            return page
+
+        offset, after_id = decode_cursor(cursor) if cursor else (0, None)
+        # Re-read the last record already returned so we can tell whether
+        # records were inserted or removed ahead of the cursor since then
+        start = max(0, offset - 1)
+
         try:
-            response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            logger.info(f"Basic.tech API Response: {json.dumps(data, indent=2)}")
-            
-            # Check if data is a list
-            if not isinstance(data, list):
-                logger.error(f"Expected list response, got {type(data)}")
-                raise ValueError(f"Unexpected response format: {data}")
-            
-            prompts = []
-            for item in data:
-                try:
-                    # Ensure item is a dictionary
-                    if not isinstance(item, dict):
-                        logger.warning(f"Skipping non-dict item: {item}")
-                        continue
-                        
-                    # Create PromptResponse object
-                    prompt_response = PromptResponse(data=PromptData(
-                        id=item.get("id", ""),
-                        value=PromptBase(
-                            topic=item["data"]["value"]["topic"],
-                            output=item["data"]["value"]["output"],
-                            top_text=item["data"]["value"]["top_text"],
-                            bottom_text=item["data"]["value"]["bottom_text"],
-                            metadata=item["data"]["value"].get("metadata", {})
-                        )
-                    ))
-                    prompts.append(prompt_response.data.value)
-                except KeyError as ke:
-                    logger.error(f"Missing required field in item: {ke}")
-                    logger.debug(f"Problem item: {json.dumps(item, indent=2)}")
-                    continue
-                except Exception as e:
-                    logger.error(f"Error processing item: {str(e)}")
-                    logger.debug(f"Problem item: {json.dumps(item, indent=2)}")
-                    continue
-            
-            return prompts
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API Error Response: {e.response.text if hasattr(e, 'response') else str(e)}")
+            records, end, exhausted = await self._fetch_prompts(start, limit + 2)
+
+            # Drop everything up to and including the last record already returned
+            if after_id is not None:
+                seen = next((i for i, (_, record) in enumerate(records) if record.id == after_id), None)
+                if seen is not None:
+                    records = records[seen + 1:]
+                elif records and records[0][0] < offset:
+                    records = records[1:]
+
+            # Inserts ahead of the cursor shift the anchor into the window, so
+            # read on until one record past the page shows whether more follow
+            while len(records) <= limit and not exhausted:
+                more, end, exhausted = await self._fetch_prompts(end, limit + 1 - len(records))
+                records.extend(more)
+
+            taken = records[:limit]
+            next_cursor = None
+            if len(records) > limit and taken:
+                last_position, last_record = taken[-1]
+                next_cursor = encode_cursor(last_position + 1, last_record.id)
+
+            page = PromptPage(
+                items=[PromptResponse(data=record) for _, record in taken],
+                next_cursor=next_cursor
+            )
+            self.prompt_cache.set(cache_key, page)
+            return page
+        except httpx.HTTPError as e:
+            logger.error("API Error Response: %s", log.summary(_error_text(e)))
             raise HTTPException(status_code=500, detail=f"Failed to retrieve prompts from database: {str(e)}")
         except Exception as e:
-            logger.error(f"Validation Error: {str(e)}")
+            logger.error("Validation Error: %s", e)
             raise HTTPException(status_code=500, detail=f"Failed to process response: {str(e)}")
 
+    async def _fetch_prompts(self, start: int, limit: int) -> Tuple[List[Tuple[int, PromptData]], int, bool]:
+        """
+        Read up to `limit` raw prompt records from position `start`.
+
+        Returns the valid records with their positions, the position after
+        the last record read, and whether the collection ended within the read.
+        """
+        url = f"{self.base_url}/prompts"
+        params = {"limit": limit, "offset": start}
+        response = await self._request("GET", url, params=params)
+        data = response.json()
+        logger.debug("Basic.tech returned %d prompt records", len(data) if isinstance(data, list) else 0)
+
+        # Check if data is a list
+        if not isinstance(data, list):
+            logger.error(f"Expected list response, got {type(data)}")
+            raise ValueError(f"Unexpected response format: {log.summary(data)}")
+
+        records = []
+        for position, item in enumerate(data, start=start):
+            try:
+                # Ensure item is a dictionary
+                if not isinstance(item, dict):
+                    logger.warning("Skipping non-dict item: %s", log.summary(item))
+                    continue
+
+                value = item["data"]["value"]
+                record = PromptData(
+                    id=item.get("id") or item["data"].get("id", ""),
+                    value=PromptBase(
+                        topic=value["topic"],
+                        output=value["output"],
+                        top_text=value["top_text"],
+                        bottom_text=value["bottom_text"],
+                        metadata=value.get("metadata", {})
+                    )
+                )
+                records.append((position, record))
+            except KeyError as ke:
+                logger.error("Missing required field in item: %s", ke)
+                logger.debug("Problem item: %s", log.summary(item))
+                continue
+            except Exception as e:
+                logger.error("Error processing item: %s", e)
+                logger.debug("Problem item: %s", log.summary(item))
+                continue
+        return records, start + len(data), len(data) < limit
+
     async def get_videos(self, limit: int = 10) -> List[VideoBase]:
-        """Retrieve videos from the Basic.tech database."""
+        """
+        Retrieve full video records from the Basic.tech database.
+
+        Legacy records carry the whole video inline, so this can move
+        megabytes; list videos from common.video_index instead.
+        """
         url = f"{self.base_url}/video"
         params = {"limit": limit}
         
         try:
-            response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
+            response = await self._request("GET", url, params=params)
             data = response.json()
-            logger.info(f"Basic.tech API Response: {json.dumps(data, indent=2)}")
+            # Only the size: the records may hold base64 video bodies
+            logger.info("Basic.tech returned %d video records (%d bytes)", len(data), len(response.content))
             return [VideoResponse(**item).data.value for item in data]
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API Error Response: {e.response.text if hasattr(e, 'response') else str(e)}")
+        except httpx.HTTPError as e:
+            logger.error("API Error Response: %s", log.summary(_error_text(e)))
             raise HTTPException(status_code=500, detail=f"Failed to retrieve videos from database: {str(e)}")
         except Exception as e:
-            logger.error(f"Validation Error: {str(e)}")
+            logger.error("Validation Error: %s", e)
             raise HTTPException(status_code=500, detail=f"Failed to process response: {str(e)}")
 
-# Create a singleton instance
-db = BasicDB() 
\ No newline at end of file
+def _rejected(error: BaseException) -> bool:
+    """Whether Basic.tech refused a write in a way retrying cannot fix."""
+    if not isinstance(error, httpx.HTTPStatusError):
+        return False
+    status = error.response.status_code
+    return 400 <= status < 500 and status not in (408, 429)
+
+class WriteBehindBuffer:
+    """
+    Acknowledges prompt and video writes immediately and sends them to
+    Basic.tech in the background, in batches bounded by size and time.
+
+    Every record is appended to a local JSON-lines journal as it is enqueued,
+    and the journal is trimmed once Basic.tech has it, so records survive a
+    crash or a cancelled flush. Journal appends and trims run in order on a
+    single writer thread, so a request never waits on disk. Records whose
+    write fails are retried with exponential backoff and stay in the
+    journal, which is replayed the next time the buffer starts. Records
+    Basic.tech rejects outright (a 4xx other than 408 or 429) would fail the
+    same way forever, so they are moved to a `.dead` JSON-lines file next to
+    the journal instead. Delivery is at least once.
+    """
+
+    def __init__(self, db: BasicDB, journal_path: str = BASIC_WRITE_JOURNAL,
+                 batch_size: int = BASIC_WRITE_BATCH_SIZE,
+                 flush_interval: float = BASIC_WRITE_FLUSH_SECONDS,
+                 retry_backoff: float = BASIC_WRITE_RETRY_BACKOFF,
+                 retry_max_backoff: float = BASIC_WRITE_RETRY_MAX_BACKOFF):
+        self.db = db
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_backoff = retry_backoff
+        self.retry_max_backoff = retry_max_backoff
+        # Sequence numbers of records to send; the records are in _unacked
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        # Journaled records not yet written to Basic.tech, by sequence number
+        self._unacked: Dict[int, Dict[str, Any]] = {}
+        # Failed records waiting out their backoff, and their attempt counts
+        self._retries: Dict[int, asyncio.TimerHandle] = {}
+        self._attempts: Dict[int, int] = {}
+        self._seq = itertools.count()
+        # Owns the journal file: appends and trims run on it in submission order
+        self._journal_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="basic-journal")
+        self._journal_file = None
+
+    def enqueue_prompt(self, prompt_data: PromptCreate) -> None:
+        self._enqueue("prompts", prompt_data.model_dump())
+
+    def enqueue_video(self, video_data: VideoCreate) -> None:
+        self._enqueue("video", video_data.model_dump(exclude_none=True))
+
+    def _enqueue(self, collection: str, value: Dict[str, Any]) -> None:
+        seq = next(self._seq)
+        record = {"seq": seq, "collection": collection, "value": value}
+        self._unacked[seq] = record
+        self._journal_writer.submit(self._append_journal, record)
+        self._queue.put_nowait(seq)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def journaled(self) -> None:
+        """Wait until every record enqueued so far has reached the journal."""
+        await asyncio.get_running_loop().run_in_executor(self._journal_writer, lambda: None)
+
+    async def start(self) -> None:
+        """Replay journaled records from a previous run and start flushing."""
+        await self.replay_journal()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def replay_journal(self) -> None:
+        """
+        Queue the records a previous run journaled but never wrote. Call before
+        enqueuing anything. The journal is rewritten in place with the replayed
+        records, so a crash mid-replay loses nothing.
+        """
+        if not os.path.exists(self.journal_path):
+            return
+
+        records = await asyncio.to_thread(self._read_journal, self.journal_path)
+        for record in records:
+            seq = next(self._seq)
+            self._unacked[seq] = {"seq": seq, "collection": record["collection"], "value": record["value"]}
+        await self._compact_journal()
+
+        logger.info("Replaying %d journaled Basic.tech writes", len(records))
+        for seq in list(self._unacked):
+            self._queue.put_nowait(seq)
+
+    async def stop(self) -> None:
+        """
+        Stop the background flusher and flush whatever is still queued,
+        including a batch the flusher was collecting or sending.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        # Records backing off after a failure stay journaled for the next start
+        for handle in self._retries.values():
+            handle.cancel()
+        remaining = [seq for seq in self._unacked if seq not in self._retries]
+        self._retries.clear()
+        for start in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[start:start + self.batch_size])
+        # No flusher is left to pick up retries of the final flush
+        for handle in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        await self.journaled()
+        await asyncio.get_running_loop().run_in_executor(self._journal_writer, self._close_journal)
+
+    async def _flush_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # Cancelled anywhere in here, the batch is still journaled and unacked
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[int]) -> None:
+        records = [self._unacked[seq] for seq in batch if seq in self._unacked]
+        if not records:
+            return
+        # Basic.tech has no bulk insert, so a batch goes out concurrently
+        # over the shared connection pool
+        results = await asyncio.gather(
+            *(self.db.insert(record["collection"], record["value"]) for record in records),
+            return_exceptions=True
+        )
+        # Written and rejected records both leave the journal
+        done, rejected = [], []
+        for record, result in zip(records, results):
+            if not isinstance(result, BaseException):
+                done.append(record["seq"])
+            elif _rejected(result):
+                done.append(record["seq"])
+                rejected.append(record)
+                basic_dead_letters.inc(collection=record["collection"], status=str(result.response.status_code))
+                logger.error("Basic.tech rejected a %s record with %s; moving it to the dead-letter file",
+                             record["collection"], result.response.status_code)
+            else:
+                self._retry_later(record["seq"])
+        failed = len(records) - len(done)
+        if failed:
+            logger.error("Failed to write %d/%d records to Basic.tech; retrying them with backoff",
+                         failed, len(records))
+        if done:
+            for seq in done:
+                self._unacked.pop(seq, None)
+                self._attempts.pop(seq, None)
+            if rejected:
+                # Ahead of the trim, on the same thread, so a crash keeps them in one file or the other
+                self._journal_writer.submit(self._dead_letter, rejected)
+            await self._compact_journal()
+
+    def _retry_later(self, seq: int) -> None:
+        attempt = self._attempts.get(seq, 0) + 1
+        self._attempts[seq] = attempt
+        delay = min(self.retry_max_backoff, self.retry_backoff * 2 ** (attempt - 1))
+        delay *= random.uniform(0.5, 1.0)
+
+        def requeue() -> None:
+            self._retries.pop(seq, None)
+            self._queue.put_nowait(seq)
+
+        self._retries[seq] = asyncio.get_running_loop().call_later(delay, requeue)
+
+    async def _compact_journal(self) -> None:
+        """Rewrite the journal with the records still unacked."""
+        # Snapshotted here, in order with the appends already submitted: a
+        # record enqueued later is appended to the rewritten journal
+        records = list(self._unacked.values())
+        await asyncio.get_running_loop().run_in_executor(self._journal_writer, self._rewrite_journal, records)
+
+    def _append_journal(self, record: Dict[str, Any]) -> None:
+        """Runs on the journal writer thread."""
+        if self._journal_file is None:
+            self._journal_file = open(self.journal_path, "a")
+        # Flushed but not fsynced: the page cache survives a process crash
+        self._journal_file.write(json.dumps(record) + "\n")
+        self._journal_file.flush()
+
+    def _dead_letter(self, records: List[Dict[str, Any]]) -> None:
+        """Runs on the journal writer thread."""
+        with open(f"{self.journal_path}.dead", "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_journal(self, records: List[Dict[str, Any]]) -> None:
+        """Runs on the journal writer thread; swaps in a journal of just `records`."""
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._close_journal()
+        os.replace(tmp_path, self.journal_path)
+
+    def _close_journal(self) -> None:
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+
+    @staticmethod
+    def _read_journal(path: str) -> List[Dict[str, Any]]:
+        records = []
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write
+                    logger.warning("Skipping unreadable journal line")
+        return records
+
+# Create singleton instances
+db = BasicDB()
+write_buffer = WriteBehindBuffer(db) 
\ No newline at end of file
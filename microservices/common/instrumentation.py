@@ -0,0 +1,95 @@
+"""
+Metrics and tracing wiring shared by the FastAPI services.
+
+instrument(app, service) adds:
+- an ASGI middleware that times every request into http_request_seconds
+  and continues the caller's trace from its `traceparent` header
+- GET /metrics in the Prometheus text format
+- GET /traces/{trace_id}, the spans this service recorded for a trace,
+  merged with any spans fetched by `remote_spans` (e.g. from downstream
+  services), as a waterfall
+"""
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import FastAPI, Response
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from common import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+# Probes and scrapes are timed but not traced
+UNTRACED_PATHS = {"/metrics", "/health", "/ready"}
+
+RemoteSpans = Callable[[str], Awaitable[List[Dict[str, Any]]]]
+
+
+class ObserveRequests:
+    """
+    Pure ASGI middleware, so responses pass through unchanged: Starlette's
+    @app.middleware("http") rejects message types it does not know, such
+    as the http.response.zerocopy sent by streaming.RangeFileResponse.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        start = time.perf_counter()
+        status = 500
+        active: Optional[tracing.Span] = None
+
+        async def send_observed(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if active is not None:
+                    active.set("status_code", status)
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"traceparent", active.traceparent.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            if path in UNTRACED_PATHS or path.startswith("/traces/"):
+                await self.app(scope, receive, send_observed)
+            else:
+                with tracing.span(f"{scope['method']} {path}",
+                                  traceparent=Headers(scope=scope).get("traceparent")) as active:
+                    await self.app(scope, receive, send_observed)
+        finally:
+            # The route template keeps label cardinality bounded; the router
+            # sets it on the shared scope
+            route = scope.get("route")
+            metrics.http_request_seconds.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status)
+            )
+
+
+def instrument(app: FastAPI, service: str, remote_spans: Optional[RemoteSpans] = None) -> None:
+    tracing.set_service_name(service)
+    app.add_middleware(ObserveRequests)
+
+    @app.get("/metrics")
+    async def prometheus_metrics():
+        return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+    @app.get("/traces/{trace_id}")
+    async def get_trace(trace_id: str, include_remote: bool = True):
+        spans = tracing.store.get(trace_id)
+        if include_remote and remote_spans is not None:
+            try:
+                spans += await remote_spans(trace_id)
+            except Exception as e:
+                logger.warning("Failed to fetch remote spans for %s: %s", trace_id, e)
+        return {"trace_id": trace_id, "spans": tracing.waterfall(spans)}
@@ -0,0 +1,234 @@
+"""
+Payload-safe, low-overhead logging for the services.
+
+- summary(value) wraps a payload for a log argument. Nothing is serialized
+  unless the record is emitted, and then secrets are redacted and large
+  strings (e.g. base64 video bodies) and long lists are truncated.
+- SamplingFilter keeps repetitive DEBUG/INFO messages to a burst per
+  message template and time window, and reports how many were dropped.
+  Warnings and errors always pass.
+- JSONFormatter writes one JSON object per line, with the service name and
+  the current trace id.
+- configure_logging() puts a QueueHandler on the root logger, so handlers,
+  formatting and lazy arguments run on a background thread instead of the
+  request path. Lazy arguments are therefore rendered a little later; don't
+  log objects that are mutated right after the call.
+
+Use %-style arguments rather than f-strings, so disabled levels cost only
+the level check:
+
+    logger.debug("Basic.tech response: %s", log.summary(response_json))
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from common import tracing
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # "text" or "json"
+LOG_QUEUE = os.getenv("LOG_QUEUE", "true").lower() == "true"
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "200"))
+LOG_MAX_ITEMS = int(os.getenv("LOG_MAX_ITEMS", "10"))
+# Per message template: at most LOG_SAMPLE_BURST DEBUG/INFO records per window; 0 disables sampling
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "20"))
+LOG_SAMPLE_WINDOW_SECONDS = float(os.getenv("LOG_SAMPLE_WINDOW_SECONDS", "10"))
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+REDACTED = "[REDACTED]"
+# Anchored to whole credential names, so counters such as output_tokens and
+# identifiers such as blob_key are still logged
+SECRET_KEYS = re.compile(
+    r"(^|[_-])((access|refresh|auth|id|api)[_-]?)?(token|secret|password|jwt)$"
+    r"|(^|[_-])(api|secret|private|access)[_-]?key$"
+    r"|(^|[_-])(authorization|(set[_-]?)?cookie)$",
+    re.IGNORECASE
+)
+
+
+def redact(value: Any, max_chars: int = LOG_MAX_FIELD_CHARS, max_items: int = LOG_MAX_ITEMS, _depth: int = 0) -> Any:
+    """A copy of `value` that is safe and small enough to log."""
+    if _depth > 6:
+        return "..."
+    if hasattr(value, "model_dump"):
+        value = value.model_dump()
+    if isinstance(value, dict):
+        result = {}
+        for i, (key, item) in enumerate(value.items()):
+            if i == max_items:
+                result["..."] = f"{len(value) - max_items} more keys"
+                break
+            result[key] = REDACTED if SECRET_KEYS.search(str(key)) else redact(item, max_chars, max_items, _depth + 1)
+        return result
+    if isinstance(value, (list, tuple)):
+        items = [redact(item, max_chars, max_items, _depth + 1) for item in value[:max_items]]
+        if len(value) > max_items:
+            items.append(f"... {len(value) - max_items} more items")
+        return items
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str) and len(value) > max_chars:
+        return f"{value[:max_chars]}... ({len(value)} chars)"
+    return value
+
+
+class summary:
+    """Log argument rendering `value` redacted and truncated, only when the record is emitted."""
+
+    __slots__ = ("value", "max_chars", "max_items")
+
+    def __init__(self, value: Any, max_chars: int = LOG_MAX_FIELD_CHARS, max_items: int = LOG_MAX_ITEMS):
+        self.value = value
+        self.max_chars = max_chars
+        self.max_items = max_items
+
+    def __str__(self) -> str:
+        return json.dumps(redact(self.value, self.max_chars, self.max_items), default=str, ensure_ascii=False)
+
+    __repr__ = __str__
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Pass at most `burst` DEBUG/INFO records per message template (logger
+    name and unformatted message) per `window` seconds. The first record
+    after a suppressed stretch says how many were dropped.
+    """
+
+    def __init__(self, burst: int = LOG_SAMPLE_BURST, window: float = LOG_SAMPLE_WINDOW_SECONDS):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        # (logger, template) -> [window start, records passed, records dropped]
+        self._counts: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0 or record.levelno > logging.INFO:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is None or now - entry[0] >= self.window:
+                dropped = entry[2] if entry is not None else 0
+                if len(self._counts) > 10000:
+                    # Templates should be constant; don't grow without bound if they are not
+                    self._counts.clear()
+                self._counts[key] = [now, 1, 0]
+            elif entry[1] < self.burst:
+                entry[1] += 1
+                dropped = 0
+            else:
+                entry[2] += 1
+                return False
+        if dropped:
+            record.sampled_dropped = dropped
+        return True
+
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the service name and the caller's trace id."""
+
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.service = self.service
+        span = tracing.current_span()
+        record.trace_id = span.trace_id if span is not None else None
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for attr in ("service", "trace_id", "sampled_dropped"):
+            value = getattr(record, attr, None)
+            if value is not None:
+                entry[attr] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        dropped = getattr(record, "sampled_dropped", None)
+        return f"{line} ({dropped} similar messages dropped)" if dropped else line
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records without formatting them, so message formatting and lazy
+    arguments are evaluated by the listener thread. Tracebacks are rendered
+    right away, since they refer to live frames.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(service: str, level: str = LOG_LEVEL, fmt: str = LOG_FORMAT,
+                      use_queue: bool = LOG_QUEUE, sample_burst: int = LOG_SAMPLE_BURST,
+                      stream=None) -> None:
+    """
+    Configure the root logger for a service: sampling, text or JSON lines on
+    stdout (or `stream`), written by a background thread when `use_queue` is
+    set. Safe to call more than once; later calls replace the configuration.
+    """
+    global _listener
+    stop_logging()
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JSONFormatter() if fmt == "json" else TextFormatter(TEXT_FORMAT))
+    if use_queue:
+        log_queue: queue.Queue = queue.Queue(-1)
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        handler = DeferredQueueHandler(log_queue)
+    # Sampling first, so dropped records cost no more work
+    handler.addFilter(SamplingFilter(burst=sample_burst))
+    handler.addFilter(ContextFilter(service))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+def stop_logging() -> None:
+    """Flush and stop the background log writer, if any."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
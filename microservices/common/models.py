@@ -1,12 +1,14 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Any, Generic, TypeVar
+from typing import Dict, Any, Generic, TypeVar, Optional, List
 from datetime import datetime
 
 class VideoBase(BaseModel):
     """Base model for video data"""
     prompt: str
     description: str
-    content: str
+    blob_key: Optional[str] = None  # SHA-256 key of the MP4 in the blob store
+    size: Optional[int] = None
+    content: Optional[str] = None  # Legacy inline base64 body
     metadata: Dict[str, Any]
 
 class VideoCreate(VideoBase):
@@ -44,4 +46,9 @@ class PromptData(BaseModel):
 
 class PromptResponse(BaseModel):
     """Model for Basic.tech API response containing prompt data"""
-    data: PromptData 
\ No newline at end of file
+    data: PromptData 
+
+class PromptPage(BaseModel):
+    """A page of prompts plus the cursor for the next page"""
+    items: List[PromptResponse]
+    next_cursor: Optional[str] = None
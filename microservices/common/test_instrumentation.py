@@ -0,0 +1,61 @@
+"""
+Request instrumentation must pass every ASGI message through, including
+extension messages such as http.response.zerocopy.
+
+    python -m pytest common/test_instrumentation.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Response
+
+from common import metrics
+from common.instrumentation import instrument
+
+
+class ZeroCopyResponse(Response):
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": 206, "headers": []})
+        await send({"type": "http.response.zerocopy", "file": 0, "offset": 0, "count": 1, "more_body": False})
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    instrument(app, "test")
+
+    @app.get("/files/{name}")
+    async def zerocopy_file(name: str):
+        return ZeroCopyResponse()
+
+    return app
+
+
+def call(app: FastAPI, path: str):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"traceparent", b"00-" + b"a" * 32 + b"-" + b"b" * 16 + b"-01")],
+        "server": ("test", 80), "client": ("test", 1), "extensions": {"http.response.zerocopy": {}},
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return messages
+
+
+def test_zerocopy_passes_through_with_trace_and_timing():
+    messages = call(make_app(), "/files/a")
+    assert [message["type"] for message in messages] == ["http.response.start", "http.response.zerocopy"]
+    headers = dict(messages[0]["headers"])
+    assert headers[b"traceparent"].startswith(b"00-" + b"a" * 32)
+    rendered = metrics.REGISTRY.render()
+    assert 'http_request_seconds_count{method="GET",route="/files/{name}",status="206"}' in rendered
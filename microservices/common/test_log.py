@@ -0,0 +1,28 @@
+"""
+Redaction of credentials in logged payloads.
+
+    python -m pytest common/test_log.py
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.log import REDACTED, redact
+
+
+def test_credentials_are_redacted():
+    payload = {
+        "Authorization": "Bearer abc", "api_key": "k", "apiKey": "k", "X-API-Key": "k",
+        "basic_jwt": "j", "access_token": "t", "refreshToken": "t", "token": "t",
+        "client_secret": "s", "password": "p", "Set-Cookie": "c",
+    }
+    assert redact(payload, max_items=len(payload)) == {key: REDACTED for key in payload}
+
+
+def test_counters_and_identifiers_are_kept():
+    payload = {
+        "output_tokens": 120, "prompt_tokens": 30, "truncations": 2, "truncation_rate": 0.1,
+        "blob_key": "abc", "tokens_per_second": 40.0, "max_tokens": 512,
+    }
+    assert redact(payload, max_items=len(payload)) == payload
@@ -0,0 +1,77 @@
+"""
+BasicDB.get_prompts cursor paging against an in-memory prompts collection.
+
+    python -m pytest common/test_prompt_pages.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# common.db builds its BasicDB singleton on import
+for name in ("BASIC_PROJECT_ID", "BASIC_API_KEY", "BASIC_JWT"):
+    os.environ.setdefault(name, "test")
+
+from common.db import BasicDB
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+def prompt_item(record_id: str):
+    value = {"topic": record_id, "output": "output", "top_text": "top", "bottom_text": "bottom"}
+    return {"id": record_id, "data": {"id": record_id, "value": value}}
+
+
+def fake_db(items):
+    db = BasicDB()
+
+    async def request(method, url, params=None, **kwargs):
+        offset, limit = params["offset"], params["limit"]
+        return FakeResponse(items[offset:offset + limit])
+
+    db._request = request
+    return db
+
+
+def ids(page):
+    return [item.data.id for item in page.items]
+
+
+def test_pages_cover_every_prompt():
+    items = [prompt_item(f"r{i}") for i in range(10)]
+    db = fake_db(items)
+
+    async def run():
+        seen, cursor = [], None
+        while True:
+            page = await db.get_prompts(3, cursor=cursor)
+            seen.extend(ids(page))
+            cursor = page.next_cursor
+            if cursor is None:
+                return seen
+
+    assert asyncio.run(run()) == [f"r{i}" for i in range(10)]
+
+
+def test_insert_ahead_of_cursor_keeps_paging():
+    items = [prompt_item(f"r{i}") for i in range(10)]
+    db = fake_db(items)
+
+    async def run():
+        first = await db.get_prompts(3)
+        items.insert(0, prompt_item("new"))
+        db.prompt_cache.invalidate()
+        second = await db.get_prompts(3, cursor=first.next_cursor)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert ids(first) == ["r0", "r1", "r2"]
+    assert ids(second) == ["r3", "r4", "r5"]
+    assert second.next_cursor is not None
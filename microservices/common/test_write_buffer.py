@@ -0,0 +1,149 @@
+"""
+WriteBehindBuffer journaling: records must survive a stop or crash at any
+point between enqueue and a successful Basic.tech write.
+
+    python -m pytest common/test_write_buffer.py
+"""
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# common.db builds its BasicDB singleton on import
+for name in ("BASIC_PROJECT_ID", "BASIC_API_KEY", "BASIC_JWT"):
+    os.environ.setdefault(name, "test")
+
+from common.db import WriteBehindBuffer
+from common.models import PromptCreate
+
+
+class FakeDB:
+    def __init__(self, fail: bool = False, failures: int = 0, reject_status: int = 0):
+        self.fail = fail
+        self.failures = failures
+        self.reject_status = reject_status
+        self.attempts = 0
+        self.inserts = []
+
+    async def insert(self, collection, value):
+        self.attempts += 1
+        if self.reject_status:
+            request = httpx.Request("POST", f"https://api.basic.tech/{collection}")
+            response = httpx.Response(self.reject_status, request=request)
+            raise httpx.HTTPStatusError("rejected", request=request, response=response)
+        if self.fail or self.failures:
+            self.failures = max(0, self.failures - 1)
+            raise RuntimeError("Basic.tech unavailable")
+        self.inserts.append((collection, value))
+        return {}
+
+
+def prompt(topic: str) -> PromptCreate:
+    return PromptCreate(topic=topic, output="output", top_text="top", bottom_text="bottom")
+
+
+def journaled(path: str):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line)["value"]["topic"] for line in f if line.strip()]
+
+
+def test_stop_during_collection_window_flushes_batch(tmp_path):
+    journal = str(tmp_path / "journal.jsonl")
+
+    async def run():
+        db = FakeDB()
+        buffer = WriteBehindBuffer(db, journal_path=journal, batch_size=10, flush_interval=5.0)
+        await buffer.start()
+        buffer.enqueue_prompt(prompt("a"))
+        buffer.enqueue_prompt(prompt("b"))
+        # Let the flusher take both off the queue and wait for more
+        await asyncio.sleep(0.05)
+        await buffer.stop()
+        return db
+
+    db = asyncio.run(run())
+    assert sorted(value["topic"] for _, value in db.inserts) == ["a", "b"]
+    assert journaled(journal) == []
+
+
+def test_unflushed_records_are_replayed_after_crash(tmp_path):
+    journal = str(tmp_path / "journal.jsonl")
+
+    async def crash():
+        buffer = WriteBehindBuffer(FakeDB(), journal_path=journal, flush_interval=5.0)
+        buffer.enqueue_prompt(prompt("a"))
+        buffer.enqueue_prompt(prompt("b"))
+        await buffer.journaled()
+        # The process dies here: no stop(), nothing flushed
+
+    async def restart():
+        db = FakeDB()
+        buffer = WriteBehindBuffer(db, journal_path=journal, flush_interval=0.01)
+        await buffer.start()
+        await asyncio.sleep(0.05)
+        await buffer.stop()
+        return db
+
+    asyncio.run(crash())
+    assert journaled(journal) == ["a", "b"]
+    db = asyncio.run(restart())
+    assert [value["topic"] for _, value in db.inserts] == ["a", "b"]
+    assert journaled(journal) == []
+
+
+def test_failed_records_stay_journaled(tmp_path):
+    journal = str(tmp_path / "journal.jsonl")
+
+    async def run():
+        buffer = WriteBehindBuffer(FakeDB(fail=True), journal_path=journal, flush_interval=0.01)
+        await buffer.start()
+        buffer.enqueue_prompt(prompt("a"))
+        await asyncio.sleep(0.05)
+        await buffer.stop()
+
+    asyncio.run(run())
+    assert journaled(journal) == ["a"]
+
+
+def test_failed_records_are_retried(tmp_path):
+    journal = str(tmp_path / "journal.jsonl")
+
+    async def run():
+        db = FakeDB(failures=2)
+        buffer = WriteBehindBuffer(db, journal_path=journal, flush_interval=0.01,
+                                   retry_backoff=0.01, retry_max_backoff=0.02)
+        await buffer.start()
+        buffer.enqueue_prompt(prompt("a"))
+        await asyncio.sleep(0.2)
+        await buffer.stop()
+        return db
+
+    db = asyncio.run(run())
+    assert [value["topic"] for _, value in db.inserts] == ["a"]
+    assert journaled(journal) == []
+
+
+def test_rejected_records_are_dead_lettered(tmp_path):
+    journal = str(tmp_path / "journal.jsonl")
+
+    async def run():
+        db = FakeDB(reject_status=422)
+        buffer = WriteBehindBuffer(db, journal_path=journal, flush_interval=0.01,
+                                   retry_backoff=0.01, retry_max_backoff=0.02)
+        await buffer.start()
+        buffer.enqueue_prompt(prompt("a"))
+        await asyncio.sleep(0.2)
+        await buffer.stop()
+        return db
+
+    db = asyncio.run(run())
+    # Not retried, and not replayed on the next start
+    assert db.attempts == 1
+    assert journaled(journal) == []
+    assert journaled(journal + ".dead") == ["a"]
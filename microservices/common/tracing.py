@@ -0,0 +1,165 @@
+"""
+Minimal distributed tracing with W3C trace context.
+
+Spans are recorded in-process and kept in a bounded SpanStore, which a
+service exposes at /traces/{trace_id}. The current span lives in a context
+variable, so it follows coroutines and asyncio.to_thread. Outgoing requests
+carry it in a `traceparent` header (inject()), and incoming ones continue
+it (span(..., traceparent=header)), so one trace id covers the description
+service, the dispatcher and the video worker.
+"""
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+SERVICE_NAME = os.getenv("SERVICE_NAME", "unknown")
+TRACE_MAX_TRACES = int(os.getenv("TRACE_MAX_TRACES", "1000"))
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "service", "start", "end", "attributes")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], service: str):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.service = service
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attributes: Dict[str, Any] = {}
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "start": self.start,
+            "duration_seconds": round(self.end - self.start, 6) if self.end is not None else None,
+            "attributes": self.attributes,
+        }
+
+
+class SpanStore:
+    """Finished spans of the most recent traces, oldest traces dropped first."""
+
+    def __init__(self, max_traces: int = TRACE_MAX_TRACES):
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                spans = self._traces[span.trace_id] = []
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            spans.append(span.as_dict())
+
+    def get(self, trace_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._traces.get(trace_id, []))
+
+
+store = SpanStore()
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def set_service_name(name: str) -> None:
+    global SERVICE_NAME
+    SERVICE_NAME = name
+
+
+def parse_traceparent(header: Optional[str]):
+    """Return (trace_id, parent_span_id) from a traceparent header, or None if invalid."""
+    if not header:
+        return None
+    match = _TRACEPARENT.match(header.strip().lower())
+    if not match or match.group(1) == "0" * 32:
+        return None
+    return match.group(1), match.group(2)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_traceparent() -> Optional[str]:
+    span = _current.get()
+    return span.traceparent if span is not None else None
+
+
+def inject(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Headers for an outgoing request, with the current span as parent."""
+    headers = dict(headers or {})
+    traceparent = current_traceparent()
+    if traceparent:
+        headers["traceparent"] = traceparent
+    return headers
+
+
+@contextmanager
+def span(name: str, traceparent: Optional[str] = None, **attributes: Any) -> Iterator[Span]:
+    """
+    Record a span around the block, as a child of the current span, or of
+    `traceparent` when given (e.g. from an incoming request). Starts a new
+    trace when there is neither.
+    """
+    parent = parse_traceparent(traceparent)
+    if parent is not None:
+        trace_id, parent_id = parent
+    else:
+        current = _current.get()
+        if current is not None:
+            trace_id, parent_id = current.trace_id, current.span_id
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+
+    active = Span(name, trace_id, parent_id, SERVICE_NAME)
+    active.attributes.update(attributes)
+    token = _current.set(active)
+    try:
+        yield active
+    except BaseException as e:
+        active.set("error", f"{type(e).__name__}: {str(e)}")
+        raise
+    finally:
+        _current.reset(token)
+        active.end = time.time()
+        store.add(active)
+
+
+def record_span(name: str, start: float, end: float, **attributes: Any) -> None:
+    """Record an already finished span (wall-clock start/end) under the current span."""
+    current = _current.get()
+    if current is None:
+        return
+    finished = Span(name, current.trace_id, current.span_id, SERVICE_NAME)
+    finished.start = start
+    finished.end = end
+    finished.attributes.update(attributes)
+    store.add(finished)
+
+
+def waterfall(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Sort spans by start time and add each one's offset from the first."""
+    spans = sorted(spans, key=lambda s: s["start"])
+    origin = spans[0]["start"] if spans else 0.0
+    return [{**s, "offset_seconds": round(s["start"] - origin, 6)} for s in spans]
@@ -0,0 +1,141 @@
+"""
+Local index of video metadata for listing.
+
+Basic.tech video records are full VideoBase documents (legacy ones still
+carry the base64 body), so listing from it moves and parses every video.
+The index keeps one compact row per stored video in a SQLite file, written
+next to the database record, and pages through it newest first with a
+keyset cursor. The video body is fetched separately, by blob key, only
+when it is played.
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from common import cursors
+
+COLUMNS = ("id", "blob_key", "prompt", "description", "duration_seconds", "size", "created_at", "renditions")
+
+
+def encode_cursor(video_id: int) -> str:
+    """Opaque page cursor: the id of the last video returned."""
+    return cursors.encode_cursor({"id": video_id})
+
+
+def decode_cursor(cursor: str) -> int:
+    """Raises ValueError for a malformed cursor."""
+    fields = cursors.decode_cursor(cursor)
+    try:
+        return int(fields["id"])
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class VideoIndex:
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite file holding the index. Workers on one host may share it.
+        """
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS videos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    blob_key TEXT NOT NULL,
+                    prompt TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    duration_seconds REAL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    renditions TEXT
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS videos_blob_key ON videos (blob_key)")
+            # Totals kept by triggers in the writing transaction, so stats() is
+            # a single-row read however many videos there are, and stays exact
+            # when several workers share the file
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS video_totals (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                "videos INTEGER NOT NULL, bytes INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO video_totals (id, videos, bytes) "
+                "SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM videos"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS videos_totals_insert AFTER INSERT ON videos BEGIN "
+                "UPDATE video_totals SET videos = videos + 1, bytes = bytes + NEW.size WHERE id = 0; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS videos_totals_delete AFTER DELETE ON videos BEGIN "
+                "UPDATE video_totals SET videos = videos - 1, bytes = bytes - OLD.size WHERE id = 0; END"
+            )
+
+    def add(self, blob_key: str, prompt: str, description: str, size: int,
+            duration_seconds: Optional[float] = None, created_at: Optional[float] = None,
+            renditions: Optional[Dict[str, Dict[str, Any]]] = None) -> int:
+        """
+        Index a stored video. Returns its id.
+
+        Args:
+            renditions: Previews, posters etc. by name, each with its blob key
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO videos (blob_key, prompt, description, duration_seconds, size, created_at, renditions) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (blob_key, prompt, description, duration_seconds, size,
+                 created_at if created_at is not None else time.time(), json.dumps(renditions or {})),
+            )
+            return cursor.lastrowid
+
+    @staticmethod
+    def _video(row: sqlite3.Row) -> Dict[str, Any]:
+        video = dict(row)
+        video["renditions"] = json.loads(video["renditions"] or "{}")
+        return video
+
+    def get(self, video_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM videos WHERE id = ?", (video_id,)
+            ).fetchone()
+        return self._video(row) if row is not None else None
+
+    def page(self, limit: int = 10, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Return (videos, next_cursor), newest first. Pass next_cursor back for
+        the following page; it is None on the last page. Videos added while
+        paging appear on the first page, never shifted into later ones.
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        query = f"SELECT {', '.join(COLUMNS)} FROM videos"
+        params: Tuple[Any, ...] = ()
+        if cursor:
+            query += " WHERE id < ?"
+            params = (decode_cursor(cursor),)
+        query += " ORDER BY id DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, params + (limit + 1,)).fetchall()
+        videos = [self._video(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(videos[-1]["id"]) if len(rows) > limit else None
+        return videos, next_cursor
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, size = self._conn.execute("SELECT videos, bytes FROM video_totals WHERE id = 0").fetchone()
+        return {"videos": count, "bytes": size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
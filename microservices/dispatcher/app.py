@@ -0,0 +1,373 @@
+"""
+Dispatcher in front of several video-generation workers.
+
+Workers announce themselves with heartbeats (see heartbeat.py in the video
+generation service). Jobs submitted here are forwarded to the least-loaded
+worker and get a dispatcher job id, so a job that was on a worker that
+disappears can be resubmitted elsewhere without the client noticing.
+
+The dispatcher speaks the same /jobs API as a worker, so clients only need
+to point VIDEO_SERVICE_URL at it.
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, RedirectResponse
+
+# Add parent directory to Python path to find common module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import log, metrics, tracing
+from common.instrumentation import instrument
+from registry import Worker, WorkerRegistry
+
+# LOG_LEVEL, LOG_FORMAT etc. are read by common.log
+log.configure_logging("dispatcher")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="Video Generation Dispatcher")
+
+HEARTBEAT_TIMEOUT_SECONDS = float(os.getenv("DISPATCHER_HEARTBEAT_TIMEOUT_SECONDS", "15"))
+# Attempts per job across workers, for submission and for resubmission after a worker dies
+DISPATCH_MAX_ATTEMPTS = int(os.getenv("DISPATCH_MAX_ATTEMPTS", "3"))
+DISPATCH_TIMEOUT_SECONDS = float(os.getenv("DISPATCH_TIMEOUT_SECONDS", "10"))
+MONITOR_INTERVAL_SECONDS = float(os.getenv("DISPATCHER_MONITOR_SECONDS", "5"))
+# Finished jobs remembered for polling
+JOB_HISTORY = int(os.getenv("DISPATCHER_JOB_HISTORY", "10000"))
+
+TERMINAL_STATES = ("succeeded", "failed")
+
+registry = WorkerRegistry(heartbeat_timeout=HEARTBEAT_TIMEOUT_SECONDS)
+client = httpx.AsyncClient(timeout=DISPATCH_TIMEOUT_SECONDS)
+
+dispatches = metrics.REGISTRY.counter(
+    "dispatch_attempts_total", "Job submissions to workers by outcome", ["outcome"]
+)
+resubmissions = metrics.REGISTRY.counter("dispatch_resubmissions_total", "Jobs moved off a dead worker")
+
+# Dispatcher job id -> {worker_id, worker_job_id, request, priority, attempts, state, error, status,
+# cancel_reason once cancelled}
+jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+class NoWorkerAvailable(Exception):
+    def __init__(self, message: str, status_code: int = 503):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def required_models(request: Dict[str, Any]) -> List[str]:
+    models = ["diffusion"]
+    if request.get("add_audio", True):
+        models.append("tts:")
+    return models
+
+
+async def submit_to_worker(request: Dict[str, Any], priority: int, exclude=()) -> Tuple[Worker, Dict[str, Any]]:
+    """
+    Forward a job to the best worker, moving on to the next one if it fails
+    or its queue is full.
+
+    Raises:
+        NoWorkerAvailable: If no worker accepted the job
+    """
+    tried = set(exclude)
+    queue_full = False
+    last_error = None
+    for _ in range(DISPATCH_MAX_ATTEMPTS):
+        worker = registry.choose(required_models(request), exclude=tried)
+        if worker is None:
+            break
+        tried.add(worker.worker_id)
+        try:
+            response = await client.post(f"{worker.url}/jobs", json={**request, "priority": priority},
+                                         headers=tracing.inject())
+        except httpx.HTTPError as e:
+            dispatches.inc(outcome="error")
+            registry.record_failure(worker)
+            last_error = f"{worker.worker_id}: {str(e)}"
+            logger.warning("Failed to submit job to %s: %s", worker.worker_id, e)
+            continue
+        if response.status_code == 429:
+            dispatches.inc(outcome="queue_full")
+            queue_full = True
+            continue
+        if response.status_code >= 500:
+            dispatches.inc(outcome="error")
+            registry.record_failure(worker)
+            last_error = f"{worker.worker_id}: HTTP {response.status_code}"
+            continue
+        if response.status_code >= 400:
+            # The request itself is invalid; another worker would reject it too
+            raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
+        dispatches.inc(outcome="accepted")
+        registry.record_dispatch(worker)
+        return worker, response.json()
+
+    if queue_full:
+        raise NoWorkerAvailable("All workers' queues are full", status_code=429)
+    raise NoWorkerAvailable(f"No worker accepted the job: {last_error or 'no live workers'}")
+
+
+def remember(job_id: str, job: Dict[str, Any]) -> None:
+    jobs[job_id] = job
+    excess = len(jobs) - JOB_HISTORY
+    if excess > 0:
+        # Forget the oldest finished jobs; unfinished ones are always kept
+        finished = [old_id for old_id, old in jobs.items() if old["state"] in TERMINAL_STATES]
+        for old_id in finished[:excess]:
+            del jobs[old_id]
+
+
+async def resubmit(job_id: str, job: Dict[str, Any], reason: str) -> bool:
+    """Move a job off a dead worker. Returns False once it is out of attempts."""
+    if job.get("resubmitting"):
+        # Already being moved by a concurrent poll or the monitor
+        return True
+    if job["attempts"] >= DISPATCH_MAX_ATTEMPTS:
+        job.update(state="failed", worker_job_id=None,
+                   error=f"Worker failed and the job is out of attempts: {reason}")
+        return False
+    logger.warning("Resubmitting job %s from %s: %s", job_id, job["worker_id"], reason)
+    job["resubmitting"] = True
+    try:
+        worker, accepted = await submit_to_worker(job["request"], job["priority"], exclude=[job["worker_id"]])
+    except (NoWorkerAvailable, HTTPException) as e:
+        logger.error("Could not resubmit job %s: %s", job_id, e)
+        return True
+    finally:
+        job["resubmitting"] = False
+    if "cancel_reason" in job:
+        # Cancelled while the submission was in flight: the cancel went to the
+        # old worker, so stop the copy the new worker just accepted
+        job.update(worker_id=worker.worker_id, worker_job_id=accepted["job_id"], attempts=job["attempts"] + 1)
+        await cancel_on_worker(job_id, worker, accepted["job_id"], job["cancel_reason"])
+        job["status"] = local_status(job_id, job)
+        return True
+    job.update(worker_id=worker.worker_id, worker_job_id=accepted["job_id"], state=accepted["state"],
+               attempts=job["attempts"] + 1)
+    resubmissions.inc()
+    return True
+
+
+async def cancel_on_worker(job_id: str, worker: Worker, worker_job_id: str, reason: str) -> None:
+    try:
+        response = await client.post(f"{worker.url}/jobs/{worker_job_id}/cancel",
+                                     params={"reason": reason}, headers=tracing.inject())
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        registry.record_failure(worker)
+        logger.warning("Failed to cancel job %s on %s: %s", job_id, worker.worker_id, e)
+
+
+@app.post("/workers/heartbeat")
+async def worker_heartbeat(heartbeat: Dict[str, Any]):
+    if "worker_id" not in heartbeat or "url" not in heartbeat:
+        raise HTTPException(status_code=422, detail="worker_id and url are required")
+    registry.heartbeat(heartbeat)
+    return {"status": "ok"}
+
+
+@app.get("/workers")
+async def list_workers():
+    return {"workers": registry.stats()}
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: Dict[str, Any]):
+    """Queue a generation job on the least-loaded worker."""
+    request = dict(request)
+    priority = request.pop("priority", 0) or 0
+    try:
+        worker, accepted = await submit_to_worker(request, priority)
+    except NoWorkerAvailable as e:
+        headers = {"Retry-After": "30"} if e.status_code == 429 else {}
+        return JSONResponse(status_code=e.status_code, content={"detail": str(e)}, headers=headers)
+
+    job_id = str(uuid.uuid4())
+    remember(job_id, {
+        "worker_id": worker.worker_id,
+        "worker_job_id": accepted["job_id"],
+        "request": request,
+        "priority": priority,
+        "attempts": 1,
+        "state": accepted["state"],
+        "error": None,
+        "status": None,
+        "created_at": time.time(),
+    })
+    return {"job_id": job_id, "state": accepted["state"], "worker_id": worker.worker_id}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if job["status"] is not None:
+        # Finished on its worker; no need to ask again
+        return job["status"]
+    if job["worker_job_id"] is None:
+        return local_status(job_id, job)
+
+    worker = registry.get(job["worker_id"])
+    status = None
+    if worker is not None and registry.is_live(worker):
+        try:
+            response = await client.get(f"{worker.url}/jobs/{job['worker_job_id']}")
+            if response.status_code == 200:
+                status = response.json()
+        except httpx.HTTPError as e:
+            registry.record_failure(worker)
+            logger.warning("Failed to poll job %s on %s: %s", job_id, worker.worker_id, e)
+
+    if status is None:
+        if worker is None or not registry.is_live(worker):
+            # The worker is gone; run the job elsewhere
+            await resubmit(job_id, job, "no heartbeat")
+        return local_status(job_id, job)
+
+    status = {**status, "job_id": job_id, "worker_id": job["worker_id"], "attempts": job["attempts"]}
+    job["state"] = status["state"]
+    if job["state"] in TERMINAL_STATES:
+        job["status"] = status
+    return status
+
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, reason: str = "cancelled by client"):
+    """Cancel a job here and on its worker; finished jobs are returned unchanged."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if job["state"] in TERMINAL_STATES:
+        return await get_job(job_id)
+
+    # Marked first, so the monitor doesn't resubmit it meanwhile, and a
+    # resubmission already in flight cancels the job on its new worker
+    job.update(state="failed", error=f"Cancelled: {reason}", cancel_reason=reason)
+    worker = registry.get(job["worker_id"]) if job["worker_id"] else None
+    if worker is not None and job["worker_job_id"] is not None and registry.is_live(worker):
+        await cancel_on_worker(job_id, worker, job["worker_job_id"], reason)
+    job["status"] = local_status(job_id, job)
+    return job["status"]
+
+
+def local_status(job_id: str, job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "job_id": job_id,
+        "state": job["state"],
+        "stages": None,
+        "result": None,
+        "error": job["error"],
+        "worker_id": job["worker_id"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+    }
+
+
+@app.get("/videos")
+async def list_videos(request: Request):
+    """Redirect to a live worker's video listing. Workers on one host share the index."""
+    worker = registry.choose()
+    if worker is None:
+        raise HTTPException(status_code=503, detail="No live workers")
+    query = f"?{request.url.query}" if request.url.query else ""
+    return RedirectResponse(f"{worker.url}/videos{query}", status_code=307)
+
+
+@app.api_route("/videos/{video_id}/stream", methods=["GET", "HEAD"])
+async def stream_video(video_id: str, request: Request):
+    """
+    Redirect to a live worker's stream endpoint. Workers share a blob store,
+    so any of them can serve any video.
+    """
+    worker = registry.choose()
+    if worker is None:
+        raise HTTPException(status_code=503, detail="No live workers")
+    return RedirectResponse(f"{worker.url}/videos/{video_id}/stream", status_code=307)
+
+
+async def monitor_workers():
+    """Resubmit unfinished jobs whose worker stopped sending heartbeats."""
+    while True:
+        await asyncio.sleep(MONITOR_INTERVAL_SECONDS)
+        try:
+            for job_id, job in list(jobs.items()):
+                if job["state"] in TERMINAL_STATES:
+                    continue
+                worker = registry.get(job["worker_id"])
+                if worker is None or not registry.is_live(worker):
+                    await resubmit(job_id, job, "no heartbeat")
+            registry.prune()
+        except Exception as e:
+            logger.exception("Worker monitor failed: %s", e)
+
+
+monitor_task: Optional[asyncio.Task] = None
+
+
+@app.on_event("startup")
+async def start_monitor():
+    global monitor_task
+    monitor_task = asyncio.create_task(monitor_workers())
+
+
+@app.on_event("shutdown")
+async def stop_monitor():
+    if monitor_task is not None:
+        monitor_task.cancel()
+    await client.aclose()
+
+
+metrics.REGISTRY.gauge("live_workers", "Workers with a recent heartbeat", callback=lambda: len(registry.live()))
+metrics.REGISTRY.gauge(
+    "worker_load", "Queued and running jobs per unit of capacity", ["worker"],
+    callback=lambda: {w.worker_id: w.load for w in registry.live()}
+)
+metrics.REGISTRY.gauge(
+    "jobs_unfinished", "Dispatched jobs not yet finished",
+    callback=lambda: sum(1 for j in jobs.values() if j["state"] not in TERMINAL_STATES)
+)
+
+
+async def fetch_worker_spans(trace_id: str):
+    """Spans every live worker recorded for the trace."""
+    async def fetch(worker: Worker):
+        try:
+            response = await client.get(f"{worker.url}/traces/{trace_id}", params={"include_remote": "false"})
+            response.raise_for_status()
+            return response.json()["spans"]
+        except httpx.HTTPError:
+            return []
+
+    results = await asyncio.gather(*(fetch(w) for w in registry.live()))
+    return [span for spans in results for span in spans]
+
+
+instrument(app, "dispatcher", remote_spans=fetch_worker_spans)
+
+
+@app.get("/health")
+async def health_check():
+    live = registry.live()
+    return {
+        "status": "healthy" if live else "degraded",
+        "live_workers": len(live),
+        "ready_workers": sum(1 for w in live if w.ready),
+        "jobs_tracked": len(jobs),
+        "jobs_unfinished": sum(1 for j in jobs.values() if j["state"] not in TERMINAL_STATES),
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8100")))
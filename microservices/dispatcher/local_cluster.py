@@ -0,0 +1,89 @@
+"""
+Run a dispatcher and several video-generation workers on one machine.
+
+Each worker gets its own port and its own jobs database, render cache,
+write journal and output directory under --state-dir. The blob store and
+the video index are shared so any worker can list and stream any video. Point the description service
+at the dispatcher with VIDEO_SERVICE_URL=http://localhost:<dispatcher-port>.
+
+    python local_cluster.py --workers 3
+    python local_cluster.py --workers 2 --gpus 0,1
+
+Extra environment (e.g. INFERENCE_PROFILE=cpu) is passed through to every
+process. Ctrl-C stops the cluster.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+MICROSERVICES_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DISPATCHER_DIR = os.path.join(MICROSERVICES_DIR, "dispatcher")
+VIDEO_GEN_DIR = os.path.join(MICROSERVICES_DIR, "video-generation")
+
+
+def spawn(name, cwd, module, port, env):
+    print(f"Starting {name} on port {port}")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=cwd, env=env,
+    )
+
+
+def main(args):
+    state_dir = os.path.abspath(args.state_dir)
+    dispatcher_url = f"http://localhost:{args.dispatcher_port}"
+    gpus = args.gpus.split(",") if args.gpus else []
+
+    processes = [spawn("dispatcher", DISPATCHER_DIR, "app", args.dispatcher_port,
+                       {**os.environ, "PORT": str(args.dispatcher_port)})]
+    for i in range(args.workers):
+        port = args.base_port + i
+        worker_dir = os.path.join(state_dir, f"worker-{i}")
+        os.makedirs(worker_dir, exist_ok=True)
+        env = {
+            **os.environ,
+            "PORT": str(port),
+            "DISPATCHER_URL": dispatcher_url,
+            "WORKER_URL": f"http://localhost:{port}",
+            "WORKER_ID": f"worker-{i}",
+            "JOBS_DB_PATH": os.path.join(worker_dir, "jobs.sqlite3"),
+            "RENDER_CACHE_PATH": os.path.join(worker_dir, "render_cache.sqlite3"),
+            "BASIC_WRITE_JOURNAL": os.path.join(worker_dir, "basic_write_journal.jsonl"),
+            "OUTPUT_DIR": os.path.join(worker_dir, "output"),
+            "BLOB_STORE_PATH": os.environ.get("BLOB_STORE_PATH", os.path.join(state_dir, "blobs")),
+            "VIDEO_INDEX_PATH": os.environ.get("VIDEO_INDEX_PATH", os.path.join(state_dir, "video_index.sqlite3")),
+        }
+        if gpus:
+            # Round-robin workers over the listed devices
+            env["CUDA_VISIBLE_DEVICES"] = gpus[i % len(gpus)]
+        processes.append(spawn(f"worker-{i}", VIDEO_GEN_DIR, "video-gen", port, env))
+
+    print(f"Dispatcher at {dispatcher_url}; worker status at {dispatcher_url}/workers")
+    try:
+        while all(p.poll() is None for p in processes):
+            time.sleep(1)
+        print("A process exited; stopping the cluster")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in processes:
+            if p.poll() is None:
+                p.send_signal(signal.SIGINT)
+        for p in processes:
+            try:
+                p.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--dispatcher-port", type=int, default=8100)
+    parser.add_argument("--base-port", type=int, default=8001, help="Port of the first worker")
+    parser.add_argument("--gpus", help="Comma-separated CUDA device ids to spread workers over")
+    parser.add_argument("--state-dir", default="cluster-state")
+    main(parser.parse_args())
@@ -0,0 +1,140 @@
+"""
+Registry of video-generation workers, kept current by their heartbeats.
+
+A worker is live while its last heartbeat is younger than the heartbeat
+timeout. Routing picks the live worker with the lowest load, where
+load is the worker's reported queue plus the jobs dispatched to it since
+that report, relative to its capacity. Workers that already have the
+requested models resident are preferred over less loaded ones that would
+have to load them first.
+"""
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    def __init__(self, worker_id: str, url: str):
+        self.worker_id = worker_id
+        self.url = url.rstrip("/")
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.max_in_flight = 1
+        self.ready = False
+        self.models: Dict[str, str] = {}
+        self.last_seen = 0.0
+        # Jobs sent since the last heartbeat, which its counts don't include yet
+        self.dispatched_since_heartbeat = 0
+        self.failures = 0
+
+    def update(self, heartbeat: Dict[str, Any]) -> None:
+        self.url = heartbeat.get("url", self.url).rstrip("/")
+        self.queue_depth = heartbeat.get("queue_depth", 0)
+        self.in_flight = heartbeat.get("in_flight", 0)
+        self.max_in_flight = max(1, heartbeat.get("max_in_flight", 1))
+        self.ready = heartbeat.get("ready", False)
+        self.models = heartbeat.get("models", {})
+        self.last_seen = time.monotonic()
+        self.dispatched_since_heartbeat = 0
+        self.failures = 0
+
+    @property
+    def load(self) -> float:
+        return (self.queue_depth + self.in_flight + self.dispatched_since_heartbeat) / self.max_in_flight
+
+    def has_resident(self, models: Iterable[str]) -> bool:
+        """
+        Whether every model in `models` is loaded. A name ending in ":"
+        matches any model with that prefix, e.g. "tts:" for any voice.
+        """
+        for name in models:
+            if name.endswith(":"):
+                if not any(m.startswith(name) and state == "ready" for m, state in self.models.items()):
+                    return False
+            elif self.models.get(name) != "ready":
+                return False
+        return True
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "url": self.url,
+            "ready": self.ready,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "dispatched_since_heartbeat": self.dispatched_since_heartbeat,
+            "load": round(self.load, 3),
+            "models": self.models,
+            "seconds_since_heartbeat": round(time.monotonic() - self.last_seen, 3),
+            "failures": self.failures,
+        }
+
+
+class WorkerRegistry:
+    def __init__(self, heartbeat_timeout: float = 15.0, max_failures: int = 3):
+        """
+        Args:
+            heartbeat_timeout: Seconds without a heartbeat before a worker is considered dead.
+            max_failures: Consecutive dispatch failures before a worker is skipped
+                until its next heartbeat.
+        """
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_failures = max_failures
+        self._workers: Dict[str, Worker] = {}
+
+    def heartbeat(self, heartbeat: Dict[str, Any]) -> Worker:
+        worker_id = heartbeat["worker_id"]
+        worker = self._workers.get(worker_id)
+        if worker is None:
+            worker = self._workers[worker_id] = Worker(worker_id, heartbeat["url"])
+            logger.info("Registered worker %s at %s", worker_id, worker.url)
+        worker.update(heartbeat)
+        return worker
+
+    def remove(self, worker_id: str) -> None:
+        self._workers.pop(worker_id, None)
+
+    def get(self, worker_id: str) -> Optional[Worker]:
+        return self._workers.get(worker_id)
+
+    def is_live(self, worker: Worker) -> bool:
+        return time.monotonic() - worker.last_seen < self.heartbeat_timeout
+
+    def live(self) -> List[Worker]:
+        return [w for w in self._workers.values() if self.is_live(w)]
+
+    def choose(self, models: Iterable[str] = (), exclude: Iterable[str] = ()) -> Optional[Worker]:
+        """
+        The least-loaded live worker, preferring ones with `models` resident
+        so jobs don't wait on a model load. Returns None if there is no candidate.
+        """
+        models = list(models)
+        exclude = set(exclude)
+        candidates = [
+            w for w in self.live()
+            if w.worker_id not in exclude and w.failures < self.max_failures
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda w: (not w.has_resident(models), w.load, w.failures))
+
+    def record_dispatch(self, worker: Worker) -> None:
+        worker.dispatched_since_heartbeat += 1
+
+    def record_failure(self, worker: Worker) -> None:
+        worker.failures += 1
+
+    def prune(self) -> List[str]:
+        """Forget workers that have been silent for several timeouts. Returns their ids."""
+        cutoff = time.monotonic() - 4 * self.heartbeat_timeout
+        dead = [worker_id for worker_id, w in self._workers.items() if w.last_seen < cutoff]
+        for worker_id in dead:
+            logger.warning("Removing worker %s: no heartbeat", worker_id)
+            del self._workers[worker_id]
+        return dead
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [{**w.as_dict(), "live": self.is_live(w)} for w in self._workers.values()]
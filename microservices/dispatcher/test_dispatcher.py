@@ -0,0 +1,64 @@
+"""
+Dispatcher job bookkeeping against stand-in workers.
+
+    python -m pytest dispatcher/test_dispatcher.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app as dispatcher
+from registry import Worker
+
+
+class FakeClient:
+    def __init__(self):
+        self.posts = []
+
+    async def post(self, url, **kwargs):
+        self.posts.append(url)
+        return FakeResponse()
+
+
+class FakeResponse:
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+
+def test_cancel_during_resubmit_stays_cancelled(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(dispatcher, "client", client)
+    new_worker = Worker("new", "http://new")
+
+    async def run():
+        submitted = asyncio.Event()
+        release = asyncio.Event()
+
+        async def submit_to_worker(request, priority, exclude=()):
+            submitted.set()
+            await release.wait()
+            return new_worker, {"job_id": "new-job", "state": "queued"}
+
+        monkeypatch.setattr(dispatcher, "submit_to_worker", submit_to_worker)
+        job = {
+            "worker_id": "gone", "worker_job_id": "old-job", "request": {}, "priority": 0, "attempts": 1,
+            "state": "queued", "error": None, "status": None, "created_at": 0.0,
+        }
+        dispatcher.remember("job", job)
+
+        resubmit = asyncio.create_task(dispatcher.resubmit("job", job, "no heartbeat"))
+        await submitted.wait()
+        await dispatcher.cancel_job("job", reason="user")
+        release.set()
+        await resubmit
+        return job
+
+    job = asyncio.run(run())
+    assert job["state"] == "failed"
+    assert job["error"] == "Cancelled: user"
+    assert job["status"]["state"] == "failed"
+    assert client.posts == ["http://new/jobs/new-job/cancel"]
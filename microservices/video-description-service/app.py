@@ -1,24 +1,27 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from pydantic import BaseModel
-from ollama import chat
-from ollama import ChatResponse
 import uvicorn
-from typing import Dict, Any, Optional, Tuple, Literal
+import asyncio
+import time
+from typing import Dict, Any, Optional, Tuple, Literal, Callable
 import json
+import hashlib
 import datetime
 import os
 from pathlib import Path
 import logging
 import requests
-from common.db import db
+from common.db import db, write_buffer
 from common.models import PromptCreate, PromptResponse, VideoCreate, VideoResponse
+from common import log, metrics, tracing
+from common.instrumentation import instrument
 from fastapi.middleware.cors import CORSMiddleware
+from feed_pool import FeedPool
+from description_cache import DescriptionCache
+import llm
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# LOG_LEVEL, LOG_FORMAT etc. are read by common.log
+log.configure_logging("video-description")
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
@@ -36,6 +39,41 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Stage latency for the description pipeline; video stages are reported by the video service
+stage_seconds = metrics.REGISTRY.histogram(
+    "description_stage_seconds", "Latency of description pipeline stages", ["stage"]
+)
+description_cache_lookups = metrics.REGISTRY.counter(
+    "description_cache_lookups_total", "Description cache lookups by result", ["result"]
+)
+
+# A video-generation worker, or the dispatcher in front of several
+VIDEO_SERVICE_URL = os.getenv("VIDEO_SERVICE_URL", "http://localhost:8000")
+
+# Feed warmer settings; topics mirror the frontend's TOPICS list
+FEED_TOPICS = [t.strip() for t in os.getenv(
+    "FEED_TOPICS",
+    "cat fails,cooking disaster,dance challenge,gaming rage,parkour fail,"
+    "cute puppy,skateboard trick,magic trick fail,unexpected ending,talent show moment"
+).split(",") if t.strip()]
+FEED_WARMER_ENABLED = os.getenv("FEED_WARMER_ENABLED", "true").lower() == "true"
+FEED_LOW_WATER = int(os.getenv("FEED_LOW_WATER", "2"))
+FEED_HIGH_WATER = int(os.getenv("FEED_HIGH_WATER", "5"))
+FEED_FILL_CONCURRENCY = int(os.getenv("FEED_FILL_CONCURRENCY", "2"))
+FEED_POLL_SECONDS = float(os.getenv("FEED_POLL_SECONDS", "2"))
+FEED_VIDEO_TIMEOUT_SECONDS = float(os.getenv("FEED_VIDEO_TIMEOUT_SECONDS", "900"))
+
+# Generation cache settings
+DESCRIPTION_CACHE_ENABLED = os.getenv("DESCRIPTION_CACHE_ENABLED", "true").lower() == "true"
+description_cache = DescriptionCache(
+    max_variants=int(os.getenv("DESCRIPTION_CACHE_VARIANTS", "3")),
+    ttl=float(os.getenv("DESCRIPTION_CACHE_TTL_SECONDS", str(6 * 3600))),
+    max_bytes=int(os.getenv("DESCRIPTION_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+    refresh_probability=float(os.getenv("DESCRIPTION_CACHE_REFRESH_PROBABILITY", "0.1")),
+    near_duplicates=os.getenv("DESCRIPTION_CACHE_NEAR_DUPLICATES", "false").lower() == "true",
+    similarity_threshold=float(os.getenv("DESCRIPTION_CACHE_SIMILARITY", "0.85"))
+)
+
 # Base Models
 class VideoBase(BaseModel):
     prompt: str
@@ -70,13 +108,10 @@ class GenerateResponse(BaseModel):
     result: str
     video_generation_status: Optional[Dict[str, Any]] = None
 
+# Fixed system prompt shared by every request. The topic is sent only in the
+# user message, so Ollama can reuse the cached prefix across requests.
 SYSTEM_PROMPT = """
-You are tasked with describing what is happening in a video based on a given keyword. When given a keyword, you should describe a typical video that would be found when searching for that keyword on social media platforms.
-
-Here is the keyword:
-<video_topic>
-{{VIDEO_TOPIC}}
-</video_topic>
+You are tasked with describing what is happening in a video based on a given keyword. When given a keyword, you should describe a typical video that would be found when searching for that keyword on social media platforms. The user message contains the keyword.
 
 To create the video description:
 1. Consider what type of video content is commonly associated with this keyword
@@ -85,13 +120,15 @@ To create the video description:
 4. Describe the sequence of events in chronological order
 5. Include relevant details about the setting or environment
 6. Keep the description between 2-4 sentences long
-7. Generate appropriate meme text that would appear at the top and bottom of the video
+7. Write a short, engaging narration script for the video, around 2-3 sentences, containing only words to be spoken aloud and no descriptions of sounds or events
+8. Generate appropriate meme text that would appear at the top and bottom of the video
 
 Your output should be in the following JSON format:
 
 <output_format>
 {
     "videoDescription": "Your scene-by-scene description goes here",
+    "narration": "The spoken narration for the video",
     "topText": "Text that would appear at the top of the video",
     "bottomText": "Text that would appear at the bottom of the video"
 }
@@ -100,120 +137,277 @@ Your output should be in the following JSON format:
 Focus on describing what would be actually visible and happening in the video, as if you were explaining the scene to someone who cannot see it. The top and bottom text should follow common meme formats and humor styles associated with the keyword. Write your final output in the JSON format specified above, ensuring it is properly formatted. Omit tags in your response. Output ONLY the JSON.
 """
 
-async def trigger_video_generation(description: str) -> Dict[str, Any]:
+async def trigger_video_generation(description: str, narration: Optional[str] = None) -> Dict[str, Any]:
     """
-    Trigger video generation by making a request to the video generation service.
+    Queue a video generation job on the video generation service.
+
+    The narration comes from the same LLM call as the description, so the
+    video service does not need to generate its own script.
+
+    Returns as soon as the job is accepted; the result is the job id and
+    state, which can be polled at GET /jobs/{job_id} on that service.
     """
-    video_service_url = "http://localhost:8000"
     payload = {
         "prompt": description,
         "num_inference_steps": 5,
-        "model_name": "llama3.2",
-        "generate_script": True,
-        "generate_audio": True
+        "add_audio": True
     }
+    if narration:
+        payload["script"] = narration
     
     try:
-        response = requests.post(video_service_url, json=payload)
+        with tracing.span("trigger_video"), stage_seconds.time(stage="trigger_video"):
+            # The video service continues this trace for the job it queues
+            response = await asyncio.to_thread(
+                requests.post, f"{VIDEO_SERVICE_URL}/jobs", json=payload, timeout=10,
+                headers=tracing.inject()
+            )
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
-        logger.error(f"Failed to trigger video generation: {str(e)}")
+        logger.error("Failed to trigger video generation: %s", e)
         return {"error": str(e)}
 
-@app.post("/generate", response_model=GenerateResponse)
-async def generate_description(request: GenerateRequest):
-    logger.info(f"Generating description for topic: {request.topic}")
+async def cancel_video_generation(video_task: Optional[asyncio.Task], reason: str) -> None:
+    """Cancel the video job queued for a description that then failed, if one was queued."""
+    if video_task is None:
+        return
     try:
-        # Replace the placeholder in the system prompt
-        formatted_prompt = SYSTEM_PROMPT.replace("{{VIDEO_TOPIC}}", request.topic)
-        
-        # Get response from Ollama
-        logger.info("Sending request to Ollama")
-        response = chat(model='llama3.2:3b', messages=[
+        job = await video_task
+    except Exception:
+        return
+    if "job_id" not in job:
+        return
+    try:
+        response = await asyncio.to_thread(
+            requests.post, f"{VIDEO_SERVICE_URL}/jobs/{job['job_id']}/cancel",
+            params={"reason": reason}, timeout=10, headers=tracing.inject()
+        )
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        logger.error("Failed to cancel video job %s: %s", job["job_id"], e)
+
+async def generate_content(topic: str, on_video_ready: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+    """
+    Generate a video description and meme text for a topic and store the prompt.
+    Returns the parsed LLM output, served from the description cache when possible.
+
+    Args:
+        topic: The video topic
+        on_video_ready: Called as on_video_ready(description, narration) as soon
+            as both have been generated, while the meme text is still streaming
+    """
+    if DESCRIPTION_CACHE_ENABLED:
+        cached = description_cache.get(topic)
+        description_cache_lookups.inc(result="miss" if cached is None else "hit")
+        if cached is not None:
+            logger.info("Description cache hit for topic: %s", topic)
+            if on_video_ready:
+                on_video_ready(cached["videoDescription"], cached["narration"])
+            return cached
+
+    fields = {}
+    def collect_field(key: str, value: str) -> None:
+        fields[key] = value
+        # The schema orders narration right after videoDescription
+        if key == "narration" and on_video_ready:
+            on_video_ready(fields["videoDescription"], value)
+
+    # Get a schema-constrained response from Ollama
+    logger.info("Sending request to Ollama")
+    with tracing.span("llm", model=llm.DESCRIPTION_MODEL), stage_seconds.time(stage="llm"):
+        content = await llm.generate_description([
             {
                 'role': 'system',
-                'content': formatted_prompt,
+                'content': SYSTEM_PROMPT,
             },
             {
                 'role': 'user',
-                'content': request.topic,
+                'content': topic,
             },
-        ])
-        
-        # Log response for debugging
-        logger.info("Received response from Ollama")
-        logger.debug(f"Raw Ollama response: {response}")
-        response_content = response["message"]["content"]
-        logger.info("Parsing response content as JSON")
-        
-        content = json.loads(response_content)
-        logger.info("Successfully parsed JSON response")
-        
-        # Create prompt data using the new PromptCreate model
-        prompt_data = PromptCreate(
-            topic=request.topic,
-            output=content["videoDescription"],
-            top_text=content["topText"],
-            bottom_text=content["bottomText"],
-            metadata={
-                "generated_at": datetime.datetime.now().isoformat(),
-                "model": "llama3.2:3b"
-            }
-        )
-        
-        # Store in database using the common db module
-        logger.info(f"Storing prompt in database: {prompt_data}")
-        await db.store_prompt(prompt_data)
-        
-        # Trigger video generation with the generated description
-        logger.info("Triggering video generation")
-        video_status = await trigger_video_generation(content["videoDescription"])
+        ], on_field=collect_field)
+    logger.info("Received structured response from Ollama")
+    
+    # Create prompt data using the new PromptCreate model
+    prompt_data = PromptCreate(
+        topic=topic,
+        output=content["videoDescription"],
+        top_text=content["topText"],
+        bottom_text=content["bottomText"],
+        metadata={
+            "generated_at": datetime.datetime.now().isoformat(),
+            "model": llm.DESCRIPTION_MODEL,
+            "narration": content["narration"]
+        }
+    )
+    
+    # Queue for a background write; the response doesn't wait on the database
+    logger.debug("Queueing prompt for database write: %s", log.summary(prompt_data))
+    write_buffer.enqueue_prompt(prompt_data)
+    if DESCRIPTION_CACHE_ENABLED:
+        description_cache.add(topic, content)
+    return content
+
+@app.post("/generate", response_model=GenerateResponse)
+async def generate_description(request: GenerateRequest):
+    logger.info("Generating description for topic: %s", request.topic)
+    try:
+        # Queue the video as soon as the description and narration have
+        # streamed in, while the meme text is still being generated
+        video_task = None
+        def start_video(description: str, narration: str) -> None:
+            nonlocal video_task
+            if video_task is None:
+                logger.info("Triggering video generation")
+                video_task = asyncio.create_task(trigger_video_generation(description, narration))
+
+        content = await generate_content(request.topic, on_video_ready=start_video)
+        start_video(content["videoDescription"], content["narration"])
+        video_status = await video_task
         
         return GenerateResponse(
             result=json.dumps(content),
             video_generation_status=video_status
         )
-    except json.JSONDecodeError as e:
-        print("JSON Decode Error:", str(e))
-        print("Response Content:", response_content)
-        raise HTTPException(status_code=500, detail=f"Failed to parse LLM response as JSON: {str(e)}")
+    except llm.LLMOutputError as e:
+        logger.error("LLM Output Error: %s", e)
+        await cancel_video_generation(video_task, "description generation failed")
+        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
-        print("General Error:", str(e))
+        logger.error("General Error: %s", e)
+        await cancel_video_generation(video_task, "description generation failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def wait_for_video_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Poll the video generation service until a queued job finishes."""
+    if "job_id" not in job:
+        raise RuntimeError(f"Video generation was not queued: {job.get('error', job)}")
+
+    url = f"{VIDEO_SERVICE_URL}/jobs/{job['job_id']}"
+    deadline = time.monotonic() + FEED_VIDEO_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        response = await asyncio.to_thread(requests.get, url, timeout=10, headers=tracing.inject())
+        response.raise_for_status()
+        status = response.json()
+        if status["state"] == "succeeded":
+            return status["result"]
+        if status["state"] == "failed":
+            raise RuntimeError(f"Video generation failed: {status['error']}")
+        await asyncio.sleep(FEED_POLL_SECONDS)
+    raise TimeoutError(f"Video job {job['job_id']} did not finish in {FEED_VIDEO_TIMEOUT_SECONDS}s")
+
+async def produce_feed_item(topic: str) -> Dict[str, Any]:
+    """Generate a description and a fully rendered video for the feed pool."""
+    video_task = None
+    def start_video(description: str, narration: str) -> None:
+        nonlocal video_task
+        if video_task is None:
+            video_task = asyncio.create_task(trigger_video_generation(description, narration))
+
+    # Background fills get their own trace, like a request would
+    with tracing.span("feed.produce", topic=topic):
+        try:
+            content = await generate_content(topic, on_video_ready=start_video)
+        except Exception:
+            await cancel_video_generation(video_task, "description generation failed")
+            raise
+        start_video(content["videoDescription"], content["narration"])
+        job = await video_task
+        with tracing.span("wait_for_video"), stage_seconds.time(stage="wait_for_video"):
+            video = await wait_for_video_job(job)
+    return {
+        "topic": topic,
+        "description": content["videoDescription"],
+        "top_text": content["topText"],
+        "bottom_text": content["bottomText"],
+        "video": video
+    }
+
+feed_pool = FeedPool(
+    FEED_TOPICS,
+    produce_feed_item,
+    low_water=FEED_LOW_WATER,
+    high_water=FEED_HIGH_WATER,
+    fill_concurrency=FEED_FILL_CONCURRENCY
+)
+
+metrics.REGISTRY.gauge(
+    "feed_pool_ready", "Ready feed items per topic", ["topic"],
+    callback=lambda: feed_pool.stats()["ready"]
+)
+metrics.REGISTRY.gauge(
+    "db_writes_pending", "Records waiting in the write-behind buffer",
+    callback=lambda: write_buffer.pending
+)
+
+async def fetch_video_spans(trace_id: str):
+    """Spans the video service (or dispatcher) recorded for the same trace."""
+    response = await asyncio.to_thread(requests.get, f"{VIDEO_SERVICE_URL}/traces/{trace_id}", timeout=5)
+    response.raise_for_status()
+    return response.json()["spans"]
+
+instrument(app, "video-description", remote_spans=fetch_video_spans)
+
+@app.on_event("startup")
+async def start_feed_warmer():
+    if FEED_WARMER_ENABLED:
+        feed_pool.start()
+
+@app.on_event("shutdown")
+async def stop_feed_warmer():
+    await feed_pool.stop()
+
+@app.on_event("startup")
+async def start_write_buffer():
+    await write_buffer.start()
+
+@app.on_event("shutdown")
+async def close_db():
+    await write_buffer.stop()
+    await db.aclose()
+
+@app.get("/feed/next")
+async def feed_next(n: int = Query(1, ge=1, le=50), topic: Optional[str] = None):
+    """Pop up to `n` pre-rendered feed items. Never waits on generation."""
+    items = feed_pool.pop(n, topic=topic)
+    return {"items": items, "pool": feed_pool.stats()["ready"]}
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """Token throughput, retry rate and truncation rate of description generation."""
+    return llm.stats.as_dict()
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters and size of the description cache."""
+    return description_cache.stats()
+
 @app.get("/get_prompts")
-async def get_prompts(limit: int = 10, offset: int = 0):
-    logger.info(f"Getting prompts with limit={limit} and offset={offset}")
+async def get_prompts(request: Request, limit: int = Query(10, ge=1, le=100), cursor: Optional[str] = None):
+    """
+    Return a page of prompts as {"items": [...], "next_cursor": ...}.
+    Pass `next_cursor` back as `cursor` for the following page. Supports
+    If-None-Match, so unchanged pages cost a 304.
+    """
+    logger.info("Getting prompts with limit=%s and cursor=%s", limit, cursor)
     try:
-        raw_prompts = await db.get_prompts(limit)
-        logger.info(f"Retrieved {len(raw_prompts) if raw_prompts else 0} prompts from database")
-        
-        # Convert raw prompts to the expected format
-        formatted_prompts = []
-        for i, prompt in enumerate(raw_prompts):
-            # Extract the actual data from the Basic.tech response
-            prompt_value = prompt["data"]["value"]
-            formatted_prompts.append({
-                "data": {
-                    "id": str(i),
-                    "value": {
-                        "topic": prompt_value["topic"],
-                        "output": prompt_value["output"],
-                        "top_text": prompt_value["top_text"],
-                        "bottom_text": prompt_value["bottom_text"],
-                        "metadata": prompt_value.get("metadata", {})
-                    }
-                }
-            })
-        
-        logger.info(f"Returning {len(formatted_prompts)} formatted prompts")
-        logger.debug(f"Formatted prompts: {json.dumps(formatted_prompts, indent=2)}")
-        return formatted_prompts
+        page = await db.get_prompts(limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error getting prompts: {str(e)}")
-        logger.exception("Full traceback:")
+        logger.exception("Error getting prompts: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+    body = page.model_dump_json().encode()
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    logger.info("Returning %d prompts", len(page.items))
+    return Response(content=body, media_type="application/json", headers=headers)
+
 if __name__ == '__main__':
     uvicorn.run(app, host='0.0.0.0', port=5000) 
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Cache of LLM-generated descriptions keyed on the normalized topic.
+
+Lookups go through two tiers:
+- exact: the normalized topic string
+- near-duplicate (optional): cosine similarity of character-trigram vectors,
+  so "cat playing the piano!" can reuse "cat playing piano"
+
+Each topic keeps several generated variants, served in rotation so repeat
+topics don't always show the same video.
+"""
+import json
+import math
+import random
+import re
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_topic(topic: str) -> str:
+    topic = unicodedata.normalize("NFKC", topic).lower()
+    topic = _PUNCTUATION.sub(" ", topic)
+    return _WHITESPACE.sub(" ", topic).strip()
+
+
+def _trigram_vector(text: str) -> Dict[str, float]:
+    padded = f"  {text} "
+    counts = Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    return {gram: c / norm for gram, c in counts.items()}
+
+
+def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(gram, 0.0) for gram, weight in a.items())
+
+
+class _Entry:
+    __slots__ = ("variants", "next_variant", "vector", "size")
+
+    def __init__(self, key: str, vector: Optional[Dict[str, float]]):
+        self.variants: List[tuple] = []  # (created_at, content, size)
+        self.next_variant = 0
+        self.vector = vector
+        self.size = len(key)
+
+
+class DescriptionCache:
+    def __init__(self, max_variants: int = 3, ttl: float = 6 * 3600, max_bytes: int = 8 * 1024 * 1024,
+                 refresh_probability: float = 0.1, near_duplicates: bool = False,
+                 similarity_threshold: float = 0.85):
+        """
+        Args:
+            max_variants: Generated variants kept per topic.
+            ttl: Seconds a variant is served before it expires.
+            max_bytes: Approximate memory cap; least recently used topics are evicted past it.
+            refresh_probability: Chance that a hit on a topic with fewer than
+                `max_variants` variants is reported as a miss so another is generated.
+            near_duplicates: Enable the similarity tier.
+            similarity_threshold: Minimum cosine similarity for a near-duplicate hit.
+        """
+        self.max_variants = max_variants
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.refresh_probability = refresh_probability
+        self.near_duplicates = near_duplicates
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self.counters = Counter(exact_hits=0, near_hits=0, misses=0, refreshes=0, evictions=0)
+
+    def get(self, topic: str) -> Optional[Dict[str, Any]]:
+        """Return a cached description for `topic`, or None if one should be generated."""
+        key = normalize_topic(topic)
+        entry = self._live_entry(key)
+        tier = "exact_hits"
+        if entry is None and self.near_duplicates:
+            key, entry = self._nearest(key)
+            tier = "near_hits"
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+
+        if len(entry.variants) < self.max_variants and random.random() < self.refresh_probability:
+            self.counters["refreshes"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.counters[tier] += 1
+        content = entry.variants[entry.next_variant % len(entry.variants)][1]
+        entry.next_variant += 1
+        return content
+
+    def add(self, topic: str, content: Dict[str, Any]) -> None:
+        key = normalize_topic(topic)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _Entry(key, _trigram_vector(key) if self.near_duplicates else None)
+            self._entries[key] = entry
+            self._bytes += entry.size
+        size = len(json.dumps(content))
+        entry.variants.append((time.monotonic(), content, size))
+        entry.size += size
+        self._bytes += size
+        if len(entry.variants) > self.max_variants:
+            _, _, dropped = entry.variants.pop(0)
+            entry.size -= dropped
+            self._bytes -= dropped
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["exact_hits"] + self.counters["near_hits"] + self.counters["misses"] + self.counters["refreshes"]
+        hits = self.counters["exact_hits"] + self.counters["near_hits"]
+        return {
+            **self.counters,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "topics": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    def _live_entry(self, key: str) -> Optional[_Entry]:
+        """The entry for `key` with expired variants dropped, if any remain."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        cutoff = time.monotonic() - self.ttl
+        while entry.variants and entry.variants[0][0] < cutoff:
+            _, _, size = entry.variants.pop(0)
+            entry.size -= size
+            self._bytes -= size
+        if not entry.variants:
+            self._remove(key)
+            return None
+        return entry
+
+    def _nearest(self, key: str):
+        vector = _trigram_vector(key)
+        best_key, best_score = None, self.similarity_threshold
+        for candidate, entry in self._entries.items():
+            score = _cosine(vector, entry.vector)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        if best_key is None:
+            return None, None
+        return best_key, self._live_entry(best_key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.counters["evictions"] += 1
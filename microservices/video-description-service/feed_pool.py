@@ -0,0 +1,122 @@
+"""
+Pool of pre-generated feed items, kept warm in the background.
+
+Each topic bucket is refilled up to a high-water mark whenever it drops
+below its low-water mark, so serving the feed never waits on generation.
+"""
+import asyncio
+import collections
+import logging
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# produce(topic) -> a ready-to-serve feed item
+Producer = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+class FeedPool:
+    def __init__(self, topics: List[str], produce: Producer, low_water: int = 2,
+                 high_water: int = 5, fill_concurrency: int = 2, retry_delay: float = 5.0):
+        """
+        Args:
+            topics: Topic buckets to keep warm.
+            produce: Coroutine that generates one item for a topic.
+            low_water: A bucket is refilled once it holds fewer ready items than this.
+            high_water: Refills stop once ready plus in-progress items reach this.
+            fill_concurrency: Maximum number of items generated at once.
+            retry_delay: Seconds to back off after a failed fill.
+        """
+        if high_water < low_water:
+            raise ValueError("high_water must be >= low_water")
+        self.produce = produce
+        self.low_water = low_water
+        self.high_water = high_water
+        self.retry_delay = retry_delay
+        self._buckets: Dict[str, Deque[Dict[str, Any]]] = {topic: collections.deque() for topic in topics}
+        self._filling: Dict[str, int] = {topic: 0 for topic in topics}
+        self._order: Deque[str] = collections.deque(topics)
+        self._semaphore = asyncio.Semaphore(fill_concurrency)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._fills: set = set()
+        self._served = 0
+        self._misses = 0
+        self._failures = 0
+
+    def start(self) -> None:
+        self._wakeup.set()
+        self._task = asyncio.create_task(self._warm_loop())
+
+    async def stop(self) -> None:
+        tasks = [t for t in [self._task, *self._fills] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    def pop(self, n: int = 1, topic: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Take up to `n` ready items without waiting. Items are drawn round-robin
+        across buckets unless `topic` is given.
+        """
+        items: List[Dict[str, Any]] = []
+        if topic is not None:
+            bucket = self._buckets.get(topic)
+            while bucket and len(items) < n:
+                items.append(bucket.popleft())
+        else:
+            empty_in_a_row = 0
+            while len(items) < n and empty_in_a_row < len(self._order):
+                name = self._order[0]
+                self._order.rotate(-1)
+                bucket = self._buckets[name]
+                if bucket:
+                    items.append(bucket.popleft())
+                    empty_in_a_row = 0
+                else:
+                    empty_in_a_row += 1
+
+        self._served += len(items)
+        self._misses += n - len(items)
+        self._wakeup.set()
+        return items
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "low_water": self.low_water,
+            "high_water": self.high_water,
+            "ready": {name: len(bucket) for name, bucket in self._buckets.items()},
+            "filling": dict(self._filling),
+            "served": self._served,
+            "misses": self._misses,
+            "fill_failures": self._failures,
+        }
+
+    async def _warm_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            for topic, bucket in self._buckets.items():
+                if len(bucket) >= self.low_water:
+                    continue
+                for _ in range(self.high_water - len(bucket) - self._filling[topic]):
+                    self._filling[topic] += 1
+                    task = asyncio.create_task(self._fill(topic))
+                    self._fills.add(task)
+                    task.add_done_callback(self._fills.discard)
+
+    async def _fill(self, topic: str) -> None:
+        try:
+            async with self._semaphore:
+                item = await self.produce(topic)
+            self._buckets[topic].append(item)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._failures += 1
+            logger.error("Failed to pre-generate feed item for topic '%s': %s", topic, e)
+            await asyncio.sleep(self.retry_delay)
+        finally:
+            self._filling[topic] -= 1
+            self._wakeup.set()
@@ -0,0 +1,62 @@
+"""
+Incremental parser for a streamed JSON object.
+
+Fed the model output chunk by chunk, it reports each top-level string field
+as soon as its closing quote arrives, so downstream work can start before
+the rest of the object has been generated.
+"""
+import json
+from typing import List, Tuple
+
+
+class JSONFieldStream:
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buffer: List[str] = []
+        self._expect_key = True
+        self._key = None
+        self.fields = {}
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """Consume a chunk and return the (key, value) string fields it completed."""
+        completed = []
+        for ch in text:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._end_string(completed)
+                    continue
+                self._buffer.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._buffer = []
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect_key = True
+            elif ch in "}]":
+                self._depth -= 1
+            elif self._depth == 1 and ch == ":":
+                self._expect_key = False
+            elif self._depth == 1 and ch == ",":
+                self._expect_key = True
+        return completed
+
+    def _end_string(self, completed: List[Tuple[str, str]]) -> None:
+        if self._depth != 1:
+            return
+        value = json.loads('"' + "".join(self._buffer) + '"')
+        if self._expect_key:
+            self._key = value
+        elif self._key is not None:
+            self.fields[self._key] = value
+            completed.append((self._key, value))
+            self._key = None
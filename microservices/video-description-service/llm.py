@@ -0,0 +1,148 @@
+"""
+Structured generation of video descriptions, narration and meme text with Ollama.
+
+The model is constrained to the description JSON schema through Ollama's
+`format` parameter, so its output parses on the first try instead of
+failing after an expensive generation. Output is streamed, and each field
+is reported as soon as it is complete.
+"""
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from ollama import AsyncClient
+from pydantic import BaseModel, ValidationError
+
+from json_stream import JSONFieldStream
+
+logger = logging.getLogger(__name__)
+
+DESCRIPTION_MODEL = os.getenv("DESCRIPTION_MODEL", "llama3.2:3b")
+# Room for all four fields, narration included, plus the JSON around them;
+# a reply cut off at the limit fails validation and costs a full retry
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "512"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "2"))
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.8"))
+# Keep the model loaded between requests instead of reloading it per call
+LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")
+
+
+class VideoDescription(BaseModel):
+    # Field order is generation order: the video can start once the first two are done
+    videoDescription: str
+    narration: str
+    topText: str
+    bottomText: str
+
+
+DESCRIPTION_SCHEMA = VideoDescription.model_json_schema()
+
+
+class LLMOutputError(Exception):
+    """Raised when the model does not produce a valid description within LLM_MAX_ATTEMPTS."""
+
+
+class GenerationStats:
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        # Replies cut off by LLM_MAX_TOKENS
+        self.truncations = 0
+        self.output_tokens = 0
+        self.eval_seconds = 0.0
+
+    def record(self, response) -> None:
+        self.calls += 1
+        if response.get("done_reason") == "length":
+            self.truncations += 1
+        # Ollama reports generated tokens and generation time (in ns)
+        self.output_tokens += response.get("eval_count") or 0
+        self.eval_seconds += (response.get("eval_duration") or 0) / 1e9
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "retry_rate": round(self.retries / self.calls, 3) if self.calls else 0.0,
+            "truncations": self.truncations,
+            "truncation_rate": round(self.truncations / self.calls, 3) if self.calls else 0.0,
+            "output_tokens": self.output_tokens,
+            "tokens_per_second": round(self.output_tokens / self.eval_seconds, 1) if self.eval_seconds else None,
+        }
+
+
+stats = GenerationStats()
+
+# Reads OLLAMA_HOST like the module-level ollama functions
+client = AsyncClient()
+
+
+async def generate_description(messages: List[Dict[str, str]],
+                               on_field: Optional[Callable[[str, str], None]] = None) -> Dict[str, str]:
+    """
+    Ask the model for a description constrained to DESCRIPTION_SCHEMA.
+
+    Args:
+        messages: Chat messages to send
+        on_field: Called as on_field(key, value) as soon as each field has
+            been generated, before the rest of the response arrives. Each key
+            is reported once: a field reported by an attempt that then fails
+            validation is kept, and overrides the retry's value, since the
+            caller may already have acted on it (e.g. queued the video).
+
+    Raises:
+        LLMOutputError: If no attempt produced output matching the schema
+    """
+    last_error = None
+    reported: Dict[str, str] = {}
+
+    def report(key: str, value: str) -> None:
+        if key in reported:
+            return
+        reported[key] = value
+        if on_field:
+            on_field(key, value)
+
+    for attempt in range(LLM_MAX_ATTEMPTS):
+        if attempt:
+            stats.retries += 1
+        parser = JSONFieldStream()
+        chunks = []
+        truncated = False
+        stream = await client.chat(
+            model=DESCRIPTION_MODEL,
+            messages=messages,
+            format=DESCRIPTION_SCHEMA,
+            options={"num_predict": LLM_MAX_TOKENS, "temperature": LLM_TEMPERATURE},
+            stream=True,
+            keep_alive=LLM_KEEP_ALIVE,
+        )
+        async for part in stream:
+            text = part["message"]["content"]
+            chunks.append(text)
+            for key, value in parser.feed(text):
+                report(key, value)
+            if part.get("done"):
+                # The final chunk carries the eval counters and why generation stopped
+                stats.record(part)
+                truncated = part.get("done_reason") == "length"
+        content = "".join(chunks)
+        try:
+            result = VideoDescription.model_validate_json(content).model_dump()
+        except ValidationError as e:
+            last_error = e
+            if truncated:
+                logger.warning("Model output was cut off at LLM_MAX_TOKENS=%d (attempt %d)",
+                               LLM_MAX_TOKENS, attempt + 1)
+            else:
+                logger.warning("Model output did not match the description schema (attempt %d): %s",
+                               attempt + 1, e)
+            continue
+        # Fields reported by an earlier attempt win over this attempt's
+        result.update(reported)
+        return result
+
+    stats.failures += 1
+    raise LLMOutputError(f"No valid description after {LLM_MAX_ATTEMPTS} attempts: {str(last_error)}")
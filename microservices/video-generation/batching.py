@@ -0,0 +1,115 @@
+"""
+Micro-batching for diffusion requests.
+
+Concurrent prompts that share `num_inference_steps` and `num_frames` are
+collected for a short window and run as a single batched pipeline call.
+Each prompt keeps its own seed, so batching does not change its output.
+"""
+import asyncio
+import collections
+import time
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+# run_batch(prompts, seeds, num_inference_steps, num_frames) -> one frame list per prompt
+BatchRunner = Callable[[List[str], List[Optional[int]], int, int], Awaitable[List[Any]]]
+BatchKey = Tuple[int, int]
+
+
+class DiffusionBatcher:
+    def __init__(self, run_batch: BatchRunner, max_batch_size: int = 4,
+                 window_seconds: float = 0.1, latency_window: int = 1000):
+        """
+        Args:
+            run_batch: Coroutine that runs the pipeline on a list of prompts.
+            max_batch_size: A batch is dispatched as soon as it has this many prompts.
+            window_seconds: How long the first prompt of a batch waits for others.
+            latency_window: Number of recent requests kept for latency percentiles.
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.window_seconds = window_seconds
+        self._pending: Dict[BatchKey, List[Tuple[str, Optional[int], asyncio.Future, float]]] = {}
+        self._timers: Dict[BatchKey, asyncio.TimerHandle] = {}
+        self._batch_sizes: Dict[int, int] = collections.Counter()
+        self._latencies: Deque[float] = collections.deque(maxlen=latency_window)
+        # The loop only keeps weak references to tasks, so running batches are held here
+        self._runs: Set[asyncio.Task] = set()
+
+    async def submit(self, prompt: str, num_inference_steps: int, num_frames: int,
+                     seed: Optional[int] = None) -> Any:
+        """Queue one prompt and wait for its frames. A None seed means a random one."""
+        loop = asyncio.get_running_loop()
+        key = (num_inference_steps, num_frames)
+        future = loop.create_future()
+        start = time.perf_counter()
+
+        batch = self._pending.setdefault(key, [])
+        batch.append((prompt, seed, future, start))
+        if len(batch) >= self.max_batch_size:
+            self._dispatch(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.window_seconds, self._dispatch, key)
+
+        try:
+            return await future
+        finally:
+            self._latencies.append(time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        batches = sum(self._batch_sizes.values())
+        prompts = sum(size * count for size, count in self._batch_sizes.items())
+        latencies = sorted(self._latencies)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "window_ms": round(self.window_seconds * 1000),
+            "batches": batches,
+            "mean_batch_size": round(prompts / batches, 2) if batches else 0.0,
+            "batch_size_counts": dict(sorted(self._batch_sizes.items())),
+            "pending": sum(len(batch) for batch in self._pending.values()),
+            "latency_seconds": {
+                "p50": _percentile(latencies, 0.50),
+                "p95": _percentile(latencies, 0.95),
+                "max": round(latencies[-1], 3) if latencies else None,
+            },
+        }
+
+    def _dispatch(self, key: BatchKey) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if batch:
+            task = asyncio.ensure_future(self._run(key, batch))
+            self._runs.add(task)
+            task.add_done_callback(self._runs.discard)
+
+    async def _run(self, key: BatchKey, batch: List[Tuple[str, Optional[int], asyncio.Future, float]]) -> None:
+        num_inference_steps, num_frames = key
+        self._batch_sizes[len(batch)] += 1
+        try:
+            results = await self.run_batch(
+                [prompt for prompt, _, _, _ in batch],
+                [seed for _, seed, _, _ in batch],
+                num_inference_steps,
+                num_frames
+            )
+        except Exception as e:
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except asyncio.CancelledError:
+            # Don't leave the waiting requests hanging
+            for _, _, future, _ in batch:
+                future.cancel()
+            raise
+        for (_, _, future, _), frames in zip(batch, results):
+            if not future.done():
+                future.set_result(frames)
+
+
+def _percentile(sorted_values: List[float], fraction: float):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
@@ -0,0 +1,365 @@
+"""
+Single-pass ffmpeg encoding of diffusion frames.
+
+Frames are piped to ffmpeg as raw RGB over stdin, and the narration audio is
+muxed in the same pass, so there is no intermediate video file and no
+Python-side frame re-encoding.
+
+The same pass can produce several renditions: the full video, a small
+low-bitrate preview, poster frames (JPEG, WebP) and HLS segments. The
+frames are decoded once and split inside ffmpeg, so each extra rendition
+only costs its own encode.
+
+Entry points:
+- encode_renditions writes faststart MP4s, posters and optionally HLS next
+  to the full video's path (disk I/O mode); encode_video is its full-only form
+- encode_video_stream takes the narration as raw PCM over a second pipe and
+  yields a fragmented MP4 from stdout; the preview and posters come back
+  over further pipes, so nothing touches the filesystem (memory I/O mode)
+"""
+import math
+import os
+import subprocess
+import threading
+import wave
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+VIDEO_FPS = int(os.getenv("VIDEO_FPS", "8"))
+ENCODE_PRESET = os.getenv("ENCODE_PRESET", "veryfast")
+ENCODE_CRF = int(os.getenv("ENCODE_CRF", "23"))
+
+# Extra renditions, encoded in the same pass as the full video
+ENCODE_PREVIEW = os.getenv("ENCODE_PREVIEW", "true").lower() == "true"
+PREVIEW_HEIGHT = int(os.getenv("PREVIEW_HEIGHT", "144"))
+PREVIEW_CRF = int(os.getenv("PREVIEW_CRF", "32"))
+PREVIEW_MAX_BITRATE = os.getenv("PREVIEW_MAX_BITRATE", "150k")
+POSTER_FORMATS = [f.strip() for f in os.getenv("POSTER_FORMATS", "jpeg,webp").split(",") if f.strip()]
+# HLS needs a directory for its segments, so it is only written in disk I/O mode
+ENCODE_HLS = os.getenv("ENCODE_HLS", "false").lower() == "true"
+HLS_SEGMENT_SECONDS = int(os.getenv("HLS_SEGMENT_SECONDS", "2"))
+
+# Poster format -> (file extension, content type, ffmpeg output options)
+POSTERS = {
+    "jpeg": ("jpg", "image/jpeg", ["-c:v", "mjpeg", "-pix_fmt", "yuvj420p", "-q:v", "3", "-f", "mjpeg"]),
+    "webp": ("webp", "image/webp", ["-c:v", "libwebp", "-quality", "80", "-f", "webp"]),
+}
+HLS_CONTENT_TYPE = "application/vnd.apple.mpegurl"
+
+
+def encode_settings() -> Dict[str, object]:
+    """The settings that shape encoded output, so cached renders can be keyed on them."""
+    return {
+        "fps": VIDEO_FPS,
+        "preset": ENCODE_PRESET,
+        "crf": ENCODE_CRF,
+        "preview": [PREVIEW_HEIGHT, PREVIEW_CRF, PREVIEW_MAX_BITRATE] if ENCODE_PREVIEW else None,
+        "posters": POSTER_FORMATS,
+        "hls": HLS_SEGMENT_SECONDS if ENCODE_HLS else None,
+    }
+
+
+def to_rgb24(frame) -> np.ndarray:
+    """Convert a diffusion frame (float in [0, 1], uint8 or PIL image) to HxWx3 uint8."""
+    array = np.asarray(frame)
+    if array.dtype != np.uint8:
+        array = (np.clip(array, 0.0, 1.0) * 255).round().astype(np.uint8)
+    if array.ndim == 2:
+        array = np.stack([array] * 3, axis=-1)
+    return np.ascontiguousarray(array[..., :3])
+
+
+def wav_duration(path: str) -> float:
+    with wave.open(path, "rb") as f:
+        return f.getnframes() / float(f.getframerate())
+
+
+class PCMAudio(NamedTuple):
+    """Signed 16-bit little-endian PCM held in memory."""
+    data: bytes
+    sample_rate: int
+    channels: int = 1
+
+    @property
+    def duration(self) -> float:
+        return len(self.data) / float(2 * self.channels * self.sample_rate)
+
+
+def _loop_count(num_frames: int, fps: int, audio_seconds: Optional[float]) -> int:
+    """Extra plays of the clip needed to cover the narration."""
+    if not audio_seconds:
+        return 0
+    return max(0, math.ceil(audio_seconds / (num_frames / fps)) - 1)
+
+
+def encoded_duration(num_frames: int, audio_seconds: Optional[float] = None, fps: int = VIDEO_FPS) -> float:
+    """Length in seconds of the video encode_video produces, including loops to cover the audio."""
+    return (_loop_count(num_frames, fps, audio_seconds) + 1) * num_frames / fps
+
+
+class Rendition(NamedTuple):
+    """One output of the encode pass; `args` are its ffmpeg output options, without the target."""
+    name: str
+    content_type: str
+    extension: str
+    args: List[str]
+
+
+def plan_renditions(height: int, num_frames: int, loops: int, has_audio: bool, preset: str, crf: int,
+                    preview: bool = False, posters: Sequence[str] = (),
+                    hls_prefix: Optional[str] = None) -> Tuple[str, List[Rendition]]:
+    """
+    The filter graph splitting the input frames between renditions, and the
+    renditions in output order. The full video always comes first.
+
+    Args:
+        preview: Add a PREVIEW_HEIGHT, bitrate-capped preview
+        posters: Poster formats (keys of POSTERS) of the middle frame
+        hls_prefix: Write HLS as `<prefix>.m3u8` and `<prefix>_NNN.ts`
+    """
+    unknown = [f for f in posters if f not in POSTERS]
+    if unknown:
+        raise ValueError(f"Unknown poster formats: {', '.join(unknown)}")
+
+    audio = ["-map", "1:a", "-c:a", "aac"] if has_audio else []
+    x264 = ["-c:v", "libx264", "-preset", preset, "-pix_fmt", "yuv420p"]
+    full = x264 + ["-crf", str(crf)] + (audio + ["-b:a", "128k"] if has_audio else [])
+    renditions = [Rendition("full", "video/mp4", "mp4", ["-map", "[full]"] + full)]
+    branches = ["full"]
+    graph = []
+    if preview:
+        # Even dimensions for yuv420p; never upscale
+        preview_height = max(min(height, PREVIEW_HEIGHT) // 2 * 2, 2)
+        branches.append("preview_in")
+        graph.append(f"[preview_in]scale=-2:{preview_height}[preview]")
+        renditions.append(Rendition("preview", "video/mp4", "preview.mp4", (
+            ["-map", "[preview]"] + x264
+            + ["-crf", str(PREVIEW_CRF), "-maxrate", PREVIEW_MAX_BITRATE, "-bufsize", PREVIEW_MAX_BITRATE]
+            + (audio + ["-b:a", "48k", "-ac", "1"] if has_audio else [])
+        )))
+    if posters:
+        middle = num_frames // 2
+        labels = [f"poster_{fmt}" for fmt in posters]
+        branches.append("poster_in")
+        trim = f"[poster_in]trim=start_frame={middle}:end_frame={middle + 1}"
+        graph.append(trim + (f",split={len(labels)}" if len(labels) > 1 else "") + "".join(f"[{l}]" for l in labels))
+        for fmt, label in zip(posters, labels):
+            extension, content_type, codec = POSTERS[fmt]
+            renditions.append(Rendition(f"poster.{fmt}", content_type, f"poster.{extension}",
+                                        ["-map", f"[{label}]", "-frames:v", "1"] + codec))
+    if hls_prefix is not None:
+        branches.append("hls")
+        renditions.append(Rendition("hls", HLS_CONTENT_TYPE, "m3u8", (
+            ["-map", "[hls]"] + full
+            # Segments can only be cut on keyframes
+            + ["-force_key_frames", f"expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})",
+               "-f", "hls", "-hls_time", str(HLS_SEGMENT_SECONDS), "-hls_playlist_type", "vod",
+               "-hls_segment_filename", f"{hls_prefix}_%03d.ts"]
+        )))
+
+    source = []
+    if loops:
+        # -stream_loop needs a seekable input, which stdin is not; the loop
+        # filter replays the (small) clip from memory instead
+        source.append(f"loop=loop={loops}:size={num_frames}:start=0")
+    source.append(f"split={len(branches)}" if len(branches) > 1 else "null")
+    graph.insert(0, "[0:v]" + ",".join(source) + "".join(f"[{b}]" for b in branches))
+    return ";".join(graph), renditions
+
+
+def _ffmpeg_inputs(width: int, height: int, fps: int, audio_input: List[str], filter_graph: str) -> List[str]:
+    return [
+        FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps),
+        "-i", "pipe:0",
+    ] + audio_input + ["-filter_complex", filter_graph]
+
+
+def _mp4_args(rendition: Rendition, fragmented: bool) -> List[str]:
+    if rendition.content_type != "video/mp4":
+        return []
+    if fragmented:
+        # Faststart needs a seekable output, so piped MP4s are fragmented instead
+        return ["-movflags", "frag_keyframe+empty_moov+default_base_moof", "-f", "mp4"]
+    return ["-movflags", "+faststart"]
+
+
+def _frame_bytes(video_frames: Sequence) -> Iterator[bytes]:
+    for frame in video_frames:
+        yield to_rgb24(frame).tobytes()
+
+
+def _write_all(pipe, chunks: Iterable[bytes]) -> None:
+    try:
+        for chunk in chunks:
+            pipe.write(chunk)
+    except BrokenPipeError:
+        # ffmpeg exited early; its stderr says why
+        pass
+    finally:
+        try:
+            pipe.close()
+        except BrokenPipeError:
+            pass
+
+
+def encode_renditions(video_frames: Sequence, output_path: str, audio_path: Optional[str] = None,
+                      preview: bool = ENCODE_PREVIEW, posters: Sequence[str] = POSTER_FORMATS,
+                      hls: bool = ENCODE_HLS, fps: int = VIDEO_FPS, preset: str = ENCODE_PRESET,
+                      crf: int = ENCODE_CRF) -> Dict[str, str]:
+    """
+    Encode frames (and optionally a WAV narration) to an H.264/AAC MP4 at
+    `output_path`, plus the requested renditions next to it, in one pass.
+
+    If the audio is longer than the clip, the clip is looped enough times to
+    cover it, matching the previous moviepy behaviour.
+
+    Returns the path of each rendition by name ("full", "preview",
+    "poster.<format>", and "hls" for the playlist; its segments sit beside it).
+    """
+    if not len(video_frames):
+        raise ValueError("No frames to encode")
+    height, width = to_rgb24(video_frames[0]).shape[:2]
+    num_frames = len(video_frames)
+    stem = os.path.splitext(output_path)[0]
+
+    audio_input = ["-i", audio_path] if audio_path else []
+    loops = _loop_count(num_frames, fps, wav_duration(audio_path) if audio_path else None)
+    graph, renditions = plan_renditions(height, num_frames, loops, bool(audio_path), preset, crf,
+                                        preview=preview, posters=posters, hls_prefix=stem if hls else None)
+    cmd = _ffmpeg_inputs(width, height, fps, audio_input, graph)
+    paths = {}
+    for rendition in renditions:
+        paths[rendition.name] = output_path if rendition.name == "full" else f"{stem}.{rendition.extension}"
+        cmd += rendition.args + _mp4_args(rendition, fragmented=False) + [paths[rendition.name]]
+
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    _write_all(process.stdin, _frame_bytes(video_frames))
+    stderr = process.stderr.read()
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()}")
+    return paths
+
+
+def encode_video(video_frames: Sequence, output_path: str, audio_path: Optional[str] = None,
+                 fps: int = VIDEO_FPS, preset: str = ENCODE_PRESET, crf: int = ENCODE_CRF) -> str:
+    """Encode only the full rendition to `output_path`."""
+    return encode_renditions(video_frames, output_path, audio_path, preview=False, posters=(), hls=False,
+                             fps=fps, preset=preset, crf=crf)["full"]
+
+
+def rendition_content_type(name: str) -> str:
+    if name == "hls":
+        return HLS_CONTENT_TYPE
+    if name.startswith("poster."):
+        return POSTERS[name.split(".", 1)[1]][1]
+    return "video/mp4"
+
+
+def encode_video_stream(video_frames: Sequence, audio: Optional[PCMAudio] = None,
+                        side_outputs: Optional[Dict[str, bytes]] = None,
+                        fps: int = VIDEO_FPS, preset: str = ENCODE_PRESET, crf: int = ENCODE_CRF,
+                        chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """
+    Encode frames (and optionally in-memory PCM narration) to a fragmented
+    MP4, yielded in chunks as ffmpeg produces it.
+
+    Faststart needs a seekable output, so the stream is fragmented instead;
+    browsers and the Range streaming endpoint play it the same way.
+
+    Args:
+        side_outputs: If given, the preview and posters (per ENCODE_PREVIEW
+            and POSTER_FORMATS) are encoded in the same pass and stored in
+            it by rendition name once the iterator is exhausted. They are
+            small, so they are held in memory.
+
+    Raises:
+        RuntimeError: If ffmpeg fails. Raised after the last chunk, so
+            consumers must not commit the output before the iterator ends.
+    """
+    if not len(video_frames):
+        raise ValueError("No frames to encode")
+    height, width = to_rgb24(video_frames[0]).shape[:2]
+    num_frames = len(video_frames)
+
+    audio_read = audio_write = None
+    audio_input = []
+    if audio is not None:
+        # The narration goes over a second pipe, passed to ffmpeg as an extra fd
+        audio_read, audio_write = os.pipe()
+        audio_input = [
+            "-f", "s16le", "-ar", str(audio.sample_rate), "-ac", str(audio.channels),
+            "-i", f"pipe:{audio_read}",
+        ]
+    loops = _loop_count(num_frames, fps, audio.duration if audio is not None else None)
+    with_side_outputs = side_outputs is not None
+    graph, renditions = plan_renditions(height, num_frames, loops, audio is not None, preset, crf,
+                                        preview=with_side_outputs and ENCODE_PREVIEW,
+                                        posters=POSTER_FORMATS if with_side_outputs else ())
+    cmd = _ffmpeg_inputs(width, height, fps, audio_input, graph)
+    # Each side output gets a pipe of its own, passed to ffmpeg as an extra fd
+    side_pipes: Dict[str, Tuple[int, int]] = {}
+    for rendition in renditions:
+        target = "pipe:1"
+        if rendition.name != "full":
+            side_pipes[rendition.name] = os.pipe()
+            target = f"pipe:{side_pipes[rendition.name][1]}"
+        cmd += rendition.args + _mp4_args(rendition, fragmented=True) + [target]
+
+    pass_fds = [write for _, write in side_pipes.values()]
+    if audio_read is not None:
+        pass_fds.append(audio_read)
+    try:
+        process = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, pass_fds=pass_fds,
+        )
+    finally:
+        # Only ffmpeg holds the write ends now, so the readers see EOF when it exits
+        for _, write in side_pipes.values():
+            os.close(write)
+    side_data: Dict[str, bytes] = {}
+
+    def read_side_output(name: str, read_fd: int) -> None:
+        with os.fdopen(read_fd, "rb") as f:
+            side_data[name] = f.read()
+
+    stderr: List[bytes] = []
+    # ffmpeg reads both inputs while we read its output, so each pipe gets
+    # its own thread to avoid a deadlock on full pipe buffers
+    writers = [
+        threading.Thread(target=_write_all, args=(process.stdin, _frame_bytes(video_frames)), daemon=True),
+        threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True),
+    ] + [
+        threading.Thread(target=read_side_output, args=(name, read), daemon=True)
+        for name, (read, _) in side_pipes.items()
+    ]
+    if audio is not None:
+        os.close(audio_read)
+        writers.append(threading.Thread(
+            target=_write_all, args=(os.fdopen(audio_write, "wb"), [audio.data]), daemon=True
+        ))
+    for thread in writers:
+        thread.start()
+
+    finished = False
+    try:
+        while True:
+            chunk = process.stdout.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        finished = True
+    finally:
+        if not finished:
+            # The consumer stopped early
+            process.kill()
+        process.stdout.close()
+        for thread in writers:
+            thread.join()
+        returncode = process.wait()
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {b''.join(stderr).decode(errors='replace').strip()}")
+    if side_outputs is not None:
+        side_outputs.update(side_data)
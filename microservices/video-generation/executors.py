@@ -0,0 +1,49 @@
+"""
+Executors that keep blocking generation work off the FastAPI event loop.
+
+- GPU work (diffusion, TTS) runs on a single dedicated thread so only one
+  model call touches the accelerator at a time.
+- Encoding runs on a separate thread pool. The encoding itself happens in
+  an ffmpeg subprocess, so these threads only feed it frames and wait.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+
+ENCODE_WORKERS = int(os.getenv("ENCODE_WORKERS", "2"))
+
+GPU_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gpu-worker")
+ENCODE_EXECUTOR = ThreadPoolExecutor(max_workers=ENCODE_WORKERS, thread_name_prefix="encode-worker")
+
+_pending = {"gpu": 0, "encode": 0}
+
+
+async def _run(kind: str, executor, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    _pending[kind] += 1
+    try:
+        return await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+    finally:
+        _pending[kind] -= 1
+
+
+async def run_on_gpu(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run `fn` on the single GPU worker thread."""
+    return await _run("gpu", GPU_EXECUTOR, fn, *args, **kwargs)
+
+
+async def run_encode(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run `fn` on the encode thread pool."""
+    return await _run("encode", ENCODE_EXECUTOR, fn, *args, **kwargs)
+
+
+def stats() -> Dict[str, int]:
+    """Number of submitted-but-unfinished tasks per executor."""
+    return {"gpu_pending": _pending["gpu"], "encode_pending": _pending["encode"]}
+
+
+def shutdown() -> None:
+    GPU_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    ENCODE_EXECUTOR.shutdown(wait=False, cancel_futures=True)
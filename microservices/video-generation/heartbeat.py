@@ -0,0 +1,61 @@
+"""
+Heartbeats from a video-generation worker to the dispatcher.
+
+When DISPATCHER_URL is set, the worker periodically posts its load and model
+residency so the dispatcher can route jobs to it. A missed heartbeat is not
+fatal: the next one re-registers the worker.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatSender:
+    def __init__(self, dispatcher_url: str, payload: Callable[[], Dict[str, Any]], interval: float = 5.0):
+        """
+        Args:
+            dispatcher_url: Base URL of the dispatcher.
+            payload: Builds the heartbeat body (worker_id, url, load and models).
+            interval: Seconds between heartbeats.
+        """
+        self.url = f"{dispatcher_url.rstrip('/')}/workers/heartbeat"
+        self.payload = payload
+        self.interval = interval
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.failed = 0
+        self._failing = False
+
+    async def start(self) -> None:
+        self._client = httpx.AsyncClient(timeout=self.interval)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._client is not None:
+            await self._client.aclose()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                response = await self._client.post(self.url, json=self.payload())
+                response.raise_for_status()
+                self.sent += 1
+                self._failing = False
+            except httpx.HTTPError as e:
+                self.failed += 1
+                # Log the first failure of a streak, not every interval
+                if not self._failing:
+                    logger.warning("Heartbeat to %s failed: %s", self.url, e)
+                self._failing = True
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,165 @@
+"""
+Inference profiles for the text-to-video pipeline.
+
+The "gpu" profile is the original setup: fp16 weights, with model CPU offload
+and VAE slicing on CUDA. The "cpu" profile is for CPU-only nodes, where fp16
+is emulated and very slow. It uses bf16 or fp32, sets the torch thread
+pools, tiles the VAE, slices attention, and switches to a multistep solver
+that needs fewer steps.
+
+INFERENCE_PROFILE picks the profile ("auto", the default, uses "cpu" when
+no accelerator is available). Each INFERENCE_* setting overrides the
+profile default.
+"""
+import logging
+import os
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DTYPES = ("fp16", "bf16", "fp32")
+SCHEDULERS = ("default", "dpm")
+
+
+def _env_bool(name: str) -> Optional[bool]:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return None
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def configure_threads() -> Dict[str, int]:
+    """
+    Apply INFERENCE_THREADS / INFERENCE_INTEROP_THREADS to torch.
+
+    Must run before torch does any parallel work, since the inter-op pool
+    can only be sized once.
+    """
+    import torch
+
+    threads = _env_int("INFERENCE_THREADS")
+    interop_threads = _env_int("INFERENCE_INTEROP_THREADS")
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            logger.warning("Could not set inter-op threads: %s", e)
+    return {"threads": torch.get_num_threads(), "interop_threads": torch.get_num_interop_threads()}
+
+
+class InferenceProfile:
+    def __init__(self, name: str, device: str, dtype: str, attention_slicing: bool, vae_tiling: bool,
+                 channels_last: bool, compile: bool, scheduler: str, max_steps: Optional[int]):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown dtype {dtype}, expected one of {DTYPES}")
+        if scheduler not in SCHEDULERS:
+            raise ValueError(f"Unknown scheduler {scheduler}, expected one of {SCHEDULERS}")
+        self.name = name
+        self.device = device
+        self.dtype = dtype
+        self.attention_slicing = attention_slicing
+        self.vae_tiling = vae_tiling
+        self.channels_last = channels_last
+        self.compile = compile
+        self.scheduler = scheduler
+        self.max_steps = max_steps
+
+    @classmethod
+    def from_env(cls, device: str) -> "InferenceProfile":
+        name = os.getenv("INFERENCE_PROFILE", "auto")
+        if name == "auto":
+            name = "cpu" if device == "cpu" else "gpu"
+        if name == "cpu":
+            defaults = dict(dtype="fp32", attention_slicing=True, vae_tiling=True, channels_last=True,
+                            compile=False, scheduler="dpm", max_steps=None)
+        elif name == "gpu":
+            defaults = dict(dtype="fp16", attention_slicing=False, vae_tiling=False, channels_last=False,
+                            compile=False, scheduler="default", max_steps=None)
+        else:
+            raise ValueError(f"Unknown INFERENCE_PROFILE: {name}")
+
+        overrides = {
+            "dtype": os.getenv("INFERENCE_DTYPE") or None,
+            "attention_slicing": _env_bool("INFERENCE_ATTENTION_SLICING"),
+            "vae_tiling": _env_bool("INFERENCE_VAE_TILING"),
+            "channels_last": _env_bool("INFERENCE_CHANNELS_LAST"),
+            "compile": _env_bool("INFERENCE_COMPILE"),
+            "scheduler": os.getenv("INFERENCE_SCHEDULER") or None,
+            "max_steps": _env_int("INFERENCE_MAX_STEPS"),
+        }
+        defaults.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(name, device, **defaults)
+
+    def torch_dtype(self):
+        import torch
+
+        return {"fp16": torch.float16, "bf16": torch.bfloat16, "fp32": torch.float32}[self.dtype]
+
+    def load(self, model_id: str):
+        """Load `model_id` and prepare it for this profile."""
+        from diffusers import DiffusionPipeline
+
+        # The fp16 weights are half the size to read, and are upcast on load
+        # for bf16/fp32. safetensors weights are memory-mapped rather than
+        # unpickled and copied.
+        kwargs = dict(torch_dtype=self.torch_dtype(), variant="fp16")
+        try:
+            pipe = DiffusionPipeline.from_pretrained(model_id, use_safetensors=True, **kwargs)
+        except (OSError, EnvironmentError) as e:
+            logger.warning("No safetensors weights for %s, loading pickled weights: %s", model_id, e)
+            pipe = DiffusionPipeline.from_pretrained(model_id, **kwargs)
+        return self.prepare(pipe)
+
+    def prepare(self, pipe):
+        import torch
+
+        if self.scheduler == "dpm":
+            from diffusers import DPMSolverMultistepScheduler
+
+            pipe.scheduler = DPMSolverMultistepScheduler.from_config(pipe.scheduler.config)
+
+        pipe = pipe.to(self.device)
+        if self.device == "cuda":
+            pipe.enable_model_cpu_offload()
+            pipe.enable_vae_slicing()
+
+        if self.attention_slicing:
+            pipe.enable_attention_slicing()
+        if self.vae_tiling and hasattr(pipe, "enable_vae_tiling"):
+            pipe.enable_vae_tiling()
+
+        if self.channels_last:
+            # The VAE is 2D; the video UNet mixes 2D and 3D weights, which
+            # channels_last (a 4D layout) may not accept
+            for component in ("vae", "unet"):
+                try:
+                    getattr(pipe, component).to(memory_format=torch.channels_last)
+                except RuntimeError as e:
+                    logger.info("Keeping default memory format for %s: %s", component, e)
+
+        if self.compile:
+            # The first call pays the compilation cost
+            pipe.unet = torch.compile(pipe.unet)
+        return pipe
+
+    def inference_steps(self, requested: int) -> int:
+        return min(requested, self.max_steps) if self.max_steps else requested
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "profile": self.name,
+            "dtype": self.dtype,
+            "attention_slicing": self.attention_slicing,
+            "vae_tiling": self.vae_tiling,
+            "channels_last": self.channels_last,
+            "compile": self.compile,
+            "scheduler": self.scheduler,
+            "max_steps": self.max_steps,
+        }
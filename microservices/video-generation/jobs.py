@@ -0,0 +1,279 @@
+"""
+Asynchronous generation jobs.
+
+Jobs are persisted in a local SQLite file so that queued and interrupted jobs
+are picked up again after a worker restart.
+"""
+import asyncio
+import itertools
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Called by a runner as progress(stage, status) while a job executes
+ProgressFn = Callable[[str, str], None]
+Runner = Callable[[Dict[str, Any], ProgressFn], Awaitable[Dict[str, Any]]]
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+    def __init__(self, queue_depth: int):
+        super().__init__(f"Job queue is full ({queue_depth} queued)")
+        self.queue_depth = queue_depth
+
+
+class JobStore:
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    request TEXT NOT NULL,
+                    stages TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+    def insert(self, job: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, state, priority, request, stages, result, error, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job["id"], job["state"], job["priority"], json.dumps(job["request"]),
+                    json.dumps(job["stages"]), None, None, job["created_at"], job["updated_at"],
+                ),
+            )
+
+    def update(self, job_id: str, expected_states: Tuple[str, ...] = (), **fields: Any) -> bool:
+        """
+        Update a job's fields. With `expected_states`, only a job currently in
+        one of those states is updated. Returns whether the job was updated.
+        """
+        for key in ("stages", "result"):
+            if key in fields and fields[key] is not None:
+                fields[key] = json.dumps(fields[key])
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        query = f"UPDATE jobs SET {assignments} WHERE id = ?"
+        if expected_states:
+            query += f" AND state IN ({', '.join('?' for _ in expected_states)})"
+        with self._lock, self._conn:
+            cursor = self._conn.execute(query, (*fields.values(), job_id, *expected_states))
+        return cursor.rowcount > 0
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Jobs that were queued or running when the process last stopped."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE state IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["request"] = json.loads(job["request"])
+        job["stages"] = json.loads(job["stages"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class ProgressWriter:
+    """
+    Persists one job's stage progress off the event loop. A single write is
+    in flight at a time; updates that arrive meanwhile are coalesced into
+    the next write.
+    """
+
+    def __init__(self, store: JobStore, job_id: str):
+        self.store = store
+        self.job_id = job_id
+        self._pending: Optional[Dict[str, str]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def write(self, stages: Dict[str, str]) -> None:
+        """Schedule a write of `stages`; must be called on the event loop."""
+        self._pending = dict(stages)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._flush())
+
+    async def _flush(self) -> None:
+        while self._pending is not None:
+            stages, self._pending = self._pending, None
+            await asyncio.to_thread(self.store.update, self.job_id, stages=stages)
+
+    async def drain(self) -> None:
+        """Wait for scheduled writes, so a final update isn't overwritten by a stale one."""
+        if self._task is not None:
+            await self._task
+
+
+class JobManager:
+    def __init__(self, store: JobStore, runner: Runner, stages: List[str],
+                 max_in_flight: int = 1, max_queue_depth: int = 32):
+        """
+        Args:
+            store: Persistent job state.
+            runner: Coroutine that executes one job's request and reports progress.
+            stages: Stage names reported by the runner, in pipeline order.
+            max_in_flight: Number of jobs executed concurrently.
+            max_queue_depth: Queued jobs accepted before submissions are rejected.
+        """
+        self.store = store
+        self.runner = runner
+        self.stages = stages
+        self.max_in_flight = max_in_flight
+        self.max_queue_depth = max_queue_depth
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._counter = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._in_flight = 0
+        # Submissions whose insert is still in flight, counted against the queue depth
+        self._submitting = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def start(self) -> None:
+        """Re-enqueue unfinished jobs and start the worker tasks."""
+        self._queue = asyncio.PriorityQueue()
+        for job in self.store.unfinished():
+            if job["state"] == RUNNING:
+                # Interrupted mid-run; stage progress restarts from scratch
+                self.store.update(job["id"], state=QUEUED, stages=self._initial_stages())
+            self._enqueue(job["id"], job["priority"])
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_in_flight)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, request: Dict[str, Any], priority: int = 0) -> Dict[str, Any]:
+        """Persist and enqueue a job. Raises JobQueueFull when at capacity."""
+        if self.queue_depth + self._submitting >= self.max_queue_depth:
+            raise JobQueueFull(self.queue_depth)
+
+        now = time.time()
+        job = {
+            "id": str(uuid.uuid4()),
+            "state": QUEUED,
+            "priority": priority,
+            "request": request,
+            "stages": self._initial_stages(),
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        # The insert commits synchronously, so it runs off the event loop;
+        # the queue itself is only touched from the loop
+        self._submitting += 1
+        try:
+            await asyncio.to_thread(self.store.insert, job)
+        finally:
+            self._submitting -= 1
+        self._enqueue(job["id"], priority)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str, reason: str) -> Optional[Dict[str, Any]]:
+        """
+        Mark a queued or running job failed with "Cancelled: <reason>" and
+        return it; None if there is no such job. A queued job is skipped. A
+        running job is left to finish, since its render may be shared with
+        other requests, but its result is not recorded on the job.
+        Finished jobs are returned unchanged.
+        """
+        self.store.update(job_id, expected_states=(QUEUED, RUNNING), state=FAILED, error=f"Cancelled: {reason}")
+        return self.store.get(job_id)
+
+    def _initial_stages(self) -> Dict[str, str]:
+        return {stage: "pending" for stage in self.stages}
+
+    def _enqueue(self, job_id: str, priority: int) -> None:
+        # Higher priority first, FIFO within a priority
+        self._queue.put_nowait((-priority, next(self._counter), job_id))
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            self._in_flight += 1
+            try:
+                await self._run(job_id)
+            finally:
+                self._in_flight -= 1
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        # SQLite writes commit synchronously, so they run off the event loop
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or job["state"] not in (QUEUED, RUNNING):
+            return
+
+        stages = job["stages"]
+        # A job cancelled while queued stays failed
+        if not await asyncio.to_thread(self.store.update, job_id, expected_states=(QUEUED, RUNNING), state=RUNNING):
+            return
+        writer = ProgressWriter(self.store, job_id)
+
+        def progress(stage: str, status: str) -> None:
+            stages[stage] = status
+            writer.write(stages)
+
+        try:
+            result = await self.runner(job["request"], progress)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            for stage, status in stages.items():
+                if status == "running":
+                    stages[stage] = "failed"
+            # HTTPException carries its message in .detail
+            error = getattr(e, "detail", None) or str(e)
+            await writer.drain()
+            await asyncio.to_thread(self.store.update, job_id, expected_states=(RUNNING,),
+                                    state=FAILED, stages=stages, error=str(error))
+        else:
+            await writer.drain()
+            # Not over a cancellation that arrived while the job ran
+            await asyncio.to_thread(self.store.update, job_id, expected_states=(RUNNING,),
+                                    state=SUCCEEDED, result=result)
@@ -0,0 +1,115 @@
+"""
+Background model loading.
+
+Models are registered with a load function and loaded in parallel on a
+small thread pool after the HTTP server is up, so /health answers straight
+away and /ready reports when every model can serve requests. Request paths
+await the model they need instead of assuming it is loaded.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ModelLoadError(Exception):
+    """Raised when waiting on a model that failed to load."""
+
+
+class _Model:
+    def __init__(self, name: str, load: Callable[[], Any], executor: Optional[ThreadPoolExecutor]):
+        self.name = name
+        self.load = load
+        self.executor = executor
+        self.state = PENDING
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.load_seconds: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class ModelLoader:
+    def __init__(self, max_workers: int = 2):
+        """
+        Args:
+            max_workers: Models loaded at the same time. Loading is mostly
+                disk and host-to-device transfer, so a few run well in parallel.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="model-loader")
+        self._models: Dict[str, _Model] = {}
+
+    def register(self, name: str, load: Callable[[], Any], executor: Optional[ThreadPoolExecutor] = None) -> None:
+        """
+        Register a model to load on start().
+
+        Args:
+            executor: Run `load` on this executor instead of the loader pool,
+                e.g. the GPU thread for models that must be set up where they run.
+        """
+        self._models[name] = _Model(name, load, executor)
+
+    def start(self) -> None:
+        """Begin loading every registered model in the background."""
+        for model in self._models.values():
+            if model.task is None:
+                model.task = asyncio.ensure_future(self._load(model))
+
+    async def wait(self, name: str) -> None:
+        """
+        Wait until `name` is loaded. Returns immediately for unregistered names.
+
+        Raises:
+            ModelLoadError: If the model failed to load
+        """
+        model = self._models.get(name)
+        if model is None:
+            return
+        if model.task is None:
+            self.start()
+        await asyncio.shield(model.task)
+        if model.state == FAILED:
+            raise ModelLoadError(f"Model {name} failed to load: {model.error}")
+
+    @property
+    def ready(self) -> bool:
+        return all(model.state == READY for model in self._models.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-model load state and timings."""
+        now = time.perf_counter()
+        return {
+            name: {
+                "state": model.state,
+                "load_seconds": round(model.load_seconds, 3) if model.load_seconds is not None
+                else (round(now - model.started_at, 3) if model.started_at is not None else None),
+                "error": model.error,
+            }
+            for name, model in self._models.items()
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _load(self, model: _Model) -> None:
+        loop = asyncio.get_running_loop()
+        model.state = LOADING
+        model.started_at = time.perf_counter()
+        try:
+            await loop.run_in_executor(model.executor or self._executor, model.load)
+        except Exception as e:
+            model.state = FAILED
+            model.error = str(e)
+            logger.exception("Failed to load %s: %s", model.name, e)
+        else:
+            model.state = READY
+            logger.info("Loaded %s in %.2fs", model.name, time.perf_counter() - model.started_at)
+        finally:
+            model.load_seconds = time.perf_counter() - model.started_at
@@ -0,0 +1,149 @@
+"""
+Render cache for deterministic generation requests.
+
+A request with an explicit seed always renders the same video, so its
+result is cached under a hash of the canonicalized request. Entries point
+at content-addressed blobs and live in a local SQLite file, so they survive
+restarts. Concurrent identical requests share a single in-progress render.
+
+The blobs are not the cache's own: every render is also a stored video in
+the feed, so evicting an entry only drops the index row. The bound is on
+entries, not on storage.
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+def request_key(fields: Dict[str, Any]) -> str:
+    """SHA-256 of the request fields as canonical JSON."""
+    canonical = json.dumps(fields, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    def __init__(self, path: str, max_entries: int):
+        """
+        Args:
+            path: SQLite file holding the cache index.
+            max_entries: Cached results kept; least recently used entries
+                are evicted past it.
+        """
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.counters = Counter(hits=0, misses=0, evictions=0)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS renders (
+                    key TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS renders_last_used ON renders (last_used)")
+            # Kept up to date by put/invalidate/evict so stats() never scans the table
+            self._entries, self._bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM renders"
+            ).fetchone()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for `key` and mark it as recently used."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT result FROM renders WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            self._conn.execute("UPDATE renders SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.counters["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, result: Dict[str, Any], size: int) -> None:
+        with self._lock, self._conn:
+            self._forget(key)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO renders (key, result, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(result), size, time.time()),
+            )
+            self._entries += 1
+            self._bytes += size
+            self._evict()
+
+    def invalidate(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._forget(key)
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size = self._entries, self._bytes
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "max_entries": self.max_entries,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _forget(self, key: str) -> None:
+        # Called with the lock held
+        row = self._conn.execute("SELECT size FROM renders WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM renders WHERE key = ?", (key,))
+            self._entries -= 1
+            self._bytes -= row[0]
+
+    def _evict(self) -> None:
+        # Called with the lock held
+        excess = self._entries - self.max_entries
+        if excess <= 0:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM renders ORDER BY last_used LIMIT ?", (excess,)
+        ).fetchall():
+            self._conn.execute("DELETE FROM renders WHERE key = ?", (key,))
+            self._entries -= 1
+            self._bytes -= size
+            self.counters["evictions"] += 1
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its result."""
+
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Task] = {}
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Await `fn()`, or the call already in flight for `key`.
+
+        Returns (result, shared) where shared is True if another caller's
+        call produced the result.
+        """
+        task = self._flights.get(key)
+        shared = task is not None
+        if shared:
+            self.shared += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+        # A caller that is cancelled must not cancel the call for the others
+        return await asyncio.shield(task), shared
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
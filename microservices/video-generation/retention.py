@@ -0,0 +1,47 @@
+"""
+Retention policy for locally written videos.
+
+In disk I/O mode every generated MP4 is left in the output directory after
+it has been copied to the blob store. Pruning keeps that directory bounded
+by age and total size, oldest files first.
+"""
+import os
+import time
+from typing import Dict
+
+
+def prune_directory(path: str, max_bytes: int, max_age_seconds: float) -> Dict[str, int]:
+    """
+    Delete files in `path` older than `max_age_seconds`, then the oldest of
+    the rest until their total size is at most `max_bytes`.
+
+    Returns the number of files removed and the bytes freed.
+    """
+    removed = freed = 0
+    try:
+        entries = [e for e in os.scandir(path) if e.is_file(follow_symlinks=False)]
+    except FileNotFoundError:
+        return {"removed": 0, "bytes_freed": 0}
+
+    files = []
+    for entry in entries:
+        try:
+            stat = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, entry.path))
+    files.sort()
+
+    cutoff = time.time() - max_age_seconds
+    total = sum(size for _, size, _ in files)
+    for mtime, size, file_path in files:
+        if mtime >= cutoff and total <= max_bytes:
+            break
+        try:
+            os.unlink(file_path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+        freed += size
+    return {"removed": removed, "bytes_freed": freed}
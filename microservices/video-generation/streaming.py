@@ -0,0 +1,126 @@
+"""
+HTTP Range support for serving stored videos.
+"""
+import os
+from typing import Mapping, Optional, Tuple
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+STREAM_CHUNK_SIZE = 256 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def sniff_media_type(path: str) -> str:
+    """
+    Media type of a stored blob from its first bytes. Blobs are content
+    addressed, so the type is not part of their key; videos, posters and
+    HLS playlists and segments all share the blob store.
+    """
+    with open(path, "rb") as f:
+        head = f.read(12)
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"#EXTM3U"):
+        return "application/vnd.apple.mpegurl"
+    if head[:1] == b"\x47":
+        # MPEG-TS packets start with a 0x47 sync byte
+        return "video/mp2t"
+    return "video/mp4"
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a `Range` header into an inclusive (start, end) byte range.
+
+    Returns None when the whole file should be served: no header, a unit
+    other than bytes, several ranges (which we are allowed to ignore), or
+    an invalid range spec such as `bytes=5-2`, which RFC 9110 says to
+    ignore. Raises RangeNotSatisfiable when the range lies outside the file.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        return None
+
+    first, _, last = spec.partition("-")
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if last and start > end:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+class RangeFileResponse(Response):
+    """
+    Sends `count` bytes of a file starting at `offset`.
+
+    Uses the ASGI zero-copy extension (sendfile) when the server offers it
+    and falls back to chunked reads otherwise. Uvicorn does not offer it,
+    so under the shipped server every response takes the chunked path.
+    """
+
+    def __init__(self, path: str, offset: int, count: int, status_code: int = 200,
+                 headers: Optional[Mapping[str, str]] = None, media_type: str = "video/mp4"):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.offset = offset
+        self.count = count
+        self.headers["content-length"] = str(count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if scope["method"] == "HEAD" or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": fd,
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+                return
+
+            position, remaining = self.offset, self.count
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(
+                    os.pread, fd, min(STREAM_CHUNK_SIZE, remaining), position
+                )
+                if not chunk:
+                    break
+                position += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank underneath us; close the body rather than hang
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(fd)
@@ -0,0 +1,87 @@
+"""
+Synthetic stand-ins for the diffusion pipeline and TTS voices.
+
+Selected with MODEL_BACKEND=stub, for load tests and benchmarks of the
+service around the models (batching, job queue, encoding, storage) on
+machines without torch, a GPU or downloaded weights. Only numpy is needed.
+
+The stand-ins take time like the real models, so queueing behaves
+realistically:
+
+- StubPipeline sleeps STUB_STEP_SECONDS per denoising step for a batch,
+  plus STUB_BATCH_OVERHEAD of that per extra prompt, and returns seeded
+  noise frames of STUB_FRAME_SIZE x STUB_FRAME_SIZE
+- StubTTS sleeps STUB_TTS_SECONDS_PER_CHAR and returns a tone lasting
+  about as long as reading the text aloud
+"""
+import os
+import time
+import wave
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+STUB_STEP_SECONDS = float(os.getenv("STUB_STEP_SECONDS", "0.05"))
+STUB_BATCH_OVERHEAD = float(os.getenv("STUB_BATCH_OVERHEAD", "0.25"))
+STUB_FRAME_SIZE = int(os.getenv("STUB_FRAME_SIZE", "256"))
+STUB_TTS_SECONDS_PER_CHAR = float(os.getenv("STUB_TTS_SECONDS_PER_CHAR", "0.001"))
+STUB_TTS_SAMPLE_RATE = 22050
+# Roughly the speaking rate of the default voice
+STUB_TTS_CHARS_PER_SECOND = 15
+
+
+class StubOutput:
+    def __init__(self, frames: List[List[np.ndarray]]):
+        self.frames = frames
+
+
+class StubPipeline:
+    """Called like DiffusionPipeline, with seeds (int or None) as generators."""
+
+    def __init__(self, model_id: str):
+        self.model_id = model_id
+
+    def __call__(self, prompt: Sequence[str], num_inference_steps: int, num_frames: int,
+                 generator: Optional[Sequence[Optional[int]]] = None) -> StubOutput:
+        prompts = [prompt] if isinstance(prompt, str) else list(prompt)
+        seeds = list(generator) if generator is not None else [None] * len(prompts)
+        time.sleep(num_inference_steps * STUB_STEP_SECONDS * (1 + STUB_BATCH_OVERHEAD * (len(prompts) - 1)))
+
+        videos = []
+        for seed in seeds:
+            rng = np.random.default_rng(seed)
+            # Drift one base image across frames so the encoder sees motion,
+            # not independent noise it cannot compress
+            base = rng.random((STUB_FRAME_SIZE, STUB_FRAME_SIZE, 3), dtype=np.float32)
+            videos.append([np.roll(base, shift=i * 2, axis=1) for i in range(num_frames)])
+        return StubOutput(videos)
+
+
+class StubSynthesizer:
+    output_sample_rate = STUB_TTS_SAMPLE_RATE
+
+
+class StubTTS:
+    """The subset of the Coqui TTS API that tts_registry uses."""
+
+    synthesizer = StubSynthesizer()
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def to(self, device: str) -> "StubTTS":
+        return self
+
+    def tts(self, text: str) -> np.ndarray:
+        time.sleep(len(text) * STUB_TTS_SECONDS_PER_CHAR)
+        seconds = max(len(text) / STUB_TTS_CHARS_PER_SECOND, 0.5)
+        t = np.arange(int(seconds * STUB_TTS_SAMPLE_RATE), dtype=np.float32) / STUB_TTS_SAMPLE_RATE
+        return 0.2 * np.sin(2 * np.pi * 220.0 * t)
+
+    def tts_to_file(self, text: str, file_path: str) -> None:
+        samples = self.tts(text)
+        with wave.open(file_path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(STUB_TTS_SAMPLE_RATE)
+            f.writeframes((samples * 32767).astype("<i2").tobytes())
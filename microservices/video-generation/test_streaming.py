@@ -0,0 +1,81 @@
+"""
+Range parsing and both send paths of RangeFileResponse: the ASGI zero-copy
+extension and the chunked fallback that uvicorn uses.
+
+    python -m pytest video-generation/test_streaming.py
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from streaming import RangeFileResponse, RangeNotSatisfiable, parse_range
+
+SIZE = 1000
+
+
+def test_parse_range():
+    assert parse_range(None, SIZE) is None
+    assert parse_range("bytes=0-99", SIZE) == (0, 99)
+    assert parse_range("bytes=900-", SIZE) == (900, SIZE - 1)
+    assert parse_range("bytes=-100", SIZE) == (900, SIZE - 1)
+    assert parse_range("bytes=990-2000", SIZE) == (990, SIZE - 1)
+    # Invalid or multi-range specs are ignored and the whole file served
+    assert parse_range("bytes=5-2", SIZE) is None
+    assert parse_range("bytes=0-1,5-6", SIZE) is None
+    assert parse_range("items=0-1", SIZE) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(f"bytes={SIZE}-", SIZE)
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=-0", SIZE)
+
+
+def send_file(path: str, offset: int, count: int, extensions=None, method: str = "GET"):
+    response = RangeFileResponse(path, offset, count, status_code=206)
+    scope = {"type": "http", "method": method, "extensions": extensions or {}}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopy":
+            # What a zero-copy server would write, before the fd is closed
+            message = {**message, "data": os.pread(message["file"], message["count"], message["offset"])}
+        messages.append(message)
+
+    asyncio.run(response(scope, receive, send))
+    return messages
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(bytes(range(256)) * 4)
+    return str(path)
+
+
+def test_zerocopy_sends_the_range_from_the_file(video):
+    messages = send_file(video, 10, 300, extensions={"http.response.zerocopy": {}})
+    assert [message["type"] for message in messages] == ["http.response.start", "http.response.zerocopy"]
+    assert messages[0]["status"] == 206
+    assert (b"content-length", b"300") in messages[0]["headers"]
+    assert messages[1]["data"] == (bytes(range(256)) * 4)[10:310]
+    assert messages[1]["more_body"] is False
+
+
+def test_chunked_fallback_sends_the_range(video, monkeypatch):
+    monkeypatch.setattr("streaming.STREAM_CHUNK_SIZE", 128)
+    messages = send_file(video, 10, 300)
+    bodies = [message for message in messages if message["type"] == "http.response.body"]
+    assert len(bodies) == 3
+    assert b"".join(message["body"] for message in bodies) == (bytes(range(256)) * 4)[10:310]
+    assert bodies[-1]["more_body"] is False
+
+
+def test_head_sends_no_body(video):
+    messages = send_file(video, 0, SIZE, extensions={"http.response.zerocopy": {}}, method="HEAD")
+    assert messages[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
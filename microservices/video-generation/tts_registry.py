@@ -0,0 +1,110 @@
+"""
+Process-wide registry of loaded TTS voice models.
+
+Each voice model is loaded once (at startup or on first use) and shared by
+every request in the process.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTS_MODEL = "tts_models/en/ljspeech/tacotron2-DDC"
+
+
+class TTSEngine:
+    """A loaded TTS model plus the lock that serialises synthesis on it."""
+
+    def __init__(self, model_name: str, tts, device: str, load_seconds: float):
+        self.model_name = model_name
+        self.tts = tts
+        self.device = device
+        self.load_seconds = load_seconds
+        # Coqui TTS models keep per-call state on the module, so concurrent
+        # requests take turns on the same engine instead of loading a copy.
+        self._lock = threading.Lock()
+
+    def synthesize_to_file(self, text: str, file_path: str) -> float:
+        """Synthesise `text` into `file_path`. Returns synthesis time in seconds."""
+        start = time.perf_counter()
+        with self._lock:
+            self.tts.tts_to_file(text=text, file_path=file_path)
+        return time.perf_counter() - start
+
+    def synthesize_pcm(self, text: str) -> Tuple[bytes, int, float]:
+        """
+        Synthesise `text` in memory.
+
+        Returns (pcm, sample_rate, seconds) where pcm is mono signed 16-bit
+        little-endian audio and seconds is the synthesis time.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            samples = self.tts.tts(text=text)
+            sample_rate = self.tts.synthesizer.output_sample_rate
+        pcm = (np.clip(np.asarray(samples, dtype=np.float32), -1.0, 1.0) * 32767).astype("<i2").tobytes()
+        return pcm, sample_rate, time.perf_counter() - start
+
+
+def load_coqui_model(model_name: str):
+    from TTS.api import TTS
+
+    return TTS(model_name=model_name, progress_bar=False)
+
+
+class TTSRegistry:
+    def __init__(self, device_fn: Callable[[], str], load_model: Callable[[str], Any] = load_coqui_model):
+        """
+        Args:
+            device_fn: Returns the device to load models onto. Shared with the
+                diffusion pipeline so both models land on the same accelerator.
+            load_model: Builds the (not yet placed) TTS model for a model name
+        """
+        self._device_fn = device_fn
+        self._load_model = load_model
+        self._engines: Dict[str, TTSEngine] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, model_name: str = DEFAULT_TTS_MODEL) -> TTSEngine:
+        """Return the engine for `model_name`, loading it on first use."""
+        engine = self._engines.get(model_name)
+        if engine is not None:
+            return engine
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(model_name, threading.Lock())
+
+        # Only one thread loads a given model; the others wait and reuse it.
+        with load_lock:
+            engine = self._engines.get(model_name)
+            if engine is None:
+                engine = self._load(model_name)
+                self._engines[model_name] = engine
+            return engine
+
+    def warm(self, model_name: str = DEFAULT_TTS_MODEL) -> TTSEngine:
+        """Load `model_name` ahead of the first request that needs it."""
+        return self.get(model_name)
+
+    def is_loaded(self, model_name: str = DEFAULT_TTS_MODEL) -> bool:
+        return model_name in self._engines
+
+    def stats(self) -> Dict[str, Dict[str, Optional[object]]]:
+        """Per-model load state and timings, for health reporting."""
+        return {
+            name: {"device": engine.device, "load_seconds": round(engine.load_seconds, 3)}
+            for name, engine in self._engines.items()
+        }
+
+    def _load(self, model_name: str) -> TTSEngine:
+        device = self._device_fn()
+        start = time.perf_counter()
+        tts = self._load_model(model_name).to(device)
+        load_seconds = time.perf_counter() - start
+        logger.info("Loaded TTS model %s on %s in %.2fs", model_name, device, load_seconds)
+        return TTSEngine(model_name, tts, device, load_seconds)
@@ -1,26 +1,54 @@
-import torch
-from diffusers import DiffusionPipeline
-from diffusers.utils import export_to_video
-import numpy as np
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, RedirectResponse
 from pydantic import BaseModel
 import os
 import sys
-from typing import Optional
+from typing import Optional, Dict, Any, Callable, List, Tuple, Union
 import uuid
 import requests
-from moviepy.editor import VideoFileClip, AudioFileClip, concatenate_videoclips
 import tempfile
-from TTS.api import TTS
-import base64
+import time
+import asyncio
+import functools
+import logging
+import re
+import threading
 
 # Add parent directory to Python path to find common module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from common.db import BasicDB
+from common.db import db, write_buffer
 from common.models import VideoCreate
+from common.blobstore import BlobRef, get_blob_store
+from common.video_index import VideoIndex
+from common import log, metrics, tracing
+from common.instrumentation import instrument
+from tts_registry import TTSRegistry, DEFAULT_TTS_MODEL, load_coqui_model
+import executors
+from encoding import (PCMAudio, encode_renditions, encode_settings, encode_video_stream, encoded_duration,
+                      rendition_content_type, wav_duration)
+from jobs import JobStore, JobManager, JobQueueFull
+from batching import DiffusionBatcher
+from streaming import RangeFileResponse, RangeNotSatisfiable, parse_range, sniff_media_type
+from retention import prune_directory
+from render_cache import RenderCache, SingleFlight, request_key
+from model_loader import ModelLoader
+from inference_profile import InferenceProfile, configure_threads
+from heartbeat import HeartbeatSender
+
+# LOG_LEVEL, LOG_FORMAT etc. are read by common.log
+log.configure_logging("video-generation")
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Video Generation API")
+instrument(app, "video-generation")
+
+stage_seconds = metrics.REGISTRY.histogram(
+    "generation_stage_seconds", "Latency of video generation pipeline stages", ["stage"]
+)
+generations = metrics.REGISTRY.counter(
+    "generations_total", "Generation requests by how they were served", ["source"]
+)
 
 class GenerationRequest(BaseModel):
     prompt: str
@@ -29,182 +57,768 @@ class GenerationRequest(BaseModel):
     num_frames: Optional[int] = 16
     model_name: Optional[str] = "llama3.2"  # Ollama model to use
     add_audio: Optional[bool] = True  # Control whether to add TTS audio to the video
+    script: Optional[str] = None  # Narration to speak; generated with model_name when omitted
+    seed: Optional[int] = None  # Makes the render reproducible and cacheable; random when omitted
+
+class JobRequest(GenerationRequest):
+    priority: Optional[int] = 0  # Higher priority jobs are dequeued first
+
+# Stages reported through job progress, in pipeline order
+GENERATION_STAGES = ["diffusion", "script", "tts", "encode", "store"]
+
+# Only used when a request arrives without a narration script
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.sqlite3")
+# Prompts sharing steps/frames are batched into one pipeline call
+DIFFUSION_MAX_BATCH = int(os.getenv("DIFFUSION_MAX_BATCH", "4"))
+DIFFUSION_BATCH_WINDOW_MS = float(os.getenv("DIFFUSION_BATCH_WINDOW_MS", "100"))
+
+# Enough concurrent jobs by default to fill a diffusion batch
+JOBS_MAX_IN_FLIGHT = int(os.getenv("JOBS_MAX_IN_FLIGHT", str(DIFFUSION_MAX_BATCH)))
+JOBS_MAX_QUEUE_DEPTH = int(os.getenv("JOBS_MAX_QUEUE_DEPTH", "32"))
+
+PORT = int(os.getenv("PORT", "8000"))
+# Register with a dispatcher when running as one of several workers
+DISPATCHER_URL = os.getenv("DISPATCHER_URL")
+WORKER_URL = os.getenv("WORKER_URL", f"http://localhost:{PORT}")
+WORKER_ID = os.getenv("WORKER_ID", WORKER_URL)
+HEARTBEAT_SECONDS = float(os.getenv("HEARTBEAT_SECONDS", "5"))
+
+# "memory" keeps the narration and encoded video in buffers and pipes end to
+# end; "disk" writes the WAV and MP4 to OUTPUT_DIR before storing them
+IO_MODE = os.getenv("IO_MODE", "memory")
+if IO_MODE not in ("memory", "disk"):
+    raise RuntimeError(f"Unknown IO_MODE: {IO_MODE}")
+OUTPUT_DIR = os.getenv("OUTPUT_DIR", "output")
+# Retention for OUTPUT_DIR in disk mode
+OUTPUT_MAX_BYTES = int(os.getenv("OUTPUT_MAX_BYTES", str(1024 * 1024 * 1024)))
+OUTPUT_MAX_AGE_SECONDS = float(os.getenv("OUTPUT_MAX_AGE_SECONDS", str(24 * 3600)))
+
+# Results of seeded requests, keyed on the canonicalized request. The cache
+# only indexes stored videos, so its bound is on entries rather than bytes
+RENDER_CACHE_PATH = os.getenv("RENDER_CACHE_PATH", "render_cache.sqlite3")
+RENDER_CACHE_MAX_ENTRIES = int(os.getenv("RENDER_CACHE_MAX_ENTRIES", "10000"))
+
+# Metadata of stored videos, for listing without fetching their records or bodies
+VIDEO_INDEX_PATH = os.getenv("VIDEO_INDEX_PATH", "video_index.sqlite3")
+
+# Torch, diffusers and TTS are imported by the model loader in the
+# background, so the server starts answering before they are loaded
+DIFFUSION_MODEL = os.getenv("DIFFUSION_MODEL", "damo-vilab/text-to-video-ms-1.7b")
+MODEL_LOAD_WORKERS = int(os.getenv("MODEL_LOAD_WORKERS", "2"))
+# "stub" swaps the models for the synthetic stand-ins in stub_models.py, so
+# the rest of the service can be load tested without torch or weights
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "torch")
+
+# Effective torch thread pool sizes and device capabilities, filled in at
+# the end of get_device(). /health reads these rather than importing torch,
+# which may still be half-imported by the loader thread.
+torch_threads: Dict[str, int] = {}
+device_info: Dict[str, Any] = {}
+_device_lock = threading.Lock()
+_profile: Optional[InferenceProfile] = None
+_profile_lock = threading.Lock()
 
 # Determine the best available device
 def get_device():
-    if torch.cuda.is_available():
-        return "cuda"
-    elif torch.backends.mps.is_available():
-        return "mps"
+    # The loader thread and request paths can get here at the same time,
+    # and the torch thread pools must only be sized once
+    with _device_lock:
+        if "device" in device_info:
+            return device_info["device"]
+        if MODEL_BACKEND == "stub":
+            device_info.update(device="cpu", cuda_available=None, mps_available=None)
+            return "cpu"
+
+        import torch
+
+        # Thread pools are sized before any model touches torch
+        torch_threads.update(configure_threads())
+        cuda_available = torch.cuda.is_available()
+        mps_available = torch.backends.mps.is_available()
+        if cuda_available:
+            device = "cuda"
+        elif mps_available:
+            device = "mps"
+        else:
+            device = "cpu"
+        logger.info("Using device: %s", device)
+        device_info.update(device=device, cuda_available=cuda_available, mps_available=mps_available)
+        return device
+
+def get_profile() -> InferenceProfile:
+    global _profile
+    with _profile_lock:
+        if _profile is None:
+            profile = InferenceProfile.from_env(get_device())
+            logger.info("Using inference profile: %s", profile.as_dict())
+            _profile = profile
+        return _profile
+
+pipe = None
+
+def load_pipeline():
+    global pipe
+    if MODEL_BACKEND == "stub":
+        from stub_models import StubPipeline
+        pipe = StubPipeline(DIFFUSION_MODEL)
     else:
-        return "cpu"
+        pipe = get_profile().load(DIFFUSION_MODEL)
+
+def load_tts_model(model_name: str):
+    if MODEL_BACKEND == "stub":
+        from stub_models import StubTTS
+        return StubTTS(model_name)
+    return load_coqui_model(model_name)
+
+# TTS voice models are loaded once per process and shared across requests
+tts_registry = TTSRegistry(device_fn=get_device, load_model=load_tts_model)
+TTS_PRELOAD_MODELS = [m for m in os.getenv("TTS_PRELOAD_MODELS", DEFAULT_TTS_MODEL).split(",") if m]
 
-# Initialize the pipeline
-device = get_device()
-print(f"Using device: {device}")
+# The diffusion pipeline and preloaded voices load in parallel
+model_loader = ModelLoader(max_workers=MODEL_LOAD_WORKERS)
+model_loader.register("diffusion", load_pipeline)
+for model_name in TTS_PRELOAD_MODELS:
+    model_loader.register(f"tts:{model_name}", functools.partial(tts_registry.warm, model_name))
 
-pipe = DiffusionPipeline.from_pretrained("damo-vilab/text-to-video-ms-1.7b", torch_dtype=torch.float16, variant="fp16")
-pipe = pipe.to(device)
+@app.on_event("startup")
+async def load_models():
+    # Not awaited: requests wait on the model they need, and /ready reports progress
+    model_loader.start()
 
-if device == "cuda":
-    pipe.enable_model_cpu_offload()
-    pipe.enable_vae_slicing()
+@app.on_event("startup")
+async def prune_output_on_startup():
+    if IO_MODE == "disk":
+        result = await asyncio.to_thread(prune_output)
+        logger.info("Pruned %d files (%d bytes) from %s", result["removed"], result["bytes_freed"], OUTPUT_DIR)
 
-def generate_script(prompt: str, model_name: str = "mistral") -> str:
+@app.on_event("shutdown")
+async def shutdown_executors():
+    if heartbeat is not None:
+        await heartbeat.stop()
+    await job_manager.stop()
+    job_store.close()
+    render_cache.close()
+    video_index.close()
+    executors.shutdown()
+    model_loader.shutdown()
+    await write_buffer.stop()
+    await db.aclose()
+
+def run_diffusion(prompts: List[str], seeds: List[Optional[int]], num_inference_steps: int, num_frames: int):
+    """
+    Run the diffusion pipeline on a batch of prompts. Must be called on the GPU thread.
+    Returns one list of frames per prompt.
+    """
+    if MODEL_BACKEND == "stub":
+        # The stand-in seeds its own generators
+        generators = seeds
+    else:
+        import torch
+
+        # One generator per prompt so a seeded prompt renders the same frames
+        # whatever it is batched with. CPU generators are reproducible across devices.
+        generators = []
+        for seed in seeds:
+            generator = torch.Generator(device="cpu")
+            if seed is None:
+                generator.seed()
+            else:
+                generator.manual_seed(seed)
+            generators.append(generator)
+    return pipe(
+        prompt=prompts,
+        num_inference_steps=get_profile().inference_steps(num_inference_steps),
+        num_frames=num_frames,
+        generator=generators
+    ).frames
+
+async def run_diffusion_batch(prompts: List[str], seeds: List[Optional[int]], num_inference_steps: int, num_frames: int):
+    await model_loader.wait("diffusion")
+    return await executors.run_on_gpu(run_diffusion, prompts, seeds, num_inference_steps, num_frames)
+
+diffusion_batcher = DiffusionBatcher(
+    run_diffusion_batch,
+    max_batch_size=DIFFUSION_MAX_BATCH,
+    window_seconds=DIFFUSION_BATCH_WINDOW_MS / 1000
+)
+
+def generate_script(prompt: str, model_name: str = "llama3.2") -> str:
     """
     Generate a script using Ollama based on the video content and prompt
     """
     try:
-        response = requests.post('http://localhost:11434/api/generate', 
+        response = requests.post(f"{OLLAMA_HOST}/api/generate", 
                             json={
                                    "model": model_name,
                                    "prompt": f"""Write a short, engaging script for a video about: {prompt}. 
                                                 Keep it concise and natural, around 2-3 sentences. 
                                                 Only have narration and no audio descriptions of events. 
                                                 The response should only have output that should be spoken and no additional content.""",
-                                   "stream": False
+                                   "stream": False,
+                                   "keep_alive": OLLAMA_KEEP_ALIVE
                                })
         response.raise_for_status()
         return response.json()['response'].strip()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating script: {str(e)}")
 
-# Create output directory if it doesn't exist
-os.makedirs("output", exist_ok=True)
+# Only disk mode writes outside the blob store, so memory mode can run on a
+# read-only filesystem
+if IO_MODE == "disk":
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+def prune_output() -> Dict[str, int]:
+    return prune_directory(OUTPUT_DIR, OUTPUT_MAX_BYTES, OUTPUT_MAX_AGE_SECONDS)
+
+blob_store = get_blob_store()
+BLOB_KEY_PATTERN = re.compile(r"[0-9a-f]{64}")
 
-async def store_video_base64(video_path: str, prompt: str, description: str = "") -> None:
+async def store_video_blob(video_path: str, prompt: str, description: str = "",
+                           duration: Optional[float] = None,
+                           renditions: Optional[Dict[str, Dict[str, Any]]] = None) -> Tuple[BlobRef, int]:
     """
-    Convert video to base64 and store it in the database.
+    Upload the video to the blob store and record its key in the database.
+    Returns the blob and the video's id in the index.
     
     Args:
         video_path: Path to the video file
         prompt: The original prompt used to generate the video
         description: Optional description of the video
+        duration: Length of the video in seconds, if known
+        renditions: Already stored renditions, from store_renditions
     """
     try:
-        # Read video file and convert to base64
-        with open(video_path, "rb") as video_file:
-            video_content = base64.b64encode(video_file.read()).decode('utf-8')
-            
-        # Create video data object
-        video_data = VideoCreate(
-            prompt=prompt,
-            description=description,
-            content=video_content,
-            metadata={
-                "format": "mp4",
-                "encoding": "base64"
-            }
-        )
-        
-        # Store in database
-        db = BasicDB()
-        await db.store_video(video_data)
+        # Stream the file into the blob store in chunks
+        blob = await asyncio.to_thread(blob_store.put_file, video_path)
+        video_id = await record_video(blob, prompt, description, duration, renditions)
+        return blob, video_id
         
     except Exception as e:
-        print(f"Failed to store video: {str(e)}")
+        logger.error("Failed to store video: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to store video: {str(e)}")
 
-@app.post("/generate")
-async def generate_video(request: GenerationRequest):
+def store_hls(playlist_path: str) -> BlobRef:
+    """
+    Store the HLS segments, then the playlist rewritten to point at them.
+    Segment URIs are relative to the playlist's own /videos/{key}/stream URL.
+    """
+    directory = os.path.dirname(playlist_path)
+    lines = []
+    with open(playlist_path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                segment = blob_store.put_file(os.path.join(directory, line), content_type="video/mp2t")
+                line = f"../{segment.key}/stream"
+            lines.append(line)
+    return blob_store.put_stream([("\n".join(lines) + "\n").encode()], content_type=rendition_content_type("hls"))
+
+def store_renditions(outputs: Dict[str, Union[bytes, str]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Store the renditions besides the full video from one encode pass: bytes
+    in memory I/O mode, file paths in disk mode. Returns their blob keys,
+    sizes and content types by rendition name.
+    """
+    renditions = {}
+    for name, output in outputs.items():
+        if name == "full":
+            continue
+        content_type = rendition_content_type(name)
+        if name == "hls":
+            blob = store_hls(output)
+        elif isinstance(output, bytes):
+            blob = blob_store.put_stream([output], content_type=content_type)
+        else:
+            blob = blob_store.put_file(output, content_type=content_type)
+        renditions[name] = {"blob_key": blob.key, "size": blob.size, "content_type": content_type}
+    return renditions
+
+async def record_video(blob: BlobRef, prompt: str, description: str = "", duration: Optional[float] = None,
+                       renditions: Optional[Dict[str, Dict[str, Any]]] = None) -> int:
+    """
+    Index a stored video blob and queue its database record.
+    Returns the video's id in the index.
+    """
+    # The database record only references the blob
+    video_data = VideoCreate(
+        prompt=prompt,
+        description=description,
+        blob_key=blob.key,
+        size=blob.size,
+        metadata={
+            "format": "mp4",
+            "content_type": "video/mp4",
+            "blob_store": blob_store.backend,
+            "duration_seconds": duration,
+            "renditions": renditions or {}
+        }
+    )
+    
+    # Queue the record; it is written to the database in the background
+    write_buffer.enqueue_video(video_data)
+    return await asyncio.to_thread(video_index.add, blob.key, prompt, description, blob.size, duration,
+                                   renditions=renditions)
+
+video_index = VideoIndex(VIDEO_INDEX_PATH)
+
+render_cache = RenderCache(RENDER_CACHE_PATH, RENDER_CACHE_MAX_ENTRIES)
+render_flights = SingleFlight()
+
+def render_key(request: GenerationRequest) -> Optional[str]:
+    """Cache key for a request, or None if its output is not reproducible."""
+    if request.seed is None:
+        return None
+    fields = request.model_dump(include={"prompt", "num_inference_steps", "num_frames", "output_format", "add_audio", "seed"})
+    fields["prompt"] = request.prompt.strip()
+    if request.add_audio:
+        # A given script makes the narration model irrelevant
+        if request.script:
+            fields["script"] = request.script.strip()
+        else:
+            fields["model_name"] = request.model_name
+        fields["tts_model"] = DEFAULT_TTS_MODEL
+    # The cache outlives configuration changes, so key on what shapes the output
+    fields["diffusion_model"] = DIFFUSION_MODEL
+    fields["model_backend"] = MODEL_BACKEND
+    fields["inference"] = get_profile().as_dict()
+    fields["encode"] = encode_settings()
+    return request_key(fields)
+
+async def run_generation(request: GenerationRequest, progress: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+    """
+    Generate a video, reusing the cached result of an identical seeded request.
+
+    Concurrent identical requests share one render.
+    """
+    # The key includes the inference profile, which imports torch while the
+    # models are still loading; keep that off the event loop
+    key = await asyncio.to_thread(render_key, request)
+    if key is None:
+        generations.inc(source="render")
+        return await render(request, progress)
+
+    cached = await asyncio.to_thread(render_cache.get, key)
+    if cached is not None:
+        if await asyncio.to_thread(blob_store.exists, cached["blob_key"]):
+            for stage in GENERATION_STAGES:
+                if progress:
+                    progress(stage, "cached")
+            generations.inc(source="cache")
+            return {**cached, "cached": True, "timings": {}}
+        # The blob is gone from the store; render it again
+        await asyncio.to_thread(render_cache.invalidate, key)
+
+    result, shared = await render_flights.do(key, lambda: render_and_cache(key, request, progress))
+    generations.inc(source="shared" if shared else "render")
+    if shared and progress:
+        for stage in GENERATION_STAGES:
+            progress(stage, "shared")
+    return {**result, "cached": shared}
+
+async def render_and_cache(key: str, request: GenerationRequest,
+                           progress: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+    result = await render(request, progress)
+    # The local file may be pruned; cache hits are served from the blob store
+    await asyncio.to_thread(render_cache.put, key, {**result, "file_path": None}, result["size"])
+    return result
+
+async def render(request: GenerationRequest, progress: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+    """
+    Run the full diffusion -> TTS -> encode -> store pipeline for one request.
+
+    Args:
+        request: The generation parameters
+        progress: Optional callback invoked as progress(stage, status)
+    """
+    stage_started: Dict[str, float] = {}
+
+    def report(stage: str, status: str) -> None:
+        # Each stage is timed from "running" to its next status
+        if status == "running":
+            stage_started[stage] = time.time()
+        elif stage in stage_started:
+            started = stage_started.pop(stage)
+            finished = time.time()
+            stage_seconds.observe(finished - started, stage=stage)
+            tracing.record_span(stage, started, finished, status=status)
+        if progress:
+            progress(stage, status)
+
+    # The narration script only depends on the prompt, so generate it
+    # while diffusion runs instead of after it
+    script_task = None
+    if request.add_audio and not request.script:
+        report("script", "running")
+        script_task = asyncio.create_task(
+            asyncio.to_thread(generate_script, request.prompt, model_name=request.model_name)
+        )
+
     try:
-        # Generate video frames
-        video_frames = pipe(
-            prompt=request.prompt,
-            num_inference_steps=request.num_inference_steps,
-            num_frames=request.num_frames
-        ).frames[0]
-
-        # Generate unique filename
-        filename = f"output/video_{uuid.uuid4()}.{request.output_format}"
-        
-        # Export video
-        video_path = export_to_video(video_frames, filename)
-        
-        if request.add_audio:
-            # Generate script using Ollama
-            script = generate_script(request.prompt, model_name=request.model_name)
-            
-            # Add audio to video
-            final_video_path = add_audio_to_video(video_path, script)
+        # Generate video frames, batched with concurrent requests on the GPU thread
+        report("diffusion", "running")
+        video_frames = await diffusion_batcher.submit(
+            request.prompt,
+            request.num_inference_steps,
+            request.num_frames,
+            seed=request.seed
+        )
+        report("diffusion", "done")
+    except BaseException:
+        if script_task is not None:
+            script_task.cancel()
+        raise
+    
+    timings = {}
+    if request.add_audio:
+        if script_task is not None:
+            script = await script_task
+            report("script", "done")
         else:
-            final_video_path = video_path
-            script = ''
+            # Narration was produced upstream in the same call as the description
+            script = request.script
+            report("script", "skipped")
         
-        # Store the video in the database
-        await store_video_base64(final_video_path, request.prompt, script)
+        # Synthesise the narration
+        audio, timings = await synthesize_narration(script, report=report)
+    else:
+        audio = None
+        script = ''
+        for stage in ("script", "tts"):
+            report(stage, "skipped")
+
+    # Encode frames and narration to the final MP4 in one ffmpeg pass
+    report("encode", "running")
+    encode_start = time.perf_counter()
+    if IO_MODE == "memory":
+        # ffmpeg's output is streamed straight into the blob store
+        final_video_path = None
+        # The preview and posters come back in memory from the same ffmpeg pass
+        side_outputs: Dict[str, bytes] = {}
+        try:
+            blob = await executors.run_encode(
+                lambda: blob_store.put_stream(encode_video_stream(video_frames, audio, side_outputs=side_outputs))
+            )
+        except Exception as e:
+            logger.error("Failed to encode video: %s", e)
+            raise HTTPException(status_code=500, detail=f"Failed to encode and store video: {str(e)}")
+        timings["encode_seconds"] = round(time.perf_counter() - encode_start, 3)
+        report("encode", "done")
+        report("store", "running")
+        renditions = await asyncio.to_thread(store_renditions, side_outputs)
+        duration = encoded_duration(len(video_frames), audio.duration if audio is not None else None)
+        video_id = await record_video(blob, request.prompt, script, duration, renditions)
+        report("store", "done")
+    else:
+        final_video_path = os.path.join(OUTPUT_DIR, f"video_{uuid.uuid4()}.{request.output_format}")
+        try:
+            duration = encoded_duration(len(video_frames), wav_duration(audio) if audio else None)
+            outputs = await executors.run_encode(encode_renditions, video_frames, final_video_path, audio)
+        finally:
+            if audio:
+                os.unlink(audio)
+        timings["encode_seconds"] = round(time.perf_counter() - encode_start, 3)
+        report("encode", "done")
         
-        return {
-            "status": "success",
-            "message": "Video generated successfully" + (" with audio" if request.add_audio else ""),
-            "file_path": final_video_path,
-            "script": script,
-            "details": {
-                "prompt": request.prompt,
-                "num_inference_steps": request.num_inference_steps,
-                "num_frames": request.num_frames,
-                "device_used": device
-            }
-        }
+        # Store the video in the database
+        report("store", "running")
+        renditions = await asyncio.to_thread(store_renditions, outputs)
+        blob, video_id = await store_video_blob(final_video_path, request.prompt, script, duration, renditions)
+        report("store", "done")
+        await asyncio.to_thread(prune_output)
+    
+    return {
+        "status": "success",
+        "message": "Video generated successfully" + (" with audio" if request.add_audio else ""),
+        "file_path": final_video_path,
+        "video_id": video_id,
+        "blob_key": blob.key,
+        "duration_seconds": duration,
+        "size": blob.size,
+        "script": script,
+        "details": {
+            "prompt": request.prompt,
+            "num_inference_steps": request.num_inference_steps,
+            "num_frames": request.num_frames,
+            "seed": request.seed,
+            "device_used": get_device()
+        },
+        "timings": timings
+    }
+
+@app.post("/generate")
+async def generate_video(request: GenerationRequest):
+    try:
+        return await run_generation(request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def run_job(request: Dict[str, Any], progress: Callable[[str, str], None]) -> Dict[str, Any]:
+    # Continue the trace of the request that queued the job
+    traceparent = request.pop("traceparent", None)
+    with tracing.span("job", traceparent=traceparent):
+        return await run_generation(GenerationRequest(**request), progress)
+
+job_store = JobStore(JOBS_DB_PATH)
+job_manager = JobManager(
+    job_store,
+    run_job,
+    GENERATION_STAGES,
+    max_in_flight=JOBS_MAX_IN_FLIGHT,
+    max_queue_depth=JOBS_MAX_QUEUE_DEPTH
+)
+
+metrics.REGISTRY.gauge("jobs_queue_depth", "Jobs waiting to run", callback=lambda: job_manager.queue_depth)
+metrics.REGISTRY.gauge("jobs_in_flight", "Jobs running", callback=lambda: job_manager.in_flight)
+metrics.REGISTRY.gauge(
+    "executor_pending", "Tasks submitted to each executor and not yet finished", ["executor"],
+    callback=lambda: {name.replace("_pending", ""): n for name, n in executors.stats().items()}
+)
+metrics.REGISTRY.gauge(
+    "diffusion_batch_pending", "Prompts waiting for a diffusion batch",
+    callback=lambda: diffusion_batcher.stats()["pending"]
+)
+metrics.REGISTRY.gauge(
+    "db_writes_pending", "Records waiting in the write-behind buffer",
+    callback=lambda: write_buffer.pending
+)
+metrics.REGISTRY.gauge(
+    "model_loaded", "1 once a model is loaded, 0 before, -1 if loading failed", ["model"],
+    callback=lambda: {
+        name: {"ready": 1, "failed": -1}.get(model["state"], 0) for name, model in model_loader.stats().items()
+    }
+)
+metrics.REGISTRY.gauge(
+    "model_load_seconds", "Time spent loading each model so far", ["model"],
+    callback=lambda: {name: model["load_seconds"] for name, model in model_loader.stats().items()}
+)
+
+def heartbeat_payload() -> Dict[str, Any]:
+    return {
+        "worker_id": WORKER_ID,
+        "url": WORKER_URL,
+        "ready": model_loader.ready,
+        "models": {name: model["state"] for name, model in model_loader.stats().items()},
+        "queue_depth": job_manager.queue_depth,
+        "in_flight": job_manager.in_flight,
+        "max_in_flight": job_manager.max_in_flight
+    }
+
+heartbeat = HeartbeatSender(DISPATCHER_URL, heartbeat_payload, interval=HEARTBEAT_SECONDS) if DISPATCHER_URL else None
+
+@app.on_event("startup")
+async def start_job_manager():
+    await write_buffer.start()
+    await job_manager.start()
+    if heartbeat is not None:
+        await heartbeat.start()
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    """Queue a generation job and return its id immediately."""
+    generation = request.model_dump(exclude={"priority"})
+    generation["traceparent"] = tracing.current_traceparent()
+    try:
+        job = await job_manager.submit(generation, priority=request.priority or 0)
+    except JobQueueFull as e:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(e), "queue_depth": e.queue_depth},
+            headers={"Retry-After": "30"}
+        )
+    return {
+        "job_id": job["id"],
+        "state": job["state"],
+        "queue_depth": job_manager.queue_depth
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(job_manager.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job_status(job)
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, reason: str = "cancelled by client"):
+    """
+    Cancel a queued or running job; it ends up failed with a "Cancelled"
+    error. Finished jobs are returned unchanged.
+    """
+    job = await asyncio.to_thread(job_manager.cancel, job_id, reason)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job_status(job)
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "job_id": job["id"],
+        "state": job["state"],
+        "priority": job["priority"],
+        "stages": job["stages"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+
+@app.get("/videos")
+async def list_videos(limit: int = Query(10, ge=1, le=100), cursor: Optional[str] = None):
+    """
+    Return a page of videos, newest first, as {"items": [...], "next_cursor": ...}.
+    Items are metadata only; play a video from its stream_url. Pass
+    `next_cursor` back as `cursor` for the following page.
+    """
+    try:
+        videos, next_cursor = await asyncio.to_thread(video_index.page, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    items = [
+        {
+            **video,
+            "stream_url": f"/videos/{video['blob_key']}/stream",
+            "renditions": {
+                name: {**rendition, "stream_url": f"/videos/{rendition['blob_key']}/stream"}
+                for name, rendition in video["renditions"].items()
+            }
+        }
+        for video in videos
+    ]
+    return {"items": items, "next_cursor": next_cursor}
+
+@app.api_route("/videos/{video_id}/stream", methods=["GET", "HEAD"])
+async def stream_video(video_id: str, request: Request):
+    """
+    Serve a stored video by its blob key with Range/206 support so the
+    browser can start playback and seek before the whole file arrives.
+    """
+    if not BLOB_KEY_PATTERN.fullmatch(video_id):
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    # Both stat the blob on disk; keep them off the event loop
+    path = await asyncio.to_thread(blob_store.local_path, video_id)
+    if path is None:
+        # Remote backends serve ranges themselves
+        # S3 HEAD and presign calls; keep them off the event loop
+        exists = await asyncio.to_thread(blob_store.exists, video_id)
+        url = await asyncio.to_thread(blob_store.url, video_id) if exists else None
+        if url is None:
+            raise HTTPException(status_code=404, detail="Video not found")
+        return RedirectResponse(url, status_code=307)
+
+    # Blobs are content addressed, so the key is a strong validator and
+    # the bytes behind a URL never change
+    etag = f'"{video_id}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes"
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    size = await asyncio.to_thread(os.path.getsize, path)
+    # Posters and HLS playlists share the store with videos
+    media_type = await asyncio.to_thread(sniff_media_type, path)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        range_header = None
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        return RangeFileResponse(path, 0, size, headers=headers, media_type=media_type)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return RangeFileResponse(path, start, end - start + 1, status_code=206, headers=headers, media_type=media_type)
+
 @app.get("/health")
-async def health_check():
+async def health_check(warm_tts: bool = False):
+    if warm_tts:
+        # Off the event loop, and not queued behind a render on the GPU thread
+        await asyncio.to_thread(tts_registry.warm, DEFAULT_TTS_MODEL)
+    # Shares the index lock with writes that are committing to disk
+    video_index_stats = await asyncio.to_thread(video_index.stats)
+    # Device details are only known once get_device() has finished
     return {
         "status": "healthy",
-        "device": device,
-        "cuda_available": torch.cuda.is_available(),
-        "mps_available": torch.backends.mps.is_available()
+        "ready": model_loader.ready,
+        "model_backend": MODEL_BACKEND,
+        "device": device_info.get("device"),
+        "cuda_available": device_info.get("cuda_available"),
+        "mps_available": device_info.get("mps_available"),
+        "pipeline_loaded": pipe is not None,
+        "inference": {**_profile.as_dict(), **torch_threads} if _profile is not None else None,
+        "models": model_loader.stats(),
+        "tts_models": tts_registry.stats(),
+        "executors": executors.stats(),
+        "batching": diffusion_batcher.stats(),
+        "video_index": video_index_stats,
+        "render_cache": {**render_cache.stats(), "in_flight": render_flights.in_flight, "shared": render_flights.shared},
+        "db_writes_pending": write_buffer.pending,
+        "io_mode": IO_MODE,
+        "jobs": {
+            "queue_depth": job_manager.queue_depth,
+            "in_flight": job_manager.in_flight,
+            "max_in_flight": job_manager.max_in_flight
+        }
     }
 
-def add_audio_to_video(video_path, script_text):
-    """Add TTS audio to the video"""
+@app.get("/ready")
+async def readiness_check():
+    """200 once every registered model is loaded, 503 until then."""
+    return JSONResponse(
+        status_code=200 if model_loader.ready else 503,
+        content={"ready": model_loader.ready, "models": model_loader.stats()}
+    )
+
+async def synthesize_narration(script_text, tts_model=DEFAULT_TTS_MODEL, report=None):
+    """
+    Synthesise the narration.
+
+    Returns a tuple of (audio, timings). In memory I/O mode audio is the
+    PCMAudio itself; in disk mode it is the path of a temporary WAV file that
+    the caller removes once it has been muxed. timings separates the one-off
+    TTS model load from per-request synthesis.
+    """
     if not script_text or not isinstance(script_text, str):
-        print(script_text)
+        logger.warning("Invalid script text for TTS: %s", log.summary(script_text))
         raise ValueError("Invalid script text for TTS")
         
-    # Generate audio from script
-    device = "mps"
-    tts = TTS(model_name="tts_models/en/ljspeech/tacotron2-DDC", progress_bar=False).to(device)
+    report = report or (lambda stage, status: None)
 
-    # Save audio to temporary file
-    with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_audio:
-        tts.tts_to_file(text=script_text.strip(), file_path=temp_audio.name)
-        
-        # Load video and audio
-        video = VideoFileClip(video_path)
-        audio = AudioFileClip(temp_audio.name)
-        
-        # If audio is longer than video, loop the video
-        if audio.duration > video.duration:
-            # Calculate how many times we need to loop the video
-            loop_count = int(np.ceil(audio.duration / video.duration))
-            # Create a list of video clips to concatenate
-            video_clips = [video] * loop_count
-            # Concatenate the video clips
-            final_video = concatenate_videoclips(video_clips)
-        else:
-            final_video = video
-            
-        # Add audio to video
-        final_video = final_video.set_audio(audio)
-        
-        # Generate output path
-        output_path = video_path.replace('.mp4', '_with_audio.mp4')
-        
-        # Write final video
-        final_video.write_videofile(output_path, codec='libx264', audio_codec='aac')
-        
-        # Clean up
-        video.close()
-        audio.close()
-        if audio.duration > video.duration:
-            final_video.close()
-        os.unlink(temp_audio.name)
-        
-        return output_path
+    # Reuse the process-wide TTS engine; only the first call pays the load
+    report("tts", "running")
+    await model_loader.wait(f"tts:{tts_model}")
+    was_loaded = tts_registry.is_loaded(tts_model)
+    load_start = time.perf_counter()
+    engine = await executors.run_on_gpu(tts_registry.get, tts_model)
+    timings = {
+        "tts_load_seconds": 0.0 if was_loaded else round(time.perf_counter() - load_start, 3)
+    }
+
+    # Synthesise on the GPU thread
+    if IO_MODE == "memory":
+        pcm, sample_rate, synthesis_seconds = await executors.run_on_gpu(engine.synthesize_pcm, script_text.strip())
+        audio = PCMAudio(pcm, sample_rate)
+    else:
+        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
+            audio = temp_audio.name
+        synthesis_seconds = await executors.run_on_gpu(engine.synthesize_to_file, script_text.strip(), audio)
+    timings["tts_synthesis_seconds"] = round(synthesis_seconds, 3)
+    report("tts", "done")
+
+    return audio, timings
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=PORT)